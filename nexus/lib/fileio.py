@@ -17,11 +17,20 @@
 #      Can read/write arbitrary files of these formats.              #
 #      Useful for atomic structure and electronic density I/O.       #       
 #                                                                    #
+#    read_dat_file                                                   #
+#      Reads columns of QMCPACK scalar.dat and dmc.dat files.        #
+#      Columns are cached as memory-mapped .npy files for reuse.     #
+#                                                                    #
+#    write_columns                                                   #
+#      Streams formatted array values to a file in fixed columns.    #
+#                                                                    #
 #====================================================================#
 
 
 import os
 import mmap
+import warnings
+from io import StringIO
 import numpy as np
 from numpy import array,zeros,ndarray,around,arange,dot,savetxt,empty,reshape
 from numpy.linalg import det,norm
@@ -252,14 +261,21 @@ class StandardFile(DevBase):
 
     def write(self,filepath=None):
         self.check_valid('write failed')
-        text = self.write_text()
-        if filepath!=None:
-            open(filepath,'w').write(text)
+        if filepath is None:
+            return self.write_text()
         #end if
-        return text
+        f = open(filepath,'w')
+        self.write_file(f)
+        f.close()
     #end def write
 
 
+    def write_file(self,f):
+        # stream file contents to an open file object
+        f.write(self.write_text())
+    #end def write_file
+
+
     def is_valid(self):
         return len(self.validity_checks())==0
     #end def is_valid
@@ -568,8 +584,15 @@ class XsfFile(StandardFile):
     #end def read_text
 
 
-    # test needed for axsf and bxsf
     def write_text(self):
+        f = StringIO()
+        self.write_file(f)
+        return f.getvalue()
+    #end def write_text
+
+
+    # test needed for axsf and bxsf
+    def write_file(self,f):
         c=''
         if self.filetype=='xsf':    # only write structure/datagrid if present
             if self.periodicity=='molecule' and 'elem' in self:
@@ -585,7 +608,9 @@ class XsfFile(StandardFile):
                 #end if
             #end if
             if 'data' in self:
-                c += self.write_data()
+                f.write(c)
+                c = ''
+                self.write_data(f)
             #end if
         elif self.filetype=='axsf': # only write image structures
             c += ' ANIMSTEPS {0}\n'.format(self.animsteps)
@@ -611,8 +636,8 @@ class XsfFile(StandardFile):
         elif self.filetype=='bxsf': # only write bandgrid
             c += self.write_band()
         #end if
-        return c
-    #end def write_text
+        f.write(c)
+    #end def write_file
 
 
     def write_coord(self,image=None,index=''):
@@ -652,7 +677,13 @@ class XsfFile(StandardFile):
     #end def write_vec
 
 
-    def write_data(self):
+    def write_data(self,f=None):
+        # grid values are streamed to f in vectorized chunks
+        if f is None:
+            f = StringIO()
+            self.write_data(f)
+            return f.getvalue()
+        #end if
         c = ''
         ncols = 4
         data = self.data
@@ -674,21 +705,20 @@ class XsfFile(StandardFile):
                     for v in dg.cell:
                         c += '   {0:12.8f} {1:12.8f} {2:12.8f}\n'.format(*v)
                     #end for
-                    c = c[:-1]
-                    n=0
-                    for v in dg.values.ravel(order='F'):
-                        if n%ncols==0:
-                            c += '\n    '
-                        #end if
-                        c += ' {0:12.8f}'.format(v)
-                        n+=1
-                    #end for
+                    f.write(c[:-1])
+                    c = ''
+                    # values are written in Fortran order, slowest along the last axis
+                    values = dg.values
+                    nlast  = values.shape[-1]
+                    nslice = max(1,(1<<20)//max(1,values.size//max(1,nlast)))
+                    slices = (values[...,i:i+nslice].ravel(order='F') for i in range(0,nlast,nslice))
+                    write_columns(f,slices,' %12.8f',ncols,head='\n    ')
                     c += '\n   END_DATAGRID_{0}D_{1}\n'.format(d,dgk)
                 #end for
                 c += ' END_BLOCK_DATAGRID_{0}D\n'.format(d)
             #end for
         #end for                    
-        return c
+        f.write(c)
     #end def write_data
 
 
@@ -1330,8 +1360,15 @@ class ChgcarFile(StandardFile):
 
 
     def write_text(self):
-        text = self.poscar.write_text()
-        text+= '\n {0} {1} {2}\n'.format(*self.grid)
+        f = StringIO()
+        self.write_file(f)
+        return f.getvalue()
+    #end def write_text
+
+
+    def write_file(self,f):
+        f.write(self.poscar.write_text())
+        f.write('\n {0} {1} {2}\n'.format(*self.grid))
         densities = [self.charge_density]
         if self.spin_density is not None:
             if self.spin_density.size==self.charge_density.size:
@@ -1342,18 +1379,8 @@ class ChgcarFile(StandardFile):
                 #end for
             #end if
         #end if
-        n=0
-        for dens in densities:
-            for d in dens:
-                text += '{0:20.12E}'.format(d)
-                n+=1
-                if n%5==0:
-                    text+='\n'
-                #end if
-            #end for
-        #end for
-        return text
-    #end def write_text
+        write_columns(f,densities,'%20.12E',5,tail='\n')
+    #end def write_file
 
 
     def incorporate_xsf(self,xsf):
@@ -1588,3 +1615,195 @@ def read_poscar_chgcar(host,text):
             )
     #end if
 #end def read_poscar_chgcar
+
+
+
+def write_columns(f,arrays,fmt,ncols,head='',tail='',chunk_rows=1<<14):
+    """
+    Write the values of a sequence of 1D arrays to an open file in rows 
+    of ncols values.  Each row is formatted as head+ncols*fmt+tail, and 
+    rows continue across array boundaries.  A final partial row is 
+    written as head followed by the remaining values (without tail).  
+    Values are formatted in chunks of rows with a single %-operation, 
+    so the full text is never held in memory.
+    """
+    row  = head+fmt*ncols+tail
+    rest = []
+    for a in arrays:
+        a = np.asarray(a,dtype=float).ravel()
+        i = 0
+        if len(rest)>0:
+            i = min(ncols-len(rest),len(a))
+            rest.extend(a[:i].tolist())
+            if len(rest)<ncols:
+                continue
+            #end if
+            f.write(row%tuple(rest))
+            rest = []
+        #end if
+        nrows = (len(a)-i)//ncols
+        for r in range(0,nrows,chunk_rows):
+            nr = min(chunk_rows,nrows-r)
+            b  = i+r*ncols
+            f.write((row*nr)%tuple(a[b:b+nr*ncols].tolist()))
+        #end for
+        rest = a[i+nrows*ncols:].tolist()
+    #end for
+    if len(rest)>0:
+        f.write((head+fmt*len(rest))%tuple(rest))
+    #end if
+#end def write_columns
+
+
+
+def dat_cache_directory(filepath):
+    path,filename = os.path.split(filepath)
+    return os.path.join(path,'.'+filename+'.cache')
+#end def dat_cache_directory
+
+
+def parse_dat_rows(fobj,ncols,chunk_size=1<<24):
+    # yield (nrows,ncols) blocks of data parsed in large text chunks
+    remainder = b''
+    while True:
+        chunk = fobj.read(chunk_size)
+        final = len(chunk)==0
+        if final:
+            chunk,remainder = remainder,b''
+        else:
+            chunk = remainder+chunk
+            iend = chunk.rfind(b'\n')+1
+            chunk,remainder = chunk[:iend],chunk[iend:]
+        #end if
+        if b'#' in chunk:
+            lines = chunk.splitlines(True)
+            chunk = b''.join([l for l in lines if not l.lstrip().startswith(b'#')])
+        #end if
+        if len(chunk.strip())>0:
+            text = chunk.decode()
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore',DeprecationWarning)
+                    values = np.fromstring(text,sep=' ')
+                #end with
+            except ValueError:
+                values = None
+            #end try
+            nlines = chunk.count(b'\n')+int(not chunk.endswith(b'\n'))
+            if values is None or len(values)!=nlines*ncols:
+                # fromstring stops silently at unparsable tokens, defer 
+                # to loadtxt for misformatted data and error messages
+                values = np.loadtxt(text.splitlines(),ndmin=2)
+                if values.size>0 and values.shape[1]!=ncols:
+                    raise ValueError('number of columns in dat file is inconsistent with its header\ncolumns expected: {0}\ncolumns found: {1}'.format(ncols,values.shape[1]))
+                #end if
+            #end if
+            yield values.reshape(-1,ncols)
+        #end if
+        if final:
+            break
+        #end if
+    #end while
+#end def parse_dat_rows
+
+
+def read_dat_file(filepath,cache=False,chunk_size=1<<24):
+    """
+    Read the columns of a QMCPACK scalar.dat or dmc.dat file.
+
+    Returns the column names (omitting the leading index column) and a 
+    list of 1D arrays containing the data of each column.  Caching is 
+    opt-in: with cache=True, the columns are stored on first read as 
+    .npy files in a hidden directory next to the file 
+    (".<filename>.cache") and are returned as copy-on-write memory maps.  
+    The cache is reused for as long as the size and modification time 
+    of the file are unchanged.  If the cache cannot be written, plain 
+    arrays are returned instead.
+    """
+    if not os.path.exists(filepath):
+        error('cannot read dat file\nfile does not exist: {0}'.format(filepath),'read_dat_file')
+    #end if
+    size  = os.path.getsize(filepath)
+    mtime = os.path.getmtime(filepath)
+    cache_dir  = dat_cache_directory(filepath)
+    cache_meta = os.path.join(cache_dir,'meta.npz')
+    column_file = lambda i: os.path.join(cache_dir,'column_{0}.npy'.format(i))
+    if cache and os.path.exists(cache_meta):
+        try:
+            meta = np.load(cache_meta)
+            valid = int(meta['size'])==size and float(meta['mtime'])==mtime
+            variables = [str(v) for v in meta['variables']]
+            meta.close()
+            if valid:
+                columns = []
+                for i in range(len(variables)):
+                    columns.append(np.load(column_file(i),mmap_mode='c'))
+                #end for
+                return variables,columns
+            #end if
+        except:
+            None
+        #end try
+    #end if
+    fobj = open(filepath,'rb')
+    variables = fobj.readline().decode().split()[2:]
+    ncols = len(variables)+1
+    if cache:
+        try:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            elif os.path.exists(cache_meta):
+                os.remove(cache_meta)
+            #end if
+            # stage row-major data on disk, then transpose into columns
+            raw_file = os.path.join(cache_dir,'rows.bin')
+            raw = open(raw_file,'wb')
+            nrows = 0
+            for rows in parse_dat_rows(fobj,ncols,chunk_size):
+                raw.write(np.ascontiguousarray(rows).tobytes())
+                nrows += len(rows)
+            #end for
+            raw.close()
+            fobj.close()
+            if nrows>0:
+                rows = np.memmap(raw_file,dtype=float,mode='r',shape=(nrows,ncols))
+            else:
+                rows = np.empty((0,ncols))
+            #end if
+            cols = []
+            for i in range(len(variables)):
+                cols.append(np.lib.format.open_memmap(column_file(i),mode='w+',dtype=float,shape=(nrows,)))
+            #end for
+            block = max(1,chunk_size//(8*ncols))
+            for r in range(0,nrows,block):
+                rblock = np.array(rows[r:r+block])
+                for i in range(len(variables)):
+                    cols[i][r:r+block] = rblock[:,i+1]
+                #end for
+            #end for
+            for col in cols:
+                col.flush()
+            #end for
+            del rows,cols
+            os.remove(raw_file)
+            np.savez(cache_meta,size=size,mtime=mtime,variables=np.array(variables))
+            columns = []
+            for i in range(len(variables)):
+                columns.append(np.load(column_file(i),mmap_mode='c'))
+            #end for
+            return variables,columns
+        except (IOError,OSError):
+            fobj = open(filepath,'rb')
+            fobj.readline()
+        #end try
+    #end if
+    blocks = list(parse_dat_rows(fobj,ncols,chunk_size))
+    fobj.close()
+    if len(blocks)>0:
+        data = np.concatenate(blocks,axis=0)
+    else:
+        data = np.empty((0,ncols))
+    #end if
+    columns = [data[:,i+1] for i in range(len(variables))]
+    return variables,columns
+#end def read_dat_file
@@ -3977,10 +3977,45 @@ class ParallelotopeGridFunction(StructuredGridFunctionWithAxes):
     #end def read_xsf
 
 
-    # test needed
-    def read_from_points(self,points,values,axes,tol=1e-6,average=False):
+    def read_from_points(self,points,values,axes,tol=1e-6,average=False,
+                         chunk_size=None):
+        """
+        Construct the grid function from values on a scattered set of points.
+
+        The points must lie on a regular grid within the parallelotope 
+        spanned by `axes` (up to `tol`).  Layers of points along each axis 
+        direction are detected and used to construct the bounding grid.
+
+        Parameters
+        ----------
+        points : `array_like, float, shape (N,d), or str`
+            Locations of the data points.  If a string is given, it is the 
+            path to a `.npy` file which is memory-mapped.
+        values : `array_like, float, shape (N,...), or str`
+            Function values at the data points.  May also be a path to a 
+            `.npy` file, as for `points`.
+        axes : `array_like, float, shape (d,d)`
+            Directions of the grid axes.
+        tol : `float, optional, default 1e-6`
+            Tolerance for layer detection and grid point matching.
+        average : `bool, optional, default False`
+            Average values of points mapped to the same grid point.  If 
+            `False`, the mapping must be one-to-one.
+        chunk_size : `int, optional`
+            Process the points in chunks of this size, so that only one 
+            chunk of the (possibly memory-mapped) point cloud is resident at 
+            a time.  By default all points are processed at once.
+        """
         self.vlog('Reading grid function values from scattered data.')
 
+        # memory-map points/values stored on disk
+        if isinstance(points,str):
+            points = np.load(points,mmap_mode='r')
+        #end if
+        if isinstance(values,str):
+            values = np.load(values,mmap_mode='r')
+        #end if
+
         # check data types and shapes
         d = self.ensure_array(
             points = points,
@@ -3990,7 +4025,7 @@ class ParallelotopeGridFunction(StructuredGridFunctionWithAxes):
             )
         points = d.points
         values = d.values
-        axes   = d.axes.copy()
+        axes   = np.array(d.axes,dtype=float)
         del d
         if len(points)!=len(values):
             self.error('"points" and "values" must have the same length.\nNumber of points: {}\nNumber of values: {}'.format(len(points),len(values)))
@@ -4001,89 +4036,109 @@ class ParallelotopeGridFunction(StructuredGridFunctionWithAxes):
         if axes.shape!=(D,D):
             self.error('"axes" must have shape {}\nShape provided: {} '.format((D,D),axes.shape))
         #end if
+        if chunk_size is None:
+            chunk_size = max(N,1)
+        #end if
 
         # reshape values (for now GridFunction does not support more structured values)
-        values.shape = len(values),values.size//len(values)
+        P = values[0].size if N>0 else 1
 
         # normalize the axes
         for d in range(D):
             axes[d] /= np.linalg.norm(axes[d])
         #end for
-
-        # make the points rectilinear
-        self.vlog('Transforming points to unit coords',n=1,time=True)
-        rpoints = np.dot(points,np.linalg.inv(axes))
+        axinv = np.linalg.inv(axes)
+
+        # iterate over chunks of points, made rectilinear
+        def chunks():
+            for i0 in range(0,N,chunk_size):
+                i1 = min(i0+chunk_size,N)
+                cpoints = np.asarray(points[i0:i1],dtype=float)
+                cvalues = np.asarray(values[i0:i1]).reshape(i1-i0,P)
+                yield cpoints,np.dot(cpoints,axinv),cvalues
+            #end for
+        #end def chunks
 
         # search for layers in each dimension
-        def xlayers(xpoints,tol):
-            xmin = xpoints.min()
-            xmax = xpoints.max()
-            nbins = np.uint64(np.round(np.ceil((xmax-xmin+tol)/tol)))
-            dx = (xmax-xmin+tol)/nbins
-            layers = obj()
-            for x in xpoints:
-                n = np.uint64(x/dx)
-                if n not in layers:
-                    layers[n] = obj(xsum=x,nsum=1)
+        def xlayers(xbins,xsums,nsums,tol):
+            # sum coordinates of points falling in the same bin
+            xbins = np.concatenate(xbins)
+            ubins,inv = np.unique(xbins,return_inverse=True)
+            xsum = np.bincount(inv,weights=np.concatenate(xsums))
+            nsum = np.bincount(inv,weights=np.concatenate(nsums))
+            # merge neighboring bins whose means lie within tol
+            xmean  = xsum/nsum
+            layers = []
+            lsum   = xsum[0]
+            lnum   = nsum[0]
+            for n in range(1,len(ubins)):
+                if np.abs(xmean[n]-lsum/lnum)<tol:
+                    lsum += xsum[n]
+                    lnum += nsum[n]
                 else:
-                    l = layers[n]
-                    l.xsum += x
-                    l.nsum += 1
+                    layers.append(lsum/lnum)
+                    lsum = xsum[n]
+                    lnum = nsum[n]
                 #end if
             #end for
-            for l in layers:
-                l.xmean = l.xsum/l.nsum
-            #end for
-            lprev = None
-            for n in sorted(layers.keys()):
-                l = layers[n]
-                if lprev is not None and np.abs(l.xmean-lprev.xmean)<tol:
-                    lprev.xsum += l.xsum
-                    lprev.nsum += l.nsum
-                    lprev.xmean = lprev.xsum/lprev.nsum
-                    del layers[n]
-                else:
-                    lprev = l
-                #end if
-            #end for
-            xlayers = np.empty((len(layers),),dtype=float)
-            i = 0
-            for n in sorted(layers.keys()):
-                l = layers[n]
-                xlayers[i] = l.xmean
-                i += 1
-            #end for
-            order  = xlayers.argsort()
-            xlayers = xlayers[order]
-            return xlayers,xmin,xmax
+            layers.append(lsum/lnum)
+            xlayers = np.array(layers,dtype=float)
+            xlayers.sort()
+            return xlayers
         #end def xlayers
-        def index_by_layer(xpoints,tol):
-            xlayer,xmin,xmax = xlayers(xpoints,tol)
+        def layer_spacing(xlayer,tol):
             dxlayer = xlayer[1:]-xlayer[:-1]
             dxmin   = dxlayer.min()
             dxmax   = dxlayer.max()
             if np.abs(dxmax-dxmin)>2*tol:
                 error('Could not determine layer separation.\nLayers are not evenly spaced.\nMin layer spacing: {}\nMax layer spacing: {}\nSpread   : {}\nTolerance: {}'.format(dxmin,dxmax,dxmax-dxmin,2*tol),'read_from_points')
             #end if
-            dx = dxlayer.mean()
-            ipoints = np.array(np.around((xpoints-xmin)/dx),dtype=int)
-            return ipoints,xmin,xmax
-        #end def index_by_layer
+            return dxlayer.mean()
+        #end def layer_spacing
+
+        # find the extent of the points
+        self.vlog('Transforming points to unit coords',n=1,time=True)
+        xmin = np.empty((D,),dtype=float)
+        xmax = np.empty((D,),dtype=float)
+        xmin[:] =  np.inf
+        xmax[:] = -np.inf
+        for cpoints,rpoints,cvalues in chunks():
+            xmin = np.minimum(xmin,rpoints.min(axis=0))
+            xmax = np.maximum(xmax,rpoints.max(axis=0))
+        #end for
+
+        # bin the points along each dimension
+        self.vlog('Detecting layers',n=1,time=True)
+        nbins = np.ceil((xmax-xmin+tol)/tol)
+        dxbin = (xmax-xmin+tol)/nbins
+        xbins = [[] for d in range(D)]
+        xsums = [[] for d in range(D)]
+        nsums = [[] for d in range(D)]
+        for cpoints,rpoints,cvalues in chunks():
+            for d in range(D):
+                bins = np.floor((rpoints[:,d]-xmin[d])/dxbin[d]).astype(np.int64)
+                ubins,inv = np.unique(bins,return_inverse=True)
+                xbins[d].append(ubins)
+                xsums[d].append(np.bincount(inv,weights=rpoints[:,d]))
+                nsums[d].append(np.bincount(inv).astype(float))
+            #end for
+        #end for
 
         # create a grid consistent with the detected layer separations
         self.vlog('Initializing point index array',n=1,time=True)
         grid_shape  = np.empty((D, ),dtype=int  )
         grid_axes   = np.zeros((D,D),dtype=float)
         grid_corner = np.empty((D, ),dtype=float)
-        ipoints     = np.empty((N,D),dtype=int)
+        dx          = np.empty((D, ),dtype=float)
         for d in range(D):
             self.vlog('Indexing points along dim {}'.format(d),n=2,time=True)
-            ixpoints,xmin,xmax = index_by_layer(rpoints[:,d],tol)
-            grid_shape[d]  = ixpoints.max()+1
-            grid_axes[d,d] = xmax-xmin
-            grid_corner[d] = xmin
-            ipoints[:,d]   = ixpoints
+            xlayer = xlayers(xbins[d],xsums[d],nsums[d],tol)
+            dx[d]  = layer_spacing(xlayer,tol)
+            grid_shape[d]  = int(np.around((xmax[d]-xmin[d])/dx[d]))+1
+            grid_axes[d,d] = xmax[d]-xmin[d]
+            grid_corner[d] = xmin[d]
         #end for
+        del xbins,xsums,nsums
         grid_axes   = np.dot(grid_axes,axes)
         grid_corner = np.dot(grid_corner,axes)
         grid_bconds = D*('o',) # assumed for now
@@ -4096,37 +4151,39 @@ class ParallelotopeGridFunction(StructuredGridFunctionWithAxes):
             bconds   = grid_bconds,
             centered = False,
             )
-        
+
+        # map the inputted values onto the generated grid
+        self.vlog('Mapping data values onto grid',n=1,time=True)
+        dmax         = 0.0
+        point_counts = np.zeros((grid.npoints,),dtype=int)
+        grid_values  = np.zeros((grid.npoints,P),dtype=float)
+        for cpoints,rpoints,cvalues in chunks():
+            ipoints = np.array(np.around((rpoints-xmin)/dx),dtype=int)
+            # check that the generated grid contains the inputted points
+            ipflat = grid.flat_indices(ipoints)
+            dev = np.linalg.norm(cpoints-grid.points[ipflat],axis=1)
+            dmax = max(dmax,dev.max())
+            # count number of times each grid point is mapped to
+            point_counts += np.bincount(ipflat,minlength=grid.npoints)
+            if average:
+                np.add.at(grid_values,ipflat,cvalues)
+            else:
+                grid_values[ipflat] = cvalues
+            #end if
+        #end for
         self.vlog('Checking grid point mapping',n=1,time=True)
-        # check that the generated grid contains the inputted points
-        ipflat = grid.flat_indices(ipoints)
-        dmax = np.linalg.norm(points-grid.points[ipflat],axis=1).max()
         if dmax>tol:
             self.error('Generated grid points do not match those read in.\nMaximum deviation: {}\nTolerance        : {}'.format(dmax,tol))
         #end if
-        # count number of times each grid point is mapped to
-        point_counts = np.bincount(ipflat,minlength=grid.npoints)
         # if not averaging, check for one-to-one mapping
         max_count = point_counts.max()
         if not average and max_count>1:
             self.error('Mapping to grid points is not one-to-one.\nMax no. of read points mapped to a grid point: {}'.format(max_count))
         #end if
-
-        # map the inputted values onto the generated grid
-        self.vlog('Mapping data values onto grid',n=1,time=True)
-        grid_values = np.zeros((grid.npoints,values.shape[1]),dtype=float)
-        if not average or max_count==1:
-            grid_values[ipflat] = values
-        else:
+        if average and max_count>1:
             self.vlog('Averaging multi-valued points',n=2,time=True)
-            for i,v in zip(ipflat,values):
-                grid_values[i] += v
-            #end for
-            for i,c in enumerate(point_counts):
-                if c>1:
-                    grid_values[i] /= c
-                #end if
-            #end for
+            multi = point_counts>1
+            grid_values[multi] /= point_counts[multi,np.newaxis]
         #end if
 
         # initialize the GridFunction object
@@ -4308,7 +4365,7 @@ def parallelotope_grid_function(
         gf = ParallelotopeGridFunction(**kwargs)
     else:
         required = set(('points','values','axes'))
-        optional = set(('tol','average'))
+        optional = set(('tol','average','chunk_size'))
         present  = set(kwargs.keys())
         if len(required-present)>0:
             error('Grid function cannot be created.\nWhen "points" is provided, "axes" and "values" must also be given.\nInputs provided: {}'.format(sorted(present)),loc)
@@ -15,17 +15,22 @@
 #    HDFgroup                                                        #
 #      Class representing an HDF group.                              #
 #      Contains other HDFgroup's or named data as numpy arrays       #
+#                                                                    #
+#    HDFdataset                                                      #
+#      Lazy proxy for an HDF dataset.  Data (or a hyperslab of it)   #
+#      is only read from the file on first access.                   #
 #                                                                    #                                        
 #====================================================================#
 
 
 from numpy import array,ndarray,minimum,abs,ix_,resize
+from numpy.lib.mixins import NDArrayOperatorsMixin
 import sys
 import keyword
 from inspect import getmembers
 
 from superstring import valid_variable_name
-from generic import obj
+from generic import obj,object_interface
 from developer import DevBase,unavailable
 try:
     import h5py
@@ -37,10 +42,160 @@ from debug import *
 
 
 class HDFglobals(DevBase):
-    view = False
+    view  = False
+    lazy  = False
+    cache = True
 #end class HDFglobals
 
 
+
+class HDFdataset(NDArrayOperatorsMixin):
+    # Stands in for a numpy array until the data is actually needed.
+    #   Shape and dtype are available without touching the data.
+    #   Indexing reads only the requested hyperslab from the file.
+    #   Any other array attribute access reads the full dataset, which 
+    #   is kept for later use if cache is True.  The file is reopened 
+    #   for each read so that no file handles are held open.
+    def __init__(self,fpath,path,dataset,cache=True):
+        self.fpath = fpath
+        self.path  = path
+        self.dshape = dataset.shape
+        self.dtype = dataset.dtype
+        self.cache = cache
+        self.data  = None
+    #end def __init__
+
+    def __getattr__(self,name):
+        if name.startswith('_') or name in ('fpath','path','dshape','data'):
+            raise AttributeError(name)
+        #end if
+        return getattr(self.read(),name)
+    #end def __getattr__
+
+    def __repr__(self):
+        return 'HDFdataset({0}, shape={1}, dtype={2})'.format(self.path,self.shape,self.dtype)
+    #end def __repr__
+
+    def __str__(self):
+        return self.__repr__()
+    #end def __str__
+
+    def __len__(self):
+        if len(self.shape)==0:
+            raise TypeError('len() of unsized object')
+        #end if
+        return self.shape[0]
+    #end def __len__
+
+    def __iter__(self):
+        return iter(self.read())
+    #end def __iter__
+
+    def __getitem__(self,key):
+        return self.read(key)
+    #end def __getitem__
+
+    def __array__(self,dtype=None):
+        a = self.read()
+        if dtype is not None:
+            a = a.astype(dtype)
+        #end if
+        return a
+    #end def __array__
+
+    def __array_ufunc__(self,ufunc,method,*inputs,**kwargs):
+        inputs = tuple([self.resolve(v) for v in inputs])
+        if 'out' in kwargs:
+            out = []
+            for v in kwargs['out']:
+                if isinstance(v,HDFdataset):
+                    # in-place updates must land in the retained data
+                    v.data = v.read()
+                    v = v.data
+                #end if
+                out.append(v)
+            #end for
+            kwargs['out'] = tuple(out)
+        #end if
+        return getattr(ufunc,method)(*inputs,**kwargs)
+    #end def __array_ufunc__
+
+    @staticmethod
+    def resolve(v):
+        if isinstance(v,HDFdataset):
+            v = v.read()
+        #end if
+        return v
+    #end def resolve
+
+    @property
+    def shape(self):
+        if self.data is not None:
+            return self.data.shape
+        #end if
+        return self.dshape
+    #end def shape
+
+    @shape.setter
+    def shape(self,shape):
+        # reshaping acts on the data, which is then always retained
+        data = self.read()
+        data.shape = shape
+        self.data = data
+    #end def shape
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+    #end def ndim
+
+    @property
+    def size(self):
+        n = 1
+        for s in self.shape:
+            n *= s
+        #end for
+        return n
+    #end def size
+
+    def loaded(self):
+        return self.data is not None
+    #end def loaded
+
+    def read(self,key=None):
+        if self.data is not None:
+            if key is None:
+                return self.data
+            else:
+                return self.data[key]
+            #end if
+        #end if
+        if key is not None:
+            try:
+                with h5py.File(self.fpath,'r') as h:
+                    return h[self.path][key]
+                #end with
+            except (TypeError,ValueError,IndexError):
+                # selections h5py cannot express are taken from the full data
+                return self.read()[key]
+            #end try
+        #end if
+        with h5py.File(self.fpath,'r') as h:
+            data = array(h[self.path])
+        #end with
+        if self.cache:
+            self.data = data
+        #end if
+        return data
+    #end def read
+
+    # any in-place changes to the data (incl. reshaping) are discarded
+    def release(self):
+        self.data = None
+    #end def release
+#end class HDFdataset
+
+
 class HDFgroup(DevBase):
     def _escape_name(self,name):
         if name in self._escape_names:
@@ -144,6 +299,19 @@ class HDFgroup(DevBase):
     #end def read_arrays
 
 
+    # drop any data retained by lazy datasets
+    #   data will be reread from the file on next access
+    def release_arrays(self):
+        for k,v in self.items():
+            if isinstance(v,HDFdataset):
+                v.release()
+            elif isinstance(v,HDFgroup) and not k.startswith('_'):
+                v.release_arrays()
+            #end if
+        #end for
+    #end def release_arrays
+
+
     def get_keys(self):
         if '_groups' in self:
             keys = list(self._groups.keys())
@@ -270,9 +438,11 @@ class HDFreader(DevBase):
     datasets = set(["<class 'h5py.highlevel.Dataset'>","<class 'h5py._hl.dataset.Dataset'>"])
     groups   = set(["<class 'h5py.highlevel.Group'>","<class 'h5py._hl.group.Group'>"])
     
-    def __init__(self,fpath,verbose=False,view=False):
+    def __init__(self,fpath,verbose=False,view=False,lazy=False,cache=True):
         
-        HDFglobals.view = view
+        HDFglobals.view  = view
+        HDFglobals.lazy  = lazy
+        HDFglobals.cache = cache
 
         if verbose:
             print('  Initializing HDFreader')
@@ -350,7 +520,9 @@ class HDFreader(DevBase):
     #end def decrement_level
 
     def add_dataset(self,cur,k,v):
-        if not HDFglobals.view:
+        if HDFglobals.lazy:
+            cur[k] = HDFdataset(self.fpath,v.name,v,cache=HDFglobals.cache)
+        elif not HDFglobals.view:
             cur[k]=array(v)
         else:
             cur[k] = v
@@ -389,6 +561,21 @@ class HDFreader(DevBase):
 
 
 
-def read_hdf(fpath,verbose=False,view=False):
-    return HDFreader(fpath=fpath,verbose=verbose,view=view).obj
+def read_hdf(fpath,verbose=False,view=False,lazy=False,cache=True):
+    return HDFreader(fpath=fpath,verbose=verbose,view=view,lazy=lazy,cache=cache).obj
 #end def read_hdf
+
+
+
+# replace lazy dataset proxies anywhere in a nested object with arrays
+def read_lazy(o):
+    for k,v in o.items():
+        if isinstance(k,str) and k.startswith('_'):
+            continue
+        elif isinstance(v,HDFdataset):
+            o[k] = v.read()
+        elif isinstance(v,object_interface):
+            read_lazy(v)
+        #end if
+    #end for
+#end def read_lazy
@@ -45,6 +45,8 @@
 
 import os
 import time
+import select
+import signal
 #from multiprocessing import cpu_count
 from socket import gethostname
 from subprocess import Popen,PIPE
@@ -817,6 +819,21 @@ class Machine(NexusCore):
         self.not_implemented()
     #end def submit_job
 
+    # prepare to receive notice of job state changes (event driven mode)
+    def start_event_monitor(self):
+        None
+    #end def start_event_monitor
+
+    def stop_event_monitor(self):
+        None
+    #end def stop_event_monitor
+
+    # wait up to timeout seconds, return True if woken early by an event
+    def wait_for_events(self,timeout):
+        time.sleep(timeout)
+        return False
+    #end def wait_for_events
+
 
     def __init__(self,name,queue_size=0):
         self.name = name
@@ -898,6 +915,9 @@ class Workstation(Machine):
 
     batch_capable = False
 
+    # self-pipe written on SIGCHLD while event monitoring is active
+    event_pipe = None
+
     def __init__(self,
                  name                = 'workstation',
                  cores               = None,
@@ -1117,6 +1137,77 @@ class Workstation(Machine):
         self.processes[job.system_id] = process
         self.leave()
     #end def submit_job
+
+
+    def start_event_monitor(self):
+        if self.event_pipe is not None:
+            return
+        elif nexus_core.generate_only or not nexus_core.monitor:
+            return
+        elif not hasattr(signal,'SIGCHLD'):
+            return
+        #end if
+        rfd,wfd = os.pipe()
+        os.set_blocking(rfd,False)
+        os.set_blocking(wfd,False)
+        try:
+            # the interpreter writes to wfd whenever a signal arrives
+            # set_wakeup_fd raises ValueError outside the main thread
+            wakeup_fd = signal.set_wakeup_fd(wfd)
+        except ValueError:
+            os.close(rfd)
+            os.close(wfd)
+            return
+        #end try
+        handler = signal.signal(signal.SIGCHLD,self.child_signal)
+        self.event_pipe = obj(
+            rfd       = rfd,
+            wfd       = wfd,
+            wakeup_fd = wakeup_fd,
+            handler   = handler,
+            )
+    #end def start_event_monitor
+
+
+    def stop_event_monitor(self):
+        ep = self.event_pipe
+        if ep is None:
+            return
+        #end if
+        signal.signal(signal.SIGCHLD,ep.handler)
+        signal.set_wakeup_fd(ep.wakeup_fd)
+        os.close(ep.rfd)
+        os.close(ep.wfd)
+        self.event_pipe = None
+    #end def stop_event_monitor
+
+
+    @staticmethod
+    def child_signal(signum,frame):
+        None # wakeup is handled by the pipe
+    #end def child_signal
+
+
+    def wait_for_events(self,timeout):
+        ep = self.event_pipe
+        if ep is None:
+            return Machine.wait_for_events(self,timeout)
+        #end if
+        # children exiting before the wait leave bytes in the pipe,
+        # so no exit is missed between query_queue and this call
+        ready,w,x = select.select([ep.rfd],[],[],timeout)
+        if len(ready)==0:
+            return False
+        #end if
+        try:
+            while len(os.read(ep.rfd,512))>0:
+                None
+            #end while
+        except (BlockingIOError,InterruptedError):
+            None
+        #end try
+        return True
+    #end def wait_for_events
 #end class Workstation
 
 
@@ -88,7 +88,7 @@ class Settings(NexusCore):
         pseudo_dir      sleep           local_directory remote_directory 
         monitor         skip_submit     load_images     stages          
         verbose         debug           trace           progress_tty
-        graph_sims      command_line
+        graph_sims      command_line    event_driven    max_sleep
         '''.split())
 
     core_process_vars = set('''
@@ -279,6 +279,14 @@ class Settings(NexusCore):
                           default='none',
                           help='Number of seconds between polls.  At each poll, simulations are actually run provided all simulations they depend on have successfully completed (default={0}).'.format(nexus_core_defaults.sleep)
                           )
+        parser.add_option('--event_driven',dest='event_driven',
+                          action='store_true',default=False,
+                          help='Wake on job completion events rather than polling at a fixed interval.  Only workflows whose jobs changed state are progressed, and the polling interval backs off up to max_sleep while nothing changes.'
+                          )
+        parser.add_option('--max_sleep',dest='max_sleep',
+                          default='none',
+                          help='Longest interval in seconds between polls when event driven (default={0}).'.format(nexus_core_defaults.max_sleep)
+                          )
         parser.add_option('--machine',dest='machine',
                           default='none',
                           help="(Required) Name of the machine the simulations will be run on.  Workstations with between 1 and 128 cores may be specified by 'ws1' to 'ws128' (works for any machine where only mpirun is used).  For a complete listing of currently available machines (including those at HPC centers) please see the manual."
@@ -336,8 +344,8 @@ class Settings(NexusCore):
         #end if
 
         # pre-process options, full processing occurs upon return
-        boolean_options = set(['status_only','generate_only','progress_tty'])
-        real_options = set(['sleep'])
+        boolean_options = set(['status_only','generate_only','progress_tty','event_driven'])
+        real_options = set(['sleep','max_sleep'])
         for ropt in real_options:
             if opt[ropt]!='none':
                 try:
@@ -78,6 +78,8 @@ nexus_core_defaults = obj(
     status_only       = False,             # used by: ProjectManager
     generate_only     = False,             # used by: Simulation,Machine
     sleep             = 3,                 # used by: ProjectManager
+    max_sleep         = 60,                # used by: ProjectManager
+    event_driven      = False,             # used by: ProjectManager
     runs              = 'runs',            # used by: Simulation,Machine
     results           = '',                # used by: Simulation
     local_directory   = './',              # used by: Simulation,Machine
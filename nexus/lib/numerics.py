@@ -33,7 +33,12 @@
 #      arbitrary function of N-dimensional simulation data.          #
 #      Can be used to obtain error bars of fit parameters,           #
 #      eigenvalues, and other statistical results that depend on     #
-#      the input data in a non-linear fashion.                       #
+#      the input data in a non-linear fashion.  Samples can be       #
+#      evaluated all at once (vectorized) or in worker processes.    #
+#                                                                    #
+#    process_map                                                     #
+#      Map a function over tasks in a pool of forked processes.      #
+#      Errors in workers are re-raised in the calling process.       #
 #                                                                    #
 #    ndgrid                                                          #
 #      Function to construct an arbitrary N-dimensional grid.        #
@@ -43,6 +48,13 @@
 #      Compute statistics of N-dimensional Monte Carlo simulation    #
 #      data, including mean, variance, error, and autocorrelation.   #
 #                                                                    #
+#    autocorrelation                                                 #
+#      Compute the autocorrelation function or integrated            #
+#      autocorrelation time of many time series at once.             #
+#                                                                    #
+#    StreamingStats                                                  #
+#      Online accumulation of simstats results for growing series.   #
+#                                                                    #
 #    simplestats                                                     #
 #      Compute error assuming uncorrelated data.                     #
 #                                                                    #
@@ -67,6 +79,13 @@
 #    distance_table                                                  #
 #      Calculate all N^2 pair distances for a set of N points.       #
 #                                                                    #
+#    chunk_ranges                                                    #
+#      Row ranges to process a large table in memory bounded blocks. #
+#                                                                    #
+#    periodic_pairs                                                  #
+#      Find all pairs of points within a cutoff distance in periodic #
+#      boundary conditions with a KD-tree over periodic images.      #
+#                                                                    #
 #    nearest_neighbors                                               #
 #      Find k nearest neighbors of N points using a fast algorithm.  #
 #                                                                    #
@@ -89,18 +108,18 @@ from numpy import sum,abs,arange,empty,sin,cos,dot,atleast_2d,ogrid
 from numpy import ones_like,sign,cross,prod
 from numpy.linalg import norm
 from generic import obj
-from developer import unavailable,warn,error
+from developer import DevBase,unavailable,warn,error
 from unit_converter import convert
 from periodic_table import pt as ptable
 try:
     from scipy.special import betainc
     from scipy.optimize import fmin
-    from scipy.spatial import KDTree,Delaunay,Voronoi
+    from scipy.spatial import KDTree,cKDTree,Delaunay,Voronoi
     scipy_unavailable = False
 except:
     betainc = unavailable('scipy.special' ,'betainc')
     fmin    = unavailable('scipy.optimize','fmin')
-    KDTree,Delaunay,Voronoi  = unavailable('scipy.spatial' ,'KDTree','Delaunay','Voronoi')
+    KDTree,cKDTree,Delaunay,Voronoi  = unavailable('scipy.spatial' ,'KDTree','cKDTree','Delaunay','Voronoi')
     scipy_unavailable = True
 #end try
 
@@ -255,7 +274,7 @@ def morse_rDw_fit(re,De,w,m1,m2=None,Einf=0.0,Dunit='eV'):
 #    pf    = morse_fit(r,E)                           returns fitted parameters
 #  jackknife statistical fits, E is two dimensional with blocks as first dimension
 #    pf,pmean,perror = morse_fit(r,E,jackknife=True)  returns jackknife estimates of parameters
-def morse_fit(r,E,p0=None,jackknife=False,cost=least_squares,auxfuncs=None,auxres=None,capture=None):
+def morse_fit(r,E,p0=None,jackknife=False,cost=least_squares,auxfuncs=None,auxres=None,capture=None,processes=None):
     if isinstance(E,(list,tuple)):
         E = array(E,dtype=float)
     #end if
@@ -312,7 +331,8 @@ def morse_fit(r,E,p0=None,jackknife=False,cost=least_squares,auxfuncs=None,auxre
                                           function = curve_fit,
                                           args     = [r,None,morse,pf,cost],
                                           position = 1,
-                                          capture  = jcapture)
+                                          capture  = jcapture,
+                                          processes= processes)
         # compute auxiliary jackknife quantities, if desired (e.g. morse_freq, etc)
         if calc_aux:
             psamples = jcapture.jsamples
@@ -346,7 +366,7 @@ def morse_fit(r,E,p0=None,jackknife=False,cost=least_squares,auxfuncs=None,auxre
 # morse_fit_fine: fit data to a morse potential and interpolate on a fine grid
 #   compute direct jackknife variations in the fitted curves 
 #   by using morse as an auxiliary jackknife function
-def morse_fit_fine(r,E,p0=None,rfine=None,both=False,jackknife=False,cost=least_squares,capture=None):  
+def morse_fit_fine(r,E,p0=None,rfine=None,both=False,jackknife=False,cost=least_squares,capture=None,processes=None):  
     if rfine is None:
         rfine = linspace(r.min(),r.max(),400)
     #end if
@@ -355,7 +375,7 @@ def morse_fit_fine(r,E,p0=None,rfine=None,both=False,jackknife=False,cost=least_
         )
     auxres = obj()
 
-    res = morse_fit(r,E,p0,jackknife,cost,auxfuncs,auxres,capture)
+    res = morse_fit(r,E,p0,jackknife,cost,auxfuncs,auxres,capture,processes)
 
     if not jackknife:
         pf = res
@@ -483,7 +503,13 @@ def eos_fit(V,E,type='vinet',p0=None,cost='least_squares',optimizer='fmin',jackk
 #             if integer, will be placed in args:   args[position] = input_array
 #             if string , will be placed in kwargs: kwargs[position] = input_array
 #   capture: an object that will contain most jackknife info upon exit
-def jackknife(data,function,args=None,kwargs=None,position=None,capture=None):
+#   vectorized: if True, function is called once with all jackknife 
+#               samples stacked (blocks as the first dimension) and must 
+#               return an array or a tuple/list of arrays, also with 
+#               blocks as the first dimension
+#   processes: number of worker processes used to evaluate the function 
+#              for each sample (e.g. nonlinear fits), default is serial
+def jackknife(data,function,args=None,kwargs=None,position=None,capture=None,vectorized=False,processes=None):
     capture_results = capture!=None
     if capture_results:
         capture.data         = data
@@ -497,20 +523,21 @@ def jackknife(data,function,args=None,kwargs=None,position=None,capture=None):
     # check the requested argument position
     argpos,kwargpos,args,kwargs,position = check_jackknife_inputs(args,kwargs,position)
 
-    # obtain sums of the jackknife samples
+    # form all leave-one-out samples at once
     nblocks = data.shape[0]
     nb = float(nblocks)
     jnorm   = 1./(nb-1.)
     data_sum = data.sum(axis=0)
+    jdata_all = jnorm*(data_sum-data)
+
+    # evaluate the function for each jackknife sample
+    jsamples = jackknife_samples(jdata_all,function,args,kwargs,position,argpos,vectorized,processes)
+
+    # obtain sums of the jackknife samples
     array_return = False
     for b in range(nblocks):
-        jdata = jnorm*(data_sum-data[b])
-        if argpos:
-            args[position] = jdata
-        elif kwargpos:
-            kwargs[position] = jdata
-        #end if
-        jsample = function(*args,**kwargs)
+        jdata   = jdata_all[b]
+        jsample = jsamples[b]
         if b==0:
             # determine the return type from the first sample
             # and initialize the jackknife sums
@@ -573,11 +600,116 @@ def jackknife(data,function,args=None,kwargs=None,position=None,capture=None):
 numerics_jackknife = jackknife
 
 
+# returns the fork multiprocessing context, or None if unavailable
+def fork_context():
+    import multiprocessing
+    try:
+        return multiprocessing.get_context('fork')
+    except ValueError:
+        return None
+    #end try
+#end def fork_context
+
+
+# map a function over a list of tasks in a pool of forked worker processes
+#   results are returned in task order
+#   exceptions raised in a worker, including the exit made by error(), 
+#     are re-raised in the calling process
+#   initializer(*initargs) is run once in each worker, the arguments are 
+#     inherited through fork rather than pickled (e.g. lambdas are allowed)
+#   tasks are mapped in serial if processes<2 or fork is unavailable
+def process_map(function,tasks,processes=None,initializer=None,initargs=(),chunksize=1):
+    tasks = list(tasks)
+    context = None
+    if processes is not None and processes>1 and len(tasks)>1:
+        context = fork_context()
+        if context is None:
+            warn('parallel execution requires the fork start method, proceeding in serial','process_map')
+        #end if
+    #end if
+    if context is None:
+        if initializer is not None:
+            initializer(*initargs)
+        #end if
+        return [function(task) for task in tasks]
+    #end if
+    from concurrent.futures import ProcessPoolExecutor
+    nproc = min(processes,len(tasks))
+    with ProcessPoolExecutor(nproc,mp_context=context,initializer=initializer,initargs=initargs) as pool:
+        results = list(pool.map(function,tasks,chunksize=chunksize))
+    #end with
+    return results
+#end def process_map
+
+
+def jackknife_sample(task,b):
+    function,args,kwargs,position,argpos,jdata_all = task
+    jdata = jdata_all[b]
+    if argpos:
+        args[position] = jdata
+    else:
+        kwargs[position] = jdata
+    #end if
+    return function(*args,**kwargs)
+#end def jackknife_sample
+
+
+# jackknife task held by each worker process of jackknife_samples
+jackknife_worker_task = None
+
+def jackknife_worker_init(task):
+    global jackknife_worker_task
+    jackknife_worker_task = task
+#end def jackknife_worker_init
+
+def jackknife_worker_sample(b):
+    return jackknife_sample(jackknife_worker_task,b)
+#end def jackknife_worker_sample
+
+
+def jackknife_samples(jdata_all,function,args,kwargs,position,argpos,vectorized=False,processes=None):
+    nblocks = len(jdata_all)
+    if vectorized:
+        if argpos:
+            args[position] = jdata_all
+        else:
+            kwargs[position] = jdata_all
+        #end if
+        jsamples_all = function(*args,**kwargs)
+        if isinstance(jsamples_all,ndarray):
+            jsamples = list(jsamples_all)
+        else:
+            jsamples = list(zip(*jsamples_all))
+        #end if
+        if len(jsamples)!=nblocks:
+            error('vectorized jackknife function must return results with blocks as the first dimension\nnumber of blocks: {0}\nnumber of results returned: {1}'.format(nblocks,len(jsamples)),'jackknife')
+        #end if
+        return jsamples
+    #end if
+    task = function,args,kwargs,position,argpos,jdata_all
+    if processes is not None and processes>1 and nblocks>1 and fork_context() is not None:
+        # workers receive the task (function may be a lambda) via fork
+        chunksize = max(1,nblocks//(4*processes))
+        jsamples = process_map(jackknife_worker_sample,range(nblocks),processes,
+                               initializer=jackknife_worker_init,initargs=(task,),
+                               chunksize=chunksize)
+    else:
+        jsamples = []
+        for b in range(nblocks):
+            jsamples.append(jackknife_sample(task,b))
+        #end for
+    #end if
+    return jsamples
+#end def jackknife_samples
+
+
 # test needed
 # get jackknife estimate of auxiliary quantities
 #   jsamples is a subset of jsamples data computed by jackknife above
 #   auxfunc is an additional function to get a jackknife sample of a derived quantity
-def jackknife_aux(jsamples,auxfunc,args=None,kwargs=None,position=None,capture=None):
+#   vectorized: if True, auxfunc is called once with jsamples stacked into 
+#               an array (blocks as the first dimension)
+def jackknife_aux(jsamples,auxfunc,args=None,kwargs=None,position=None,capture=None,vectorized=False):
     # unpack the argument list if compressed
     if not inspect.isfunction(auxfunc):
         if len(auxfunc)==1:
@@ -608,14 +740,14 @@ def jackknife_aux(jsamples,auxfunc,args=None,kwargs=None,position=None,capture=N
 
     nblocks = len(jsamples)
     nb      = float(nblocks)
+    jdata_all = jsamples
+    if vectorized:
+        jdata_all = array(jsamples)
+    #end if
+    auxsamples = jackknife_samples(jdata_all,auxfunc,args,kwargs,position,argpos,vectorized)
     for b in range(nblocks):
-        jdata = jsamples[b]
-        if argpos:
-            args[position] = jdata
-        elif kwargpos:
-            kwargs[position] = jdata
-        #end if
-        jsample = auxfunc(*args,**kwargs)
+        jdata   = jsamples[b]
+        jsample = auxsamples[b]
         if b==0:
             jsum  = jsample.copy()
             jsum2 = jsum**2
@@ -787,7 +919,95 @@ def ndgrid(*args, **kwargs):
 ########################################################################
 
 
-def simstats(x,dim=None):
+def autocorrelation(x,mean=None,var=None):
+    """
+    Normalized autocorrelation function of Monte Carlo time series.
+
+    The series run along the last dimension of x and all of them are
+    handled together through a single zero-padded FFT convolution, 
+    giving O(N log N) cost per series.  Lag i is normalized as
+
+      C(i) = 1/(var*(N-i)) sum_j (x_j-mean)*(x_{j+i}-mean)
+
+    Series with vanishing variance are assigned zero correlation.
+    """
+    x = np.asarray(x)
+    N = x.shape[-1]
+    if mean is None:
+        mean = x.mean(-1)
+    #end if
+    if var is None:
+        var = x.var(-1)
+    #end if
+    mean = np.asarray(mean)
+    var  = np.asarray(var)
+    d = x-mean[...,np.newaxis]
+    nfft = 1
+    while nfft<2*N:
+        nfft *= 2
+    #end while
+    f    = np.fft.rfft(d,n=nfft,axis=-1)
+    acov = np.fft.irfft(f*f.conj(),n=nfft,axis=-1)[...,:N]
+    acov /= arange(N,0,-1)
+    small = abs(var)<1e-15
+    ovar  = np.where(small,0.0,1.0/np.where(small,1.0,var))
+    return acov*ovar[...,np.newaxis]
+#end def autocorrelation
+
+
+def autocorrelation_time(x,mean=None,var=None,max_direct_lags=128):
+    """
+    Integrated autocorrelation time (kappa) of Monte Carlo time series.
+
+    The series run along the last dimension of x.  The autocorrelation 
+    function is summed up to (but excluding) the first non-positive lag, 
+    which is the stopping rule used by simstats.  Leading lags are 
+    summed directly for all series at once (one contraction per lag), 
+    dropping series as they decorrelate.  Series still correlated after 
+    max_direct_lags lags are completed with the FFT autocorrelation.
+    """
+    x = np.asarray(x)
+    shape = x.shape[:-1]
+    N = x.shape[-1]
+    x = x.reshape(-1,N)
+    if mean is None:
+        mean = x.mean(-1)
+    #end if
+    if var is None:
+        var = x.var(-1)
+    #end if
+    mean  = np.asarray(mean).ravel()
+    var   = np.asarray(var).ravel()
+    kappa = np.ones((len(x),),dtype=float)
+    active = np.flatnonzero(abs(var)>=1e-15)
+    d    = x[active]-mean[active,np.newaxis]
+    ovar = 1.0/var[active]
+    nlags = min(N-2,max_direct_lags)
+    i = 1
+    while len(active)>0 and i<=nlags:
+        c = ovar/(N-i)*np.einsum('ij,ij->i',d[:,0:N-i],d[:,i:N])
+        positive = c>0
+        kappa[active[positive]] += 2.0*c[positive]
+        if not positive.all():
+            active = active[positive]
+            d      = d[positive]
+            ovar   = ovar[positive]
+        #end if
+        i += 1
+    #end while
+    if len(active)>0 and i<=N-2:
+        C = autocorrelation(x[active],mean[active],var[active])[:,i:N-1]
+        positive = np.logical_and.accumulate(C>0,axis=-1)
+        kappa[active] += 2.0*(C*positive).sum(-1)
+    #end if
+    return kappa.reshape(shape)[()]
+#end def autocorrelation_time
+
+
+def simstats(x,dim=None,method='vectorized'):
+    if method not in ('vectorized','loop'):
+        error('"{0}" is not a valid autocorrelation method\nvalid options are: vectorized, loop'.format(method),'simstats')
+    #end if
     shape = x.shape
     ndim  = len(shape)
     if dim is None:
@@ -823,7 +1043,15 @@ def simstats(x,dim=None):
 
     N=nblocks
 
-    if ndim==1:
+    if method=='vectorized' and not np.iscomplexobj(x):
+        kappa = autocorrelation_time(x,mean,var)
+        Neff  = (N+0.0)/kappa
+        error = sqrt(var/Neff)
+        if ndim>1:
+            kappa = kappa.astype(mean.dtype)
+            error = error.astype(mean.dtype)
+        #end if
+    elif ndim==1:
         i=0          
         tempC=0.5
         kappa=0.0
@@ -894,6 +1122,119 @@ def simstats(x,dim=None):
 
 
 
+class StreamingStats(DevBase):
+    """
+    Online accumulator of the statistics returned by simstats.
+
+    Blocks of samples for nvars time series can be appended in any 
+    number of updates.  Running sums, lagged products up to max_lag, 
+    and the first/last max_lag samples are retained, so each update 
+    costs O(nnew*max_lag) and the mean, variance, error, and 
+    autocorrelation time are available at any point without the 
+    sample history.  Series that remain correlated beyond max_lag are 
+    flagged as incomplete by stats() so that callers can fall back on 
+    simstats with the full series.
+    """
+
+    state_names = 'nvars max_lag n shift s1 s2 lag_products head tail'.split()
+
+    def __init__(self,nvars=1,max_lag=64,state=None):
+        if state is not None:
+            self.set_state(state)
+            return
+        #end if
+        self.nvars        = nvars
+        self.max_lag      = max_lag
+        self.n            = 0
+        self.shift        = zeros((nvars,),dtype=float)
+        self.s1           = zeros((nvars,),dtype=float)
+        self.s2           = zeros((nvars,),dtype=float)
+        self.lag_products = zeros((nvars,max_lag+1),dtype=float)
+        self.head         = zeros((nvars,0),dtype=float)
+        self.tail         = zeros((nvars,0),dtype=float)
+    #end def __init__
+
+
+    def get_state(self):
+        state = obj()
+        for name in self.state_names:
+            state[name] = np.array(self[name])
+        #end for
+        return state
+    #end def get_state
+
+
+    def set_state(self,state):
+        for name in self.state_names:
+            self[name] = np.array(state[name])
+        #end for
+        self.nvars   = int(self.nvars)
+        self.max_lag = int(self.max_lag)
+        self.n       = int(self.n)
+    #end def set_state
+
+
+    def update(self,x):
+        x = np.array(x,dtype=float).reshape(self.nvars,-1)
+        nnew = x.shape[1]
+        if nnew==0:
+            return
+        #end if
+        if self.n==0:
+            self.shift = x[:,0].copy()
+        #end if
+        # shift data by the first sample to limit roundoff in the sums
+        x -= self.shift[:,np.newaxis]
+        self.s1 += x.sum(1)
+        self.s2 += (x*x).sum(1)
+        t = self.tail.shape[1]
+        z = np.concatenate([self.tail,x],axis=1)
+        m = z.shape[1]
+        for i in range(min(self.max_lag,m-1)+1):
+            k = max(t,i)
+            self.lag_products[:,i] += np.einsum('ij,ij->i',z[:,k-i:m-i],z[:,k:m])
+        #end for
+        nhead = self.head.shape[1]
+        if nhead<self.max_lag:
+            self.head = np.concatenate([self.head,x[:,0:self.max_lag-nhead]],axis=1)
+        #end if
+        self.tail = z[:,max(0,m-self.max_lag):].copy()
+        self.n   += nnew
+    #end def update
+
+
+    def stats(self):
+        n = self.n
+        if n==0:
+            self.error('cannot compute statistics, no data has been accumulated')
+        #end if
+        mu    = self.s1/n
+        mean  = self.shift+mu
+        var   = np.maximum(self.s2/n-mu**2,0.0)
+        kappa = np.ones((self.nvars,),dtype=float)
+        active = abs(var)>=1e-15
+        ovar   = 1.0/np.where(active,var,1.0)
+        nlags  = min(self.max_lag,n-2)
+        t = self.tail.shape[1]
+        for i in range(1,nlags+1):
+            # sums over the first and last n-i samples
+            a = self.s1-self.tail[:,t-i:t].sum(1)
+            b = self.s1-self.head[:,0:i].sum(1)
+            c = ovar/(n-i)*(self.lag_products[:,i]-mu*(a+b)+(n-i)*mu**2)
+            active &= c>0
+            if not active.any():
+                break
+            #end if
+            kappa[active] += 2.0*c[active]
+        #end for
+        complete = ~active | (nlags>=n-2)
+        error = sqrt(var*kappa/n)
+        return mean,var,error,kappa,complete
+    #end def stats
+#end class StreamingStats
+
+
+
 def simplestats(x,dim=None,full=False):
     if dim is None:
         dim=len(x.shape)-1
@@ -1200,9 +1541,16 @@ def func_fit(x,y,fitting_function,p0,cost=least_squares):
 #end def func_fit
 
 
+def chunk_ranges(nrows,row_size,max_size=1<<22):
+    # split rows of a (nrows,row_size) table into contiguous blocks
+    #   of at most max_size elements (at least one row per block)
+    nblock = max(1,max_size//max(1,row_size))
+    return [(i,min(i+nblock,nrows)) for i in range(0,nrows,nblock)]
+#end def chunk_ranges
+
+
+
 def distance_table(p1,p2,ordering=0):
-    n1 = len(p1)
-    n2 = len(p2)
     same = id(p1)==id(p2)
     if not isinstance(p1,ndarray):
         p1=array(p1,dtype=float)
@@ -1212,11 +1560,13 @@ def distance_table(p1,p2,ordering=0):
     elif not isinstance(p2,ndarray):
         p2=array(p2,dtype=float)
     #end if
+    n1 = len(p1)
+    n2 = len(p2)
     dt = zeros((n1,n2),dtype=float)
-    for i1 in range(n1):
-        for i2 in range(n2):
-            dt[i1,i2] = norm(p1[i1]-p2[i2])
-        #end for
+    # broadcast over blocks of rows to bound temporary memory
+    for i1,i2 in chunk_ranges(n1,n2*p1.shape[-1]):
+        d = p1[i1:i2,np.newaxis,:]-p2[np.newaxis,:,:]
+        dt[i1:i2] = sqrt((d**2).sum(2))
     #end for
     if ordering==0:
         return dt
@@ -1229,12 +1579,8 @@ def distance_table(p1,p2,ordering=0):
         else:
             error('ordering must be 1 or 2,\nyou provided '+str(ordering),'distance_table')
         #end if
-        order = empty(dt.shape,dtype=int)
-        for i in range(n):
-            o = dt[i].argsort()
-            order[i] = o
-            dt[i,:]  = dt[i,o]
-        #end for
+        order = dt.argsort(1)
+        dt = np.take_along_axis(dt,order,1)
         return dt,order
     #end if
 #end def distance_table
@@ -1279,6 +1625,45 @@ def nearest_neighbors(n,points,qpoints=None,return_distances=False,slow=False):
 
 
 
+def periodic_pairs(points,points2,axes,rmax):
+    # Find all pairs (i,j) with a periodic image of points2[j] within 
+    # rmax of points[i].  Only the closest image of each pair is kept.
+    # Returns pair indices, distances, and displacement vectors 
+    # (points2[j]-points[i]) ordered by i and then distance.
+    points  = array(points,dtype=float)
+    points2 = array(points2,dtype=float)
+    axes    = array(axes,dtype=float)
+    axinv   = np.linalg.inv(axes)
+    dim     = len(axes)
+    # number of images needed along each axis to cover the cutoff
+    #   the cell width along axis d is 1/|axinv[:,d]|
+    nimage = np.ceil(rmax*norm(axinv,axis=0)).astype(int)
+    shifts = np.array(np.meshgrid(*[arange(-n,n+1) for n in nimage],indexing='ij'))
+    shifts = shifts.reshape(dim,-1).T
+    # fold points into the cell and replicate the second set
+    u  = dot(points,axinv)
+    p1 = dot(u-np.floor(u),axes)
+    u  = dot(points2,axinv)
+    p2 = dot(u-np.floor(u),axes)
+    images = (p2[np.newaxis,:,:]+dot(shifts,axes)[:,np.newaxis,:]).reshape(-1,dim)
+    pairs = cKDTree(p1).sparse_distance_matrix(cKDTree(images),rmax,output_type='ndarray')
+    i = pairs['i'].astype(int)
+    k = pairs['j'].astype(int)
+    d = pairs['v']
+    j = k%len(points2)
+    v = images[k]-p1[i]
+    # keep the closest image of each pair
+    order = np.lexsort((d,j,i))
+    i,j,d,v = i[order],j[order],d[order],v[order]
+    first = np.ones(len(i),dtype=bool)
+    first[1:] = (i[1:]!=i[:-1])|(j[1:]!=j[:-1])
+    i,j,d,v = i[first],j[first],d[first],v[first]
+    order = np.lexsort((d,i))
+    return i[order],j[order],d[order],v[order]
+#end def periodic_pairs
+
+
+
 def voronoi_neighbors(points):
     vor = Voronoi(points)
     neighbor_pairs = vor.ridge_points
@@ -13,6 +13,11 @@
 #      Class actively manages simulation workflows.                  #
 #      Works closely with Simulation, Machine, and Job objects.      #
 #                                                                    #
+#    CascadeIndex                                                    #
+#      Dependency index used by event driven monitoring.             #
+#      Tracks ready and in-flight sims so that each poll only        #
+#      progresses simulations whose upstream state has changed.      #
+#                                                                    #
 #====================================================================#
 
 
@@ -20,6 +25,7 @@ import os
 import time
 import memory
 from generic import obj
+from developer import DevBase
 from nexus_base import NexusCore,nexus_core
 from simulation import Simulation
 from debug import ci
@@ -45,6 +51,8 @@ class ProjectManager(NexusCore):
         self.simulations = obj()
         self.cascades = obj()
         self.progressing_cascades = obj()
+        self.index = None
+        self.finished_jobs = set()
     #end def __init__
 
 
@@ -87,7 +95,9 @@ class ProjectManager(NexusCore):
         #end if
         self.log('\nstarting runs:\n'+30*'~',n=1)
         if nexus_core.dependent_modes <= nexus_core.stages_set:
-            if nexus_core.monitor:
+            if nexus_core.monitor and nexus_core.event_driven:
+                self.monitor_events()
+            elif nexus_core.monitor:
                 start_time = time.time()
                 ipoll = 0
                 while len(self.progressing_cascades)>0:
@@ -120,6 +130,89 @@ class ProjectManager(NexusCore):
     #end def run_project
 
 
+    def monitor_events(self):
+        machine = self.machine
+        self.log('event driven monitoring',n=1)
+        index = self.init_index()
+        sleep = nexus_core.sleep
+        start_time = time.time()
+        machine.start_event_monitor()
+        try:
+            while index.active():
+                elapsed_time = time.time() - start_time
+                self.log('elapsed time %.1f s'%elapsed_time,
+                         ' memory %3.2f MB'%(memory.resident(children=True)/1e6),
+                         n=1,progress=True)
+                NexusCore.wrote_something = False
+                machine.query_queue()
+                self.progress_index()
+                nwaiting = len(machine.waiting)
+                machine.submit_jobs()
+                self.update_process_ids(index.inflight_sims())
+                if index.changed>0 or len(machine.waiting)!=nwaiting:
+                    sleep = nexus_core.sleep
+                #end if
+                if not index.active():
+                    None
+                elif machine.wait_for_events(sleep):
+                    sleep = nexus_core.sleep
+                else:
+                    # nothing happened, back off
+                    sleep = min(2*sleep,max(nexus_core.max_sleep,nexus_core.sleep))
+                #end if
+                if NexusCore.wrote_something:
+                    self.log()
+                #end if
+            #end while
+        finally:
+            machine.stop_event_monitor()
+        #end try
+        self.finish_index()
+    #end def monitor_events
+
+
+    def init_index(self):
+        self.index = CascadeIndex(self.progressing_cascades)
+        self.finished_jobs = set(self.machine.finished)
+        return self.index
+    #end def init_index
+
+
+    def progress_index(self):
+        # sims whose jobs finished since the last poll
+        machine  = self.machine
+        finished = []
+        if len(machine.finished)!=len(self.finished_jobs):
+            for iid in machine.finished-self.finished_jobs:
+                finished.append(machine.jobs[iid].simid)
+            #end for
+            self.finished_jobs = set(machine.finished)
+        #end if
+        if len(finished)>0 or len(self.index.ready)>0:
+            NexusCore.gc.collect()
+        #end if
+        self.index.poll(finished)
+    #end def progress_index
+
+
+    def finish_index(self):
+        index = self.index
+        self.log('cascade nodes visited: {0} in {1} polls'.format(index.visits_total,index.polls),n=1)
+        finished = []
+        for cid,cascade in self.progressing_cascades.items():
+            if cascade.check_subcascade():
+                finished.append(cid)
+            #end if
+        #end for
+        for cid in finished:
+            del self.progressing_cascades[cid]
+        #end for
+        if len(self.progressing_cascades)>0:
+            self.log('no further progress is possible for cascades: {0}'.format(sorted(self.progressing_cascades.keys())),n=1)
+        #end if
+    #end def finish_index
+
+
     def init_cascades(self):
         self.screen_fake_sims()
         self.resolve_file_collisions()
@@ -344,8 +437,11 @@ class ProjectManager(NexusCore):
     #end def progress_cascades
 
 
-    def update_process_ids(self):
-        for sim in self.simulations:
+    def update_process_ids(self,sims=None):
+        if sims is None:
+            sims = self.simulations
+        #end if
+        for sim in sims:
             sim.update_process_id()
         #end for
     #end def update_process_ids
@@ -383,3 +479,143 @@ class ProjectManager(NexusCore):
 #end class ProjectManager
 
 
+
+
+
+
+class CascadeIndex(DevBase):
+    # state flags compared to detect change during a poll
+    flags = ('setup','sent_files','submitted','finished','got_output',
+             'analyzed','failed','block')
+
+    def __init__(self,cascades):
+        self.sims         = obj()  # simid -> sim
+        self.dependents   = obj()  # simid -> dependent simids
+        self.ready        = set()  # reachable, may progress at next poll
+        self.inflight     = set()  # waiting on a job to finish
+        self.propagated   = set()  # progress has passed on to dependents
+        self.visits       = 0      # nodes visited during the last poll
+        self.visits_total = 0
+        self.polls        = 0
+        self.changed      = 0      # nodes that changed state in last poll
+        self.entry_state  = dict()
+        self.reached      = []
+        stack = list(cascades)
+        while len(stack)>0:
+            sim = stack.pop()
+            if sim.simid in self.sims:
+                continue
+            #end if
+            self.sims[sim.simid] = sim
+            self.dependents[sim.simid] = [d.simid for d in sim.dependents]
+            stack.extend(sim.dependents)
+            if sim.is_bundle:
+                stack.extend(sim.sims)
+            #end if
+        #end while
+        # wait ids persist across polls, each dependency clears once
+        for sim in self.sims:
+            sim.wait_ids = set(sim.dependency_ids)
+        #end for
+        for cascade in cascades:
+            self.ready.add(cascade.simid)
+        #end for
+    #end def __init__
+
+
+    def active(self):
+        return len(self.ready)>0 or len(self.inflight)>0
+    #end def active
+
+
+    def inflight_sims(self):
+        return [self.sims[simid] for simid in self.inflight]
+    #end def inflight_sims
+
+
+    # called by Simulation.progress on entry
+    def visit(self,sim):
+        self.visits += 1
+        if sim.simid not in self.sims:
+            self.sims[sim.simid] = sim
+            self.dependents[sim.simid] = [d.simid for d in sim.dependents]
+        #end if
+        if sim.simid not in self.entry_state:
+            self.entry_state[sim.simid] = sim.tuple(*self.flags)
+        #end if
+    #end def visit
+
+
+    # called by Simulation.progress once a sim is free to progress
+    def reach(self,sim,propagate):
+        self.reached.append(sim.simid)
+        if propagate:
+            self.propagated.add(sim.simid)
+        #end if
+    #end def reach
+
+
+    def poll(self,finished=None):
+        if finished is not None:
+            for simid in finished:
+                if simid in self.inflight:
+                    self.inflight.remove(simid)
+                    self.ready.add(simid)
+                #end if
+            #end for
+        #end if
+        self.visits      = 0
+        self.changed     = 0
+        self.entry_state = dict()
+        self.reached     = []
+        Simulation.progress_observer = self
+        try:
+            for simid in sorted(self.ready):
+                sim = self.sims[simid]
+                if sim.bundled and not sim.bundler.finished:
+                    continue
+                #end if
+                nreached = len(self.reached)
+                sim.progress()
+                if len(self.reached)==nreached and (sim.block or sim.failed):
+                    self.ready.remove(simid)
+                #end if
+            #end for
+        finally:
+            Simulation.progress_observer = None
+        #end try
+        for simid in set(self.reached):
+            sim = self.sims[simid]
+            self.ready.discard(simid)
+            self.inflight.discard(simid)
+            if simid in self.propagated:
+                continue
+            elif self.settled(sim):
+                continue
+            elif sim.submitted and not sim.finished and not sim.job.finished:
+                self.inflight.add(simid)
+            else:
+                self.ready.add(simid)
+            #end if
+        #end for
+        for simid,state in self.entry_state.items():
+            if self.sims[simid].tuple(*self.flags)!=state:
+                self.changed += 1
+            #end if
+        #end for
+        self.polls        += 1
+        self.visits_total += self.visits
+        return self.changed
+    #end def poll
+
+
+    # mirrors Simulation.check_subcascade for a sim that cannot propagate
+    def settled(self,sim):
+        if sim.block:
+            return True
+        elif not sim.finished:
+            return False
+        #end if
+        return sim.block_subcascade or sim.failed or len(self.dependents[sim.simid])==0
+    #end def settled
+#end class CascadeIndex
@@ -28,8 +28,9 @@ from time import time
 import os
 import re
 import sys
+import hashlib
 import traceback
-from numpy import arange,array
+from numpy import arange,array,integer,floating
 #custom library imports
 from generic import obj
 from developer import unavailable
@@ -37,7 +38,7 @@ from xmlreader import XMLreader
 from plotting import *
 from physical_system import ghost_atoms
 #QmcpackAnalyzer classes imports
-from qmcpack_analyzer_base import QAobject,QAanalyzer,QAanalyzerCollection
+from qmcpack_analyzer_base import QAobject,QAanalyzer,QAanalyzerCollection,QAcache
 from qmcpack_property_analyzers \
     import WavefunctionAnalyzer
 from qmcpack_quantity_analyzers \
@@ -115,7 +116,8 @@ class QmcpackAnalysisRequest(QAobject):
                  warmup_calculations=None,
                  output=set(['averages','samples']),
                  ndmc_blocks=1000,equilibration=None,group_num=None,
-                 traces=False,dm_settings=None):
+                 traces=False,dm_settings=None,cache=False,cache_dir=None,
+                 dat_cache=False):
         self.source          = source          
         self.destination     = destination     
         self.savefile        = str(savefile)
@@ -124,6 +126,9 @@ class QmcpackAnalysisRequest(QAobject):
         self.group_num       = group_num
         self.traces          = traces
         self.dm_settings     = dm_settings
+        self.cache           = cache
+        self.cache_dir       = cache_dir
+        self.dat_cache       = dat_cache
 
         cap = QAanalyzer.capabilities
 
@@ -254,6 +259,9 @@ class QmcpackAnalyzer(SimulationAnalyzer,QAanalyzer):
 
         if request!=None and os.path.exists(request.source):
             self.init_sub_analyzers(request)
+            if self.use_cache():
+                self._cache_init_values = QAcache.init_values(self)
+            #end if
         #end if
 
         savefile = request.savefile
@@ -456,6 +464,9 @@ class QmcpackAnalyzer(SimulationAnalyzer,QAanalyzer):
         if not os.path.exists(request.source):
             self.error('path to source\n  '+request.source+'\n  does not exist\n ensure that request.source points to a valid qmcpack input file')
         #end if
+        if self.load_cache():
+            return
+        #end if
         self.set_global_info()
         self.propagate_indicators(data_loaded=False)
         if self.info.type=='bundled' and self.info.perform_bundle_average:
@@ -474,6 +485,10 @@ class QmcpackAnalyzer(SimulationAnalyzer,QAanalyzer):
             if not self.info.data_loaded:
                 self.load_data()
             #end if
+            if self.info.analyzed and not force:
+                # results were restored from the cache
+                return
+            #end if
             self.vlog('main analysis of QmcpackAnalyzer data',n=1)
             try:
                 self.set_global_info()
@@ -498,6 +513,9 @@ class QmcpackAnalyzer(SimulationAnalyzer,QAanalyzer):
                 self.warn('runtime exception encountered\n'+msg)
             #end try
             self.vlog('end main analysis of QmcpackAnalyzer data',n=1)
+            if self.info.error is None:
+                self.save_cache()
+            #end if
             if self.info.request.savefile!='':
                 self.save()
             #end if
@@ -688,7 +706,107 @@ class QmcpackAnalyzer(SimulationAnalyzer,QAanalyzer):
 
 
 
-    def check_traces(self,verbose=False,pad=None,header=None):
+    # request settings that change the results of an analysis
+    cache_request_names = '''methods calculations data_sources quantities warmup_calculations
+        output ndmc_blocks equilibration group_num traces dm_settings'''.split()
+
+    def use_cache(self):
+        request = self.info.request
+        return 'cache' in request and request.cache and self.info.get('type')=='single'
+    #end def use_cache
+
+
+    def cache_filepath(self):
+        request = self.info.request
+        cache_dir = request.cache_dir
+        if cache_dir is None:
+            cache_dir = request.destination
+        #end if
+        infile = os.path.split(request.source)[1]
+        return os.path.join(cache_dir,'.'+infile+'.analysis_cache.npz')
+    #end def cache_filepath
+
+
+    @staticmethod
+    def cache_repr(v):
+        # order independent representation of request values
+        if isinstance(v,(set,list,tuple)):
+            vals = [QmcpackAnalyzer.cache_repr(x) for x in v]
+            if isinstance(v,set):
+                vals = sorted(vals)
+            #end if
+            return '['+','.join(vals)+']'
+        elif isinstance(v,(dict,obj)):
+            items = [(QmcpackAnalyzer.cache_repr(k),QmcpackAnalyzer.cache_repr(x)) for k,x in v.items()]
+            return '{'+','.join([k+':'+x for k,x in sorted(items)])+'}'
+        elif isinstance(v,integer):
+            return repr(int(v))
+        elif isinstance(v,floating):
+            return repr(float(v))
+        else:
+            return repr(v)
+        #end if
+    #end def cache_repr
+
+
+    def cache_key(self):
+        # hash of the input file, data file sizes/mtimes, and request
+        request = self.info.request
+        h = hashlib.sha1()
+        h.update(os.path.abspath(request.source).encode())
+        with open(request.source,'rb') as f:
+            h.update(f.read())
+        #end with
+        path   = self.info.source_path
+        prefix = self.info.file_prefix
+        for filename in sorted(os.listdir(path)):
+            if filename.startswith(prefix):
+                st = os.stat(os.path.join(path,filename))
+                h.update('{0} {1} {2}\n'.format(filename,st.st_size,st.st_mtime_ns).encode())
+            #end if
+        #end for
+        for name in self.cache_request_names:
+            h.update('{0}={1}\n'.format(name,self.cache_repr(request[name])).encode())
+        #end for
+        return h.hexdigest()
+    #end def cache_key
+
+
+    def load_cache(self):
+        if not self.use_cache():
+            return False
+        #end if
+        filepath = self.cache_filepath()
+        loaded = QAcache().load(filepath,self.cache_key(),self)
+        if loaded:
+            self.vlog('restored analysis results from cache file {0}'.format(filepath),n=1)
+        #end if
+        return loaded
+    #end def load_cache
+
+
+    def save_cache(self):
+        if not self.use_cache() or '_cache_init_values' not in self:
+            return False
+        #end if
+        filepath = self.cache_filepath()
+        try:
+            saved = QAcache().save(filepath,self.cache_key(),self,self._cache_init_values)
+        except (IOError,OSError):
+            saved = False
+        #end try
+        if saved:
+            self.vlog('saved analysis results in cache file {0}'.format(filepath),n=1)
+        else:
+            self.vlog('analysis results could not be cached',n=1)
+        #end if
+        return saved
+    #end def save_cache
+
+
+
+
+    def check_traces(self,verbose=False,pad=None,header=None,chunk_rows=None):
         if pad is None:
             pad = ''
         #end if
@@ -701,7 +819,7 @@ class QmcpackAnalyzer(SimulationAnalyzer,QAanalyzer):
                 pad += '  '
             #end if
             for method in self.qmc:
-                method.check_traces(pad)
+                method.check_traces(pad,chunk_rows=chunk_rows)
             #end for
         else:
             if verbose:
@@ -37,11 +37,18 @@
 #      of nested analyzer object structures for loading and          #
 #      analyzing data.                                               #
 #                                                                    #
+#    QAcache                                                         #
+#      Stores and restores analyzer results in npz format.           #
+#                                                                    #
 #====================================================================#
 
 
+import os
+import sys
+import json
+import types
 from numpy import minimum,resize
-from generic import obj
+from generic import obj,hobj,sorted_generic
 from developer import DevBase
 from hdfreader import HDFgroup
 from debug import *
@@ -648,3 +655,253 @@ class QAanalyzer(QAobject):
 class QAanalyzerCollection(QAobject):
     None
 #end class QAanalyzerCollection
+
+
+
+class QAcache(DevBase):
+    # Compact storage of analysis results in an npz file.
+    #   The state of each analyzer in a tree is flattened into a json 
+    #   description with arrays stored alongside by name.  Objects are 
+    #   restricted to subclasses of obj and are rebuilt by class name, 
+    #   so nothing is unpickled on load.  Members with names starting 
+    #   with an underscore (other than the storage of hobj's) and 
+    #   functions (dynamic methods) are skipped.
+    version = 1
+
+    class Unencodable(Exception):
+        None
+    #end class Unencodable
+
+    plain_types = (type(None),bool,int,float,str)
+
+    function_types = (types.FunctionType,types.MethodType,types.BuiltinFunctionType)
+
+    def __init__(self):
+        self.arrays = obj()
+    #end def __init__
+
+
+    @staticmethod
+    def analyzer_nodes(analyzer):
+        # analyzers in the tree in a fixed order, shared ones listed once
+        nodes = []
+        seen  = set()
+        def collect(a):
+            if id(a) in seen:
+                return
+            #end if
+            seen.add(id(a))
+            if isinstance(a,QAanalyzer):
+                nodes.append(a)
+            #end if
+            for k in sorted_generic(a.keys()):
+                v = a[k]
+                if isinstance(v,(QAanalyzer,QAanalyzerCollection)):
+                    collect(v)
+                #end if
+            #end for
+        #end def collect
+        collect(analyzer)
+        return nodes
+    #end def analyzer_nodes
+
+
+    def encode_key(self,k):
+        if isinstance(k,np.integer):
+            k = int(k)
+        elif isinstance(k,np.floating):
+            k = float(k)
+        #end if
+        if not isinstance(k,self.plain_types):
+            raise QAcache.Unencodable('key {0}'.format(k))
+        #end if
+        return k
+    #end def encode_key
+
+
+    def encode(self,v,allow_obj=True,stack=None):
+        if stack is None:
+            stack = set()
+        #end if
+        if isinstance(v,self.plain_types):
+            return dict(t='v',v=v)
+        elif isinstance(v,np.ndarray) and v.dtype.hasobject:
+            # elements of object arrays are encoded individually
+            vals = [self.encode(x,allow_obj,stack) for x in v.ravel()]
+            return dict(t='objarray',s=list(v.shape),v=vals)
+        elif isinstance(v,(np.ndarray,np.generic)):
+            if v.dtype.hasobject:
+                raise QAcache.Unencodable('object scalar')
+            #end if
+            name = 'a{0}'.format(len(self.arrays))
+            self.arrays[name] = np.asarray(v)
+            t = 'array' if isinstance(v,np.ndarray) else 'scalar'
+            return dict(t=t,a=name)
+        elif isinstance(v,complex):
+            return dict(t='complex',v=[v.real,v.imag])
+        #end if
+        if id(v) in stack:
+            raise QAcache.Unencodable('reference cycle')
+        #end if
+        stack.add(id(v))
+        if type(v) in (list,tuple,set):
+            vals = list(v)
+            if isinstance(v,set):
+                vals = sorted_generic(vals)
+            #end if
+            node = dict(t=v.__class__.__name__,v=[self.encode(x,allow_obj,stack) for x in vals])
+        elif type(v) is dict:
+            node = dict(t='dict',v=[[self.encode_key(k),self.encode(x,allow_obj,stack)] for k,x in v.items()])
+        elif allow_obj and isinstance(v,obj) and not isinstance(v,QAanalyzer):
+            items = []
+            hidden = isinstance(v,hobj)
+            for k,x in object.__getattribute__(v,'__dict__').items():
+                if not hidden and isinstance(k,str) and k.startswith('_') or isinstance(x,self.function_types):
+                    continue
+                #end if
+                items.append([self.encode_key(k),self.encode(x,allow_obj,stack)])
+            #end for
+            cls = v.__class__
+            node = dict(t='obj',c=cls.__module__+'.'+cls.__name__,v=items)
+        else:
+            raise QAcache.Unencodable(str(type(v)))
+        #end if
+        stack.remove(id(v))
+        return node
+    #end def encode
+
+
+    def decode(self,node,arrays):
+        t = node['t']
+        if t=='v':
+            return node['v']
+        elif t=='array':
+            return np.array(arrays[node['a']])
+        elif t=='scalar':
+            return arrays[node['a']][()]
+        elif t=='objarray':
+            a = np.empty((len(node['v']),),dtype=object)
+            for i,x in enumerate(node['v']):
+                a[i] = self.decode(x,arrays)
+            #end for
+            return a.reshape(node['s'])
+        elif t=='complex':
+            return complex(*node['v'])
+        elif t in ('list','tuple','set'):
+            vals = [self.decode(x,arrays) for x in node['v']]
+            return dict(list=list,tuple=tuple,set=set)[t](vals)
+        elif t=='dict':
+            return dict([(k,self.decode(x,arrays)) for k,x in node['v']])
+        elif t=='obj':
+            module,name = node['c'].rsplit('.',1)
+            cls = None
+            if module in sys.modules:
+                cls = getattr(sys.modules[module],name,None)
+            #end if
+            if not isinstance(cls,type) or not issubclass(cls,obj):
+                raise QAcache.Unencodable('unknown class '+node['c'])
+            #end if
+            o = cls.__new__(cls)
+            d = object.__getattribute__(o,'__dict__')
+            for k,x in node['v']:
+                d[k] = self.decode(x,arrays)
+            #end for
+            return o
+        else:
+            raise QAcache.Unencodable('unknown node type '+t)
+        #end if
+    #end def decode
+
+
+    @staticmethod
+    def init_values(analyzer):
+        # values held by each analyzer following initialization
+        values = []
+        for a in QAcache.analyzer_nodes(analyzer):
+            values.append((dict(a._items()),dict(a.info._items())))
+        #end for
+        return values
+    #end def init_values
+
+
+    def save(self,filepath,key,analyzer,init_values):
+        # Only values added or replaced by loading and analysis are 
+        # stored.  Returns False if any of these cannot be encoded.
+        self.arrays.clear()
+        states = []
+        try:
+            nodes = self.analyzer_nodes(analyzer)
+            if len(nodes)!=len(init_values):
+                raise QAcache.Unencodable('analyzer tree has changed')
+            #end if
+            for a,(avalues,ivalues) in zip(nodes,init_values):
+                info  = []
+                state = []
+                for k,v in a._items():
+                    if isinstance(k,str) and k.startswith('_') or isinstance(v,self.function_types):
+                        continue
+                    elif k=='info':
+                        for ik,iv in v._items():
+                            if ik not in ivalues or iv is not ivalues[ik]:
+                                info.append([self.encode_key(ik),self.encode(iv)])
+                            #end if
+                        #end for
+                    elif (k not in avalues or v is not avalues[k]) and not isinstance(v,(QAanalyzer,QAanalyzerCollection)):
+                        state.append([self.encode_key(k),self.encode(v)])
+                    #end if
+                #end for
+                states.append(dict(c=a.__class__.__name__,info=info,state=state))
+            #end for
+        except QAcache.Unencodable:
+            self.arrays.clear()
+            return False
+        #end try
+        tree = json.dumps(dict(version=self.version,key=key,analyzers=states))
+        tmppath = filepath+'.tmp.npz'
+        np.savez_compressed(tmppath,tree=np.array(tree),**self.arrays)
+        os.replace(tmppath,filepath)
+        self.arrays.clear()
+        return True
+    #end def save
+
+
+    def load(self,filepath,key,analyzer):
+        # returns False unless a matching cache was restored
+        if not os.path.exists(filepath):
+            return False
+        #end if
+        try:
+            with np.load(filepath,allow_pickle=False) as arrays:
+                tree = json.loads(str(arrays['tree']))
+                if tree['version']!=self.version or tree['key']!=key:
+                    return False
+                #end if
+                nodes  = self.analyzer_nodes(analyzer)
+                states = tree['analyzers']
+                if len(nodes)!=len(states):
+                    return False
+                #end if
+                restored = []
+                for a,s in zip(nodes,states):
+                    if a.__class__.__name__!=s['c']:
+                        return False
+                    #end if
+                    info  = [(k,self.decode(v,arrays)) for k,v in s['info']]
+                    state = [(k,self.decode(v,arrays)) for k,v in s['state']]
+                    restored.append((a,info,state))
+                #end for
+            #end with
+        except (IOError,OSError,ValueError,KeyError,QAcache.Unencodable):
+            return False
+        #end try
+        for a,info,state in restored:
+            for k,v in info:
+                a.info[k] = v
+            #end for
+            for k,v in state:
+                a[k] = v
+            #end for
+        #end for
+        return True
+    #end def load
+#end class QAcache
@@ -603,6 +603,15 @@ class QIxml(Names):
 
 
     def write(self,indent_level=0,pad='   ',first=False):
+        c = []
+        self.write_list(c,indent_level,pad,first)
+        return ''.join(c)
+    #end def write
+
+
+    def write_list(self,c,indent_level=0,pad='   ',first=False):
+        # append the text of this element and its children to the list c
+        #   text is only joined once at the top level
         param.set_precision(self.get_precision())
         if not QIobj.permissive_write:
             self.check_junk(exit=True)
@@ -611,30 +620,30 @@ class QIxml(Names):
         ip = indent+pad
         ipp= ip+pad
         expanded_tag = self.expand_name(self.tag)
-        c = indent+'<'+expanded_tag
+        c.append(indent+'<'+expanded_tag)
         for a in self.attributes:
             if a in self:
                 val = self[a]
                 if isinstance(val,str):
                     val = self.expand_name(val)
                 #end if
-                c += ' '+self.expand_name(a)+'='
+                c.append(' '+self.expand_name(a)+'=')
                 if a in self.write_types:
-                    c += '"'+self.write_types[a](val)+'"'
+                    c.append('"'+self.write_types[a](val)+'"')
                 else:
-                    c += '"'+param.write(val)+'"'
+                    c.append('"'+param.write(val)+'"')
                 #end if
             #end if
         #end for
         #if first:
-        #    c+=' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://www.mcc.uiuc.edu/qmc/schema/molecu.xsd"'
+        #    c.append(' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://www.mcc.uiuc.edu/qmc/schema/molecu.xsd"')
         ##end if
         #no_contents = len(set(self.keys())-set(self.elements)-set(self.plurals.keys()))==0
         no_contents = len(set(self.keys())-set(self.attributes))==0
         if no_contents:
-            c += '/>\n'
+            c.append('/>\n')
         else:
-            c += '>\n'
+            c.append('>\n')
             for v in self.h5tags:
                 if v in self:
                     if v in self.write_types:
@@ -642,12 +651,12 @@ class QIxml(Names):
                     else:
                         write_type = None
                     #end if
-                    c += param.write(self[v],name=self.expand_name(v),tag='h5tag',mode='elem',pad=ip,write_type=write_type)
+                    c.append(param.write(self[v],name=self.expand_name(v),tag='h5tag',mode='elem',pad=ip,write_type=write_type))
                 #end if
             #end for
             for v in self.costs:
                 if v in self:
-                    c += param.write(self[v],name=self.expand_name(v),tag='cost',mode='elem',pad=ip)
+                    c.append(param.write(self[v],name=self.expand_name(v),tag='cost',mode='elem',pad=ip))
                 #end if
             #end for
             for p in self.parameters:
@@ -657,7 +666,7 @@ class QIxml(Names):
                     else:
                         write_type = None
                     #end if
-                    c += param.write(self[p],name=self.expand_name(p),mode='elem',pad=ip,write_type=write_type)
+                    c.append(param.write(self[p],name=self.expand_name(p),mode='elem',pad=ip,write_type=write_type))
                 #end if
             #end for
             for a in self.attribs:
@@ -667,7 +676,7 @@ class QIxml(Names):
                     else:
                         write_type = None
                     #end if
-                    c += param.write(self[a],name=self.expand_name(a),tag='attrib',mode='elem',pad=ip,write_type=write_type)
+                    c.append(param.write(self[a],name=self.expand_name(a),tag='attrib',mode='elem',pad=ip,write_type=write_type))
                 #end if
             #end for
             elements = self.elements
@@ -678,17 +687,17 @@ class QIxml(Names):
                 if e in self:
                     elem = self[e]
                     if isinstance(elem,QIxml):
-                        c += elem.write(indent_level+1)
+                        elem.write_list(c,indent_level+1)
                     else:
                         begin = '<'+e+'>'                        
                         contents = param.write(elem)
                         end = '</'+e+'>'
                         if contents.strip()=='':
-                            c += ip+begin+end+'\n'
+                            c.append(ip+begin+end+'\n')
                         else:                            
-                            c += ip+begin+'\n'
-                            c += ipp+contents+'\n'
-                            c += ip+end+'\n'
+                            c.append(ip+begin+'\n')
+                            c.append(ipp+contents+'\n')
+                            c.append(ip+end+'\n')
                         #end if
                     #end if
                 elif e in plurals_inv and plurals_inv[e] in self:
@@ -697,20 +706,25 @@ class QIxml(Names):
                         self.error('write failed\n  element {0} is not a collection\n  contents of element {0}:\n{1}'.format(plurals_inv[e],str(coll)))
                     #end if
                     for instance in coll.list():
-                        c += instance.write(indent_level+1)
+                        instance.write_list(c,indent_level+1)
                     #end for
                 #end if
             #end for
             if self.text!=None:
-                c = c.rstrip('\n')
-                c+=param.write(self[self.text],mode='elem',pad=ip,tag=None,normal_elem=True)
+                # strip trailing newlines from the text written so far
+                while len(c)>0:
+                    t = c.pop().rstrip('\n')
+                    if len(t)>0:
+                        c.append(t)
+                        break
+                    #end if
+                #end while
+                c.append(param.write(self[self.text],mode='elem',pad=ip,tag=None,normal_elem=True))
             #end if
-            c+=indent+'</'+expanded_tag+'>\n'
+            c.append(indent+'</'+expanded_tag+'>\n')
         #end if
         param.reset_precision()
-
-        return c
-    #end def write
+    #end def write_list
 
 
     def __init__(self,*args,**kwargs):
@@ -1623,7 +1637,7 @@ class Param(Names):
 
 
     def write(self,value,mode='attr',tag='parameter',name=None,pad='   ',write_type=None,normal_elem=False):
-        c = ''
+        c = []
         attr_mode = mode=='attr'
         elem_mode = mode=='elem'
         if not attr_mode and not elem_mode:
@@ -1634,16 +1648,12 @@ class Param(Names):
         #end if
         if attr_mode:
             if isinstance(value,ndarray):
-                arr = value.ravel()
-                for v in arr:
-                    c+=self.write_val(v)+' '
-                #end for
-                c=c[:-1]
+                c.append(' '.join(self.write_vals(value)))
             else:
-                c = self.write_val(value)
+                c.append(self.write_val(value))
             #end if
         elif elem_mode:
-            c+=pad
+            c.append(pad)
             is_array = isinstance(value,ndarray)
             is_single = not (is_array and value.size>1)
             if tag!=None:
@@ -1659,36 +1669,30 @@ class Param(Names):
                         other +=' '+self.expand_name(a)+'="'+self.write_val(v)+'"'
                     #end for
                 #end if
-                c+='<'+tag+' name="'+name+'"'+other+rem_len*' '+'>'
+                c.append('<'+tag+' name="'+name+'"'+other+rem_len*' '+'>')
                 pp = pad+'   '
             else:
                 pp = pad
             #end if
             if is_array:
                 if normal_elem:
-                    c+='\n'
+                    c.append('\n')
                 #end if
                 if tag!=None:
-                    c+='\n'
+                    c.append('\n')
                 #end if
                 ndim = len(value.shape)
                 if ndim==1:
-                    line_len = 70
                     if tag!=None:
-                        c+=pp
+                        c.append(pp)
                     #end if
-                    line = ''
-                    for v in value:
-                        line+=self.write_val(v)+' '
-                        if len(line)>line_len:
-                            c+=line+'\n'
-                            line = ''
-                        #end if
-                    #end for
-                    if len(line)>0:
-                        c+=line
+                    lines = self.write_lines(value)
+                    # last character written is replaced by a newline
+                    if len(lines)>0:
+                        c.append(lines[:-1]+'\n')
+                    else:
+                        c = [''.join(c)[:-1]+'\n']
                     #end if
-                    c=c[:-1]+'\n'
                 elif ndim==2:
                     nrows,ncols = value.shape
                     fmt=pp
@@ -1703,12 +1707,12 @@ class Param(Names):
                         vfmt = ''
                     #end if
                     for nc in range(ncols):
-                        fmt+='{'+str(nc)+vfmt+'}  '
+                        fmt+='{'+vfmt+'}  '
                     #end for
                     fmt = fmt[:-2]+'\n'
-                    for nr in range(nrows):
-                        c+=fmt.format(*value[nr])
-                    #end for
+                    # format all rows at once, python scalars format
+                    # identically to numpy scalars, but faster
+                    c.append((nrows*fmt).format(*value.ravel().tolist()))
                 else:
                     self.error('only 1 and 2 dimensional arrays are supported for xml formatting.\n  Received '+ndim+' dimensional array.')
                 #end if
@@ -1719,13 +1723,13 @@ class Param(Names):
                     val = value
                 #end if
                 #c += '    '+str(val)
-                c += '    {0:<10}'.format(self.write_val(val))
+                c.append('    {0:<10}'.format(self.write_val(val)))
             #end if
             if tag!=None:
-                c+=pad+'</'+tag+'>\n'
+                c.append(pad+'</'+tag+'>\n')
             #end if
         #end if
-        return c
+        return ''.join(c)
     #end def write
             
 
@@ -1737,6 +1741,44 @@ class Param(Names):
         #end if
     #end def write_val
 
+
+    def write_vals(self,value):
+        # equivalent to write_val applied to each array element
+        value = value.ravel()
+        if value.dtype==dtype(float) or value.dtype.kind in 'biuU':
+            # str/format of python scalars match numpy scalars for these types
+            vals = value.tolist()
+            if self.precision!=None and value.dtype==dtype(float):
+                return list(map(self.prec_format.format,vals))
+            else:
+                return list(map(str,vals))
+            #end if
+        else:
+            return list(map(self.write_val,value))
+        #end if
+    #end def write_vals
+
+
+    def write_lines(self,value,line_len=70):
+        # space separated values, a line is ended once it exceeds line_len
+        vals  = self.write_vals(value)
+        lines = []
+        start = 0
+        count = 0
+        for i,v in enumerate(vals):
+            count += len(v)+1
+            if count>line_len:
+                lines.append(' '.join(vals[start:i+1])+' \n')
+                start = i+1
+                count = 0
+            #end if
+        #end for
+        if start<len(vals):
+            lines.append(' '.join(vals[start:])+' ')
+        #end if
+        return ''.join(lines)
+    #end def write_lines
+
     def init_class(self):
         None
     #end def init_class
@@ -20,7 +20,7 @@
 import os
 import re
 from generic import obj
-from hdfreader import HDFreader
+from hdfreader import HDFreader,read_lazy
 from qmcpack_analyzer_base import Checks,QAanalyzer,QAdata,QAHDFdata
 from qmcpack_property_analyzers import WavefunctionAnalyzer
 from qmcpack_quantity_analyzers import HDFAnalyzer
@@ -207,7 +207,8 @@ class MethodAnalyzer(QAanalyzer):
         files  = self.info.files
         if 'stat' in data_sources:
             filepath = os.path.join(source_path,files.stat)
-            hr = HDFreader(filepath)
+            # datasets are only read once claimed by an estimator analyzer
+            hr = HDFreader(filepath,lazy=True)
             if not hr._success:
                 self.warn('  hdf file seems to be corrupted, skipping contents:\n    '+filepath)
             #end if
@@ -219,6 +220,9 @@ class MethodAnalyzer(QAanalyzer):
         for name,value in self.items():
             if isinstance(value,HDFAnalyzer):
                 value.load_data_local(self.data)
+                if 'data' in value:
+                    read_lazy(value.data)
+                #end if
                 value.info.data_loaded = True
                 if value.info.should_remove:
                     remove.append(name)
@@ -241,7 +245,7 @@ class MethodAnalyzer(QAanalyzer):
     #end def unset_global_info
 
 
-    def check_traces(self,pad=None):
+    def check_traces(self,pad=None,chunk_rows=None):
         verbose = pad!=None
         method = self.info.method
         series = self.info.series
@@ -268,7 +272,7 @@ class MethodAnalyzer(QAanalyzer):
             checks = Checks('traces')
             checks.exclude(None)
             traces = self.traces
-            traces.form_diagnostic_data()
+            traces.form_diagnostic_data(chunk_rows=chunk_rows)
             checks.psums   = traces.check_particle_sums()
             if method=='dmc':
                 checks.dmc = traces.check_dmc(dmc)
@@ -30,13 +30,14 @@
 #                                                                    #
 #    Bspline                                                         #
 #      Represents a cubic bspline curve, supports evaluation.        #
+#      Many coefficient sets can be evaluated together.              #
 #                                                                    #
 #====================================================================#
 
 
 
 import os
-from numpy import loadtxt,array,ones,dot,floor,zeros
+from numpy import loadtxt,array,ones,dot,floor,zeros,arange,einsum
 from qmcpack_input import QmcpackInput
 from qmcpack_analyzer_base import QAobject,QAanalyzer
 from developer import unavailable
@@ -67,20 +68,21 @@ class Bspline(QAobject):
     d2A.shape = 4,4                 
 
     def __init__(self,params,cusp,rcut):
-        p = array(params)
+        # params may hold a single coefficient set or many (one per row)
+        p = array(params,dtype=float)
         cusp = float(cusp)
         rcut = float(rcut)
-        c = zeros((1,len(p)+4))
-        nintervals = len(p) + 1
+        pm = p.reshape(-1,p.shape[-1])
+        nparam = pm.shape[1]
+        c = zeros((len(pm),nparam+4))
+        nintervals = nparam + 1
         dr = rcut/nintervals
         odr = 1./dr
 
-        c[0,0] = p[1] - 2.*dr*cusp
-        c[0,1] = p[0]
-        c[0,2] = p[1]
-        for i in range(2,len(p)):
-            c[0,i+1] = p[i]
-        #end for
+        c[:,0] = pm[:,1] - 2.*dr*cusp
+        c[:,1] = pm[:,0]
+        c[:,2] = pm[:,1]
+        c[:,3:nparam+1] = pm[:,2:]
            
         self.p      = p      
         self.rcut   = rcut   
@@ -93,36 +95,33 @@ class Bspline(QAobject):
     #end def __init__
 
     def evaluate(self,r):
-        tp=zeros((4,1))
+        # value, gradient, and laplacian for all radii at once
+        #   returned arrays have the shape of r, with a leading 
+        #   dimension for multiple coefficient sets
+        r   = array(r,dtype=float)
         ni  = self.nintervals
         odr = self.odr
         c   = self.c
-        A   = self.A
-        dA  = self.dA
-        d2A = self.d2A
-        v   = zeros(r.shape)
-        dv  = zeros(r.shape)
-        d2v = zeros(r.shape)
-        for p in range(len(r)):               
-            ri = r[p]*odr
-            i = int(floor(ri))
-            if i<ni:
-                t = ri - i
-                tp[0,0] = t*t*t
-                tp[1,0] = t*t
-                tp[2,0] = t
-                tp[3,0] = 1.
-                v[p]   = dot(c[:,i:i+4],  dot(A,tp))
-                dv[p]  = dot(c[:,i:i+4], dot(dA,tp))
-                d2v[p] = dot(c[:,i:i+4],dot(d2A,tp))
-            else:
-                v[p] = 0.
-                dv[p] = 0.
-                d2v[p] = 0.
-            #end if
-        #end for
+        ri  = r.ravel()*odr
+        i   = floor(ri).astype(int)
+        inside = i<ni
+        i[~inside] = 0
+        t   = ri - i
+        tp  = array([t*t*t,t*t,t,ones(t.shape)])
+        # coefficient windows for each radius: (nsets,nr,4)
+        cw  = c[:,i[:,None]+arange(4)]
+        v   = einsum('snk,kn->sn',cw,  dot(self.A,tp))
+        dv  = einsum('snk,kn->sn',cw, dot(self.dA,tp))
+        d2v = einsum('snk,kn->sn',cw,dot(self.d2A,tp))
+        v[:,~inside]   = 0.
+        dv[:,~inside]  = 0.
+        d2v[:,~inside] = 0.
         dv*=odr
         d2v*=odr*odr
+        shape = self.p.shape[:-1]+r.shape
+        v.shape   = shape
+        dv.shape  = shape
+        d2v.shape = shape
         return v,dv,d2v
     #end def evaluate
 #end class Bspline
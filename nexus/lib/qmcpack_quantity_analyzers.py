@@ -69,6 +69,7 @@
 
 import os
 import re
+import numpy as np
 from numpy import array,zeros,dot,loadtxt,ceil,floor,empty,sqrt,trace,savetxt,concatenate,real,imag,diag,arange,ones,identity
 try:
     from scipy.linalg import eig,LinAlgError
@@ -79,7 +80,7 @@ from numerics import ndgrid,simstats,simplestats,equilibration_length
 from generic import obj
 from hdfreader import HDFreader
 from qmcpack_analyzer_base import QAobject,QAanalyzer,QAdata,QAHDFdata
-from fileio import XsfFile
+from fileio import XsfFile,read_dat_file
 from debug import *
 
 
@@ -149,24 +150,16 @@ class ScalarsDatAnalyzer(DatAnalyzer):
     def load_data_local(self):
         filepath = self.info.filepath
         quantities = QAanalyzer.request.quantities
+        dat_cache  = QAanalyzer.request.get('dat_cache',False)
 
-        lt = loadtxt(filepath)
-        if len(lt.shape)==1:
-            lt.shape = (1,len(lt))
-        #end if
-
-        data = lt[:,1:].transpose()
-
-        fobj = open(filepath,'r')
-        variables = fobj.readline().split()[2:]
-        fobj.close()
+        variables,data = read_dat_file(filepath,cache=dat_cache)
 
         self.data = QAdata()
         for i in range(len(variables)):
             var = variables[i]
             cvar = self.condense_name(var)
             if cvar in quantities:
-                self.data[var]=data[i,:]
+                self.data[var]=data[i]
             #end if
         #end for
     #end def load_data_local
@@ -203,22 +196,14 @@ class ScalarsDatAnalyzer(DatAnalyzer):
 class DmcDatAnalyzer(DatAnalyzer):
     def load_data_local(self):
         filepath = self.info.filepath
+        dat_cache = QAanalyzer.request.get('dat_cache',False)
 
-        lt = loadtxt(filepath)
-        if len(lt.shape)==1:
-            lt.shape = (1,len(lt))
-        #end if
-
-        data = lt[:,1:].transpose()
-
-        fobj = open(filepath,'r')
-        variables = fobj.readline().split()[2:]
-        fobj.close()
+        variables,data = read_dat_file(filepath,cache=dat_cache)
 
         self.data = QAdata()
         for i in range(len(variables)):
             var = variables[i]
-            self.data[var]=data[i,:]
+            self.data[var]=data[i]
         #end for
     #end def load_data_local
 
@@ -1011,7 +996,14 @@ class TracesFileHDF(QAobject):
     #end def init_trace
 
 
-    def check_particle_sums(self,tol=1e-8,force=False):
+    def check_particle_sums(self,tol=1e-8,force=False,chunk_rows=None):
+        if chunk_rows is not None:
+            if not self.checked_particle_sums() or force:
+                same = self.stream_check_particle_sums(tol,chunk_rows)
+                self.info.particle_sums_valid = same
+            #end if
+            return self.info.particle_sums_valid
+        #end if
         if not self.checked_particle_sums() or force:
             self.load()
             t = self.real_traces
@@ -1046,7 +1038,7 @@ class TracesFileHDF(QAobject):
     #end def check_particle_sums
 
     
-    def accumulate_scalars(self,force=False):
+    def accumulate_scalars(self,force=False,chunk_rows=None):
         if not self.accumulated_scalars() or force:
             # get block and step information for the qmc method
             blocks = self.info.blocks
@@ -1055,64 +1047,46 @@ class TracesFileHDF(QAobject):
                 self.scalars_by_block = None
                 return
             #end if
-            # load in traces data if it isn't already
-            self.load()
-            # real and int traces
-            tr = self.real_traces
-            ti = self.int_traces
-            # names shared by traces and scalar files
-            scalar_names = set(tr.scalars.keys())
-            # step and weight traces
-            st = ti.scalars.step
-            wt = tr.scalars.weight
-            if len(st)!=len(wt):
-                self.error('weight and steps traces have different lengths')
+            if chunk_rows is None:
+                # load in traces data if it isn't already
+                self.load()
+                # real and int traces
+                tr = self.real_traces
+                ti = self.int_traces
+                # step and weight traces
+                st = ti.scalars.step
+                wt = tr.scalars.weight
+                if len(st)!=len(wt):
+                    self.error('weight and steps traces have different lengths')
+                #end if
+                st = st.reshape(len(st))
+                wt = wt.reshape(len(wt))
+                quantities = sorted(set(tr.scalars.keys())-set(['weight']))
+                qt = empty((len(wt),len(quantities)))
+                for n,qname in enumerate(quantities):
+                    q = tr.scalars[qname]
+                    if len(q)!=len(wt):
+                        self.error('quantity {0} trace is not commensurate with weight and steps traces'.format(qname))
+                    #end if
+                    qt[:,n] = q.reshape(len(q))
+                #end for
+                ws,ps,qs = self.sum_by_step(st,wt,qt)
+            else:
+                # stream slabs of the traces directly from the file
+                quantities,ws,ps,qs = self.stream_sum_by_step(chunk_rows)
             #end if
             #recompute steps (can vary for vmc w/ samples/samples_per_thread)
-            steps = st.max()+1
+            steps = len(ws)
             steps_per_block = steps//blocks
-            # accumulate weights into steps and blocks
-            ws   = zeros((steps,))
-            wb   = zeros((blocks,))
-            for t in range(len(wt)):
-                ws[st[t]] += wt[t]
-            #end for
-            s = 0
-            for b in range(blocks):
-                wb[b] = ws[s:s+steps_per_block].sum()
-                s+=steps_per_block
-            #end for            
-            # accumulate walker population into steps
-            ps  = zeros((steps,))
-            for t in range(len(wt)):
-                ps[st[t]] += 1
-            #end for
-            # accumulate quantities into steps and blocks
+            # accumulate steps into blocks
+            nbsteps = blocks*steps_per_block
+            wb = ws[:nbsteps].reshape(blocks,steps_per_block).sum(1)
+            qb = qs[:nbsteps].reshape(blocks,steps_per_block,len(quantities)).sum(1)
             scalars_by_step  = obj(Weight=ws,NumOfWalkers=ps)
             scalars_by_block = obj(Weight=wb)
-            qs   = zeros((steps,))
-            qb   = zeros((blocks,))
-            quantities = set(tr.scalars.keys())
-            quantities.remove('weight')
-            for qname in quantities:
-                qt = tr.scalars[qname]
-                if len(qt)!=len(wt):
-                    self.error('quantity {0} trace is not commensurate with weight and steps traces'.format(qname))
-                #end if
-                qs[:] = 0
-                for t in range(len(wt)):
-                    qs[st[t]] += wt[t]*qt[t]
-                #end for
-                qb[:] = 0
-                s=0
-                for b in range(blocks):
-                    qb[b] = qs[s:s+steps_per_block].sum()
-                    s+=steps_per_block
-                #end for
-                qb = qb/wb
-                qs = qs/ws
-                scalars_by_step[qname]  = qs.copy()
-                scalars_by_block[qname] = qb.copy()
+            for n,qname in enumerate(quantities):
+                scalars_by_step[qname]  = qs[:,n]/ws
+                scalars_by_block[qname] = qb[:,n]/wb
             #end for
             self.scalars_by_step  = scalars_by_step
             self.scalars_by_block = scalars_by_block
@@ -1121,12 +1095,186 @@ class TracesFileHDF(QAobject):
     #end def accumulate_scalars
 
 
-    def form_diagnostic_data(self,tol=1e-8):
+    @staticmethod
+    def sum_by_step(st,wt,qt,steps=None):
+        # sum weights, walker counts, and weighted quantities over 
+        # walkers at each step in a single pass over all trace rows
+        if steps is None:
+            steps = st.max()+1
+        #end if
+        ws = np.bincount(st,weights=wt,minlength=steps)
+        ps = np.bincount(st,minlength=steps).astype(float)
+        qs = zeros((steps,qt.shape[1]))
+        if len(st)>0:
+            if (st[1:]<st[:-1]).any():
+                order = np.argsort(st,kind='stable')
+                st = st[order]
+                wt = wt[order]
+                qt = qt[order]
+            #end if
+            starts = np.flatnonzero(np.concatenate(([True],st[1:]!=st[:-1])))
+            qs[st[starts]] = np.add.reduceat(wt[:,np.newaxis]*qt,starts,axis=0)
+        #end if
+        return ws,ps,qs
+    #end def sum_by_step
+
+
+    def open_stream(self):
+        filepath = self.info.filepath
+        if filepath is None:
+            self.error('cannot stream traces data, filepath has not been defined')
+        #end if
+        import h5py
+        return h5py.File(filepath,'r')
+    #end def open_stream
+
+
+    @staticmethod
+    def read_layout(h,name):
+        # read the column layout of an int_data/real_data buffer 
+        # without touching the traces themselves
+        layout = obj()
+        for dname,fdomain in h[name]['layout'].items():
+            domain = obj()
+            for qname,fquantity in fdomain.items():
+                q = obj()
+                for vname,value in fquantity.items():
+                    q[vname] = np.array(value).ravel()
+                #end for
+                for vname in ('row_start','row_end','dimension','unit_size'):
+                    q[vname] = int(q[vname][0])
+                #end for
+                domain[qname] = q
+            #end for
+            layout[dname] = domain
+        #end for
+        return layout
+    #end def read_layout
+
+
+    @staticmethod
+    def read_columns(traces,r,chunk_rows,columns):
+        # read a slab of rows restricted to the given columns, 
+        # returning the slab and the position of each column in it
+        cols = sorted(set(columns))
+        slab = traces[r:r+chunk_rows,cols]
+        pos  = dict([(c,n) for n,c in enumerate(cols)])
+        return slab,pos
+    #end def read_columns
+
+
+    def stream_sum_by_step(self,chunk_rows):
+        # read only the step, weight, and scalar quantity columns of the 
+        # traces in slabs of chunk_rows rows rather than the full buffer
+        h = self.open_stream()
+        ilayout = self.read_layout(h,'int_data').scalars
+        rlayout = self.read_layout(h,'real_data').scalars
+        istep   = ilayout.step.row_start
+        iweight = rlayout.weight.row_start
+        quantities = sorted(set(rlayout.keys())-set(['weight']))
+        iquant  = [rlayout[qname].row_start for qname in quantities]
+        itraces = h['int_data']['traces']
+        rtraces = h['real_data']['traces']
+        nrows = len(rtraces)
+        if len(itraces)!=nrows:
+            self.error('weight and steps traces have different lengths')
+        #end if
+        ws = zeros((0,))
+        ps = zeros((0,))
+        qs = zeros((0,len(quantities)))
+        for r in range(0,nrows,chunk_rows):
+            st = itraces[r:r+chunk_rows,istep]
+            if len(st)==0:
+                continue
+            #end if
+            rt,pos = self.read_columns(rtraces,r,chunk_rows,[iweight]+iquant)
+            wt = rt[:,pos[iweight]]
+            qt = rt[:,[pos[c] for c in iquant]]
+            steps = st.max()+1
+            if steps<len(ws):
+                steps = len(ws)
+            #end if
+            cws,cps,cqs = self.sum_by_step(st,wt,qt,steps)
+            cws[:len(ws)] += ws
+            cps[:len(ps)] += ps
+            cqs[:len(qs)] += qs
+            ws,ps,qs = cws,cps,cqs
+        #end for
+        h.close()
+        return quantities,ws,ps,qs
+    #end def stream_sum_by_step
+
+
+    def stream_check_particle_sums(self,tol,chunk_rows):
+        # compare scalar traces with sums over per-particle traces, 
+        # reading only the involved columns in slabs of chunk_rows rows
+        h = self.open_stream()
+        layout = self.read_layout(h,'real_data')
+        other_names = []
+        for dname,domain in layout.items():
+            if dname!='scalars':
+                other_names.extend(domain.keys())
+            #end if
+        #end for
+        sum_names = sorted(set(layout.scalars.keys()) & set(other_names))
+        parts   = obj()
+        columns = []
+        for qname in sum_names:
+            columns.append(layout.scalars[qname].row_start)
+            qparts = []
+            for dname,domain in layout.items():
+                if dname!='scalars' and qname in domain:
+                    q = domain[qname]
+                    shape = list(q.shape[0:q.dimension])
+                    if q.unit_size!=1:
+                        shape.append(q.unit_size)
+                    #end if
+                    qparts.append((list(range(q.row_start,q.row_end)),shape))
+                    columns.extend(range(q.row_start,q.row_end))
+                #end if
+            #end for
+            parts[qname] = qparts
+        #end for
+        rtraces = h['real_data']['traces']
+        nrows = len(rtraces)
+        same = True
+        if len(columns)>0:
+            for r in range(0,nrows,chunk_rows):
+                rt,pos = self.read_columns(rtraces,r,chunk_rows,columns)
+                n = len(rt)
+                for qname in sum_names:
+                    q  = rt[:,pos[layout.scalars[qname].row_start]]
+                    qs = zeros((n,))
+                    for cols,shape in parts[qname]:
+                        quantity = rt[:,[pos[c] for c in cols]]
+                        quantity.shape = tuple([n]+shape)
+                        tqs = quantity.sum(1)
+                        if len(tqs.shape)==1:
+                            qs += tqs
+                        else:
+                            qs += tqs[:,0]
+                        #end if
+                    #end for
+                    same = same and (abs(q-qs)<tol).all()
+                #end for
+            #end for
+        #end if
+        h.close()
+        return same
+    #end def stream_check_particle_sums
+
+
+    def form_diagnostic_data(self,tol=1e-8,chunk_rows=None):
         if not self.formed_diagnostic_data():
-            self.load()
-            self.accumulate_scalars()
-            self.check_particle_sums(tol=tol)
-            self.unload()
+            if chunk_rows is None:
+                self.load()
+                self.accumulate_scalars()
+                self.check_particle_sums(tol=tol)
+                self.unload()
+            else:
+                self.accumulate_scalars(chunk_rows=chunk_rows)
+                self.check_particle_sums(tol=tol,chunk_rows=chunk_rows)
+            #end if
         #end if
     #end def form_diagnostic_data
 #end class TracesFileHDF
@@ -1170,9 +1318,9 @@ class TracesAnalyzer(QAanalyzer):
     #end def load_data_local
 
 
-    def form_diagnostic_data(self):
+    def form_diagnostic_data(self,chunk_rows=None):
         for trace_file in self.data:
-            trace_file.form_diagnostic_data()
+            trace_file.form_diagnostic_data(chunk_rows=chunk_rows)
         #end for
     #end def form_diagnostic_data
 
@@ -1486,6 +1634,8 @@ class DMSettings(QAobject):
         self.occ_tol   = 1e-3
         self.coup_tol  = 1e-4
         self.stat_tol  = 2.0
+        self.hermitian = False
+        self.threads   = 1
         if ds!=None:
             for name,value in ds.items():
                 if not name in self:
@@ -1501,7 +1651,10 @@ class DMSettings(QAobject):
 
 class DensityMatricesAnalyzer(HDFAnalyzer):
 
-    allowed_settings = ['save_data','jackknife','diagonal','occ_tol','coup_tol','stat_tol']
+    allowed_settings = ['save_data','jackknife','diagonal','occ_tol','coup_tol','stat_tol','hermitian','threads']
+
+    # memory budget for each chunk of matrices diagonalized at once
+    eig_chunk_bytes = 2**27
 
     def __init__(self,name,nindent=0):
         HDFAnalyzer.__init__(self)
@@ -1559,6 +1712,8 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
         occ_tol   = ds.occ_tol  
         coup_tol  = ds.coup_tol 
         stat_tol  = ds.stat_tol 
+        hermitian = ds.hermitian
+        threads   = ds.threads
 
         nbe = QAanalyzer.method_info.nblocks_exclude
         self.info.nblocks_exclude = nbe
@@ -1592,12 +1747,7 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
                 md_all = species_data.value
                 mdata  = md_all[nbe:,...] 
             
-                tdata = zeros((len(md_all),))
-                b = 0
-                for mat in md_all:
-                    tdata[b] = trace(mat).real # trace sums to N-elec (real)
-                    b+=1
-                #end for
+                tdata = np.einsum('bii->b',md_all).real # trace sums to N-elec (real)
                 t,tvar,terr,tkap = simstats(tdata[nbe:])
                 msres.trace        = t
                 msres.trace_error  = terr
@@ -1608,12 +1758,7 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
                 #end if
 
                 if diagonal:
-                    ddata = empty(mdata.shape[0:2],dtype=mdata.dtype)
-                    b = 0
-                    for mat in mdata:
-                        ddata[b] = diag(mat)
-                        b+=1
-                    #end for
+                    ddata = np.einsum('bii->bi',mdata)
                     d,dvar,derr,dkap = simstats(ddata.transpose())
                     msres.set(
                         eigval  = d,
@@ -1652,11 +1797,8 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
                             self.warn('number matrix fewer occupied states than particles')
                             sig_states = arange(nstates)
                         #end if
-                        sig_occ = empty((nstates,nstates),dtype=bool)
-                        sig_occ[:,:] = False
-                        for s in sig_states:
-                            sig_occ[s,sig_states] = True
-                        #end for
+                        sig_occ = zeros((nstates,nstates),dtype=bool)
+                        sig_occ[np.ix_(sig_states,sig_states)] = True
                     #end if
                     # remove states with insignificant occupation
                     mos = m
@@ -1665,25 +1807,23 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
                     merr = merr[sig_occ]
                     merr.shape = nsig,nsig
                     # remove off-diagonal elements with insignificant coupling
-                    insig_coup = ones(m.shape,dtype=bool)
-                    for i in range(nsig):
-                        for j in range(nsig):
-                            mdiag = min((abs(m[i,i]),abs(m[j,j])))
-                            insig_coup[i,j] = abs(m[i,j])/mdiag < coup_tol
-                        #end for
-                    #end for
+                    mdiag = abs(diag(m))
+                    mdiag = np.minimum.outer(mdiag,mdiag)
+                    insig_coup = abs(m)/mdiag < coup_tol
                     # remove elements with insignificant statistical deviation from zero
                     insig_stat = abs(m)/merr < stat_tol
                     # remove insignificant elements
                     insig_coup_stat = insig_coup | insig_stat
-                    for i in range(nsig):
-                        insig_coup_stat[i,i] = False
-                    #end for
+                    insig_coup_stat[arange(nsig),arange(nsig)] = False
                     moi = m.copy()
                     m[insig_coup_stat] = 0.0
 
                     # obtain standard eigenvalue estimates
                     eigval,eigvec = eig(m)
+                    if hermitian:
+                        # match the ordering of the jackknife eigenvalues
+                        eigval,eigvec = self.ascending_eigenvalues(eigval,eigvec)
+                    #end if
 
                     # save common results
                     msres.set(
@@ -1702,24 +1842,19 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
 
                     if jackknife:
                         # obtain jackknife eigenvalue estimates
+                        #   all jackknife matrices are formed as a single stack
                         nblocks  = len(mdata)
-                        mjdata   = zeros((nblocks,nsig,nsig),dtype=mdata.dtype)
-                        eigsum   = zeros((nsig,),dtype=mdata.dtype)
-                        eigsum2r = zeros((nsig,),dtype=mdata.dtype)
-                        eigsum2i = zeros((nsig,),dtype=mdata.dtype)
                         i = complex(0,1)
                         nb = float(nblocks)
-                        for b in range(nblocks):
-                            mb = mdata[b,...][sig_occ]
-                            mb.shape = nsig,nsig
-                            mb[insig_coup_stat] = 0.0
-                            mj = (nb*m-mb)/(nb-1)
-                            mjdata[b,...] = mj
-                            d,v = eig(mj)
-                            eigsum   += d
-                            eigsum2r += real(d)**2
-                            eigsum2i += imag(d)**2
-                        #end for
+                        mb = mdata[:,sig_occ]
+                        mb.shape = nblocks,nsig,nsig
+                        mb[:,insig_coup_stat] = 0.0
+                        mjdata = (nb*m-mb)/(nb-1)
+                        del mb
+                        d = self.stacked_eigenvalues(mjdata,hermitian=hermitian,threads=threads)
+                        eigsum   = d.sum(0)
+                        eigsum2r = (real(d)**2).sum(0)
+                        eigsum2i = (imag(d)**2).sum(0)
                         eigmean = eigsum/nb
                         esr = real(eigsum)
                         esi = imag(eigsum)
@@ -1738,6 +1873,9 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
                             # obtain general eigenvalue estimates
                             em = m
                             geigval,geigvec = eig(em,nm)
+                            if hermitian:
+                                geigval,geigvec = self.ascending_eigenvalues(geigval,geigvec)
+                            #end if
                             # get occupations of  eigenvectors
                             eigocc  = zeros((nsig,),dtype=mdata.dtype)
                             geigocc = zeros((nsig,),dtype=mdata.dtype)
@@ -1749,15 +1887,10 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
                             #end for
                             # obtain jackknife estimates of generalized eigenvalues
                             emjdata = mjdata
-                            eigsum[:]   = 0.0
-                            eigsum2r[:] = 0.0
-                            eigsum2i[:] = 0.0
-                            for b in range(nblocks):
-                                d,v = eig(emjdata[b,...],nmjdata[b,...])
-                                eigsum   += d
-                                eigsum2r += real(d)**2
-                                eigsum2i += imag(d)**2
-                            #end for
+                            d = self.stacked_eigenvalues(emjdata,nmjdata,hermitian=hermitian,threads=threads)
+                            eigsum   = d.sum(0)
+                            eigsum2r = (real(d)**2).sum(0)
+                            eigsum2i = (imag(d)**2).sum(0)
                             geigmean = eigsum/nb
                             esr = real(eigsum)
                             esi = imag(eigsum)
@@ -1782,6 +1915,72 @@ class DensityMatricesAnalyzer(HDFAnalyzer):
     #end def analyze_local
 
 
+    def ascending_eigenvalues(self,eigval,eigvec=None):
+        # order eigenvalues (and eigenvector columns) by ascending real 
+        # part, as returned by eigvalsh in the hermitian case
+        order = np.argsort(real(eigval),axis=-1,kind='stable')
+        eigval = np.take_along_axis(eigval,order,axis=-1)
+        if eigvec is None:
+            return eigval
+        else:
+            return eigval,eigvec[:,order]
+        #end if
+    #end def ascending_eigenvalues
+
+
+    def stacked_eigenvalues(self,a,b=None,hermitian=False,threads=None):
+        # eigenvalues of a stack of matrices a (generalized if b is given)
+        #   the stack is diagonalized in memory bounded chunks, 
+        #   optionally spread over a pool of threads
+        #   if hermitian, eigenvalues are in ascending order on all paths
+        nmat = len(a)
+        chunk = self.eig_chunk_bytes//a[0].nbytes
+        if threads is not None and threads>1:
+            # at least one chunk per thread
+            chunk = min([chunk,ceil(float(nmat)/threads)])
+        #end if
+        chunk = int(max([1,chunk]))
+        def eigvals(r):
+            ac = a[r:r+chunk]
+            if b is None:
+                if hermitian:
+                    return np.linalg.eigvalsh(ac)
+                else:
+                    return np.linalg.eigvals(ac)
+                #end if
+            #end if
+            bc = b[r:r+chunk]
+            if hermitian:
+                # reduce to a standard problem via Cholesky: L^-1 a L^-H
+                try:
+                    L = np.linalg.cholesky(bc)
+                    x = np.linalg.solve(L,ac)
+                    x = np.linalg.solve(L,x.conj().swapaxes(-1,-2))
+                    return np.linalg.eigvalsh(x.conj().swapaxes(-1,-2))
+                except LinAlgError:
+                    None # b not positive definite, use the general solver
+                #end try
+            #end if
+            # QZ per matrix preserves the eigenvalue ordering of eig(a,b)
+            d = array([eig(ab,bb)[0] for ab,bb in zip(ac,bc)])
+            if hermitian:
+                d = self.ascending_eigenvalues(d)
+            #end if
+            return d
+        #end def eigvals
+        ranges = range(0,nmat,chunk)
+        if threads is not None and threads>1 and len(ranges)>1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(threads) as executor:
+                evals = list(executor.map(eigvals,ranges))
+            #end with
+        else:
+            evals = [eigvals(r) for r in ranges]
+        #end if
+        return concatenate(evals)
+    #end def stacked_eigenvalues
+
+
     def analyze_local_orig(self):
         nbe = QAanalyzer.method_info.nblocks_exclude
         self.info.nblocks_exclude = nbe
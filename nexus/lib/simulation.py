@@ -269,6 +269,9 @@ class Simulation(NexusCore):
     sim_directories = dict()
     all_sims = []
 
+    # records progress calls, see CascadeIndex in project_manager.py
+    progress_observer = None
+
 
     @classmethod
     def clear_all_sims(cls):
@@ -1215,8 +1218,18 @@ class Simulation(NexusCore):
 
 
     def progress(self,dependency_id=None):
+        observer = Simulation.progress_observer
+        if observer is not None:
+            observer.visit(self)
+        #end if
         if dependency_id is not None:
-            self.wait_ids.remove(dependency_id)
+            if observer is None:
+                self.wait_ids.remove(dependency_id)
+            else:
+                # wait ids persist across event driven polls, so a
+                # dependency may be reported again once it has cleared
+                self.wait_ids.discard(dependency_id)
+            #end if
         #end if
         if len(self.wait_ids)==0 and not self.block and not self.failed:
             modes = nexus_core.modes
@@ -1285,7 +1298,11 @@ class Simulation(NexusCore):
                 #end if
                 progress = self.finished
             #end if
-            if progress and not self.block_subcascade and not self.failed:
+            propagate = progress and not self.block_subcascade and not self.failed
+            if observer is not None:
+                observer.reach(self,propagate)
+            #end if
+            if propagate:
                 for sim in self.dependents:
                     if not sim.bundled:
                         sim.progress(self.simid)
@@ -1306,6 +1323,9 @@ class Simulation(NexusCore):
                     self.send_files()
                 #end if
             #end if
+            if observer is not None:
+                observer.reach(self,False)
+            #end if
         #end if
     #end def progress
 
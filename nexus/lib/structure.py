@@ -125,6 +125,7 @@ from numpy import abs,all,append,arange,around,array,atleast_2d,ceil,cos,cross,c
 from numpy.linalg import inv,det,norm
 from unit_converter import convert
 from numerics import nearest_neighbors,convex_hull,voronoi_neighbors
+from numerics import chunk_ranges,periodic_pairs,scipy_unavailable
 from periodic_table import pt,is_element
 from fileio import XsfFile,PoscarFile
 from generic import obj
@@ -2568,25 +2569,31 @@ class Structure(Sobj):
                     #end if
                 #end for
             #end if
-            # get neighbor table for subset of atoms specified by indices
-            nt,dt = self.neighbor_table(pos,pos,distances=True)
-            # determine how many neighbors to consider based on rmax (all are neighbors if rmax is None)
-            nneigh = zeros((np,),dtype=int)
-            if len(spec_max)>0:
-                for n in range(np):
-                    nneigh[n] = min(spec_max[self.elem[n]],len(nt[n]))
+            if len(spec_max)==0 and rmax is not None:
+                # only neighbors within the cutoff are found (first is self)
+                for nilist in self.neighbors_within(rmax,pos,pos):
+                    neigh_table.append(nilist[1:])
                 #end for
-            elif rmax is None:
-                nneigh[:] = np
             else:
-                nneigh = (dt<rmax).sum(1)                    
+                # get neighbor table for subset of atoms specified by indices
+                nt,dt = self.neighbor_table(pos,pos,distances=True)
+                # determine how many neighbors to consider (all are neighbors if rmax is None)
+                nneigh = zeros((np,),dtype=int)
+                if len(spec_max)>0:
+                    for n in range(np):
+                        nneigh[n] = min(spec_max[self.elem[n]],len(nt[n]))
+                    #end for
+                else:
+                    nneigh[:] = np
+                #end if
+                for i in range(np):
+                    neigh_table.append(nt[i,1:nneigh[i]])
+                #end for
+                del nt,dt,nneigh
             #end if
-            for i in range(np):
-                neigh_table.append(nt[i,1:nneigh[i]])
-            #end for
-            del nt,dt,nneigh,elem,spec,rmax
+            del elem,spec,rmax
         #end if
-        neigh_table = array(neigh_table,dtype=int)
+        neigh_table = [array(nilist,dtype=int) for nilist in neigh_table]
         # record which atoms are neighbors to each other
         neigh_pairs = set()
         if actual_indices:
@@ -2844,7 +2851,7 @@ class Structure(Sobj):
     #end def min_image_centroids
     
     
-    def min_image_vectors(self,points=None,points2=None,axes=None,pairs=True):
+    def min_image_points(self,points=None,points2=None,axes=None):
         if points is None:
             points = self.pos
         elif isinstance(points,Structure):
@@ -2853,57 +2860,68 @@ class Structure(Sobj):
         if axes is None:
             axes  = self.axes
         #end if
-        axinv = inv(axes)
-        points = array(points)
-        single = points.shape==(self.dim,)
-        if single:
-            points = [points]
+        points = array(points,dtype=float)
+        if points.shape==(self.dim,):
+            points = points.reshape(1,self.dim)
         #end if
         if points2 is None:
             points2 = self.pos
         elif isinstance(points2,Structure):
             points2 = points2.pos
-        elif points2.shape==(self.dim,):
-            points2 = [points2]
         #end if
+        points2 = array(points2,dtype=float)
+        if points2.shape==(self.dim,):
+            points2 = points2.reshape(1,self.dim)
+        #end if
+        return points,points2,array(axes,dtype=float)
+    #end def min_image_points
+
+
+    def min_image_blocks(self,points,points2,axes):
+        # yield minimum image vectors between blocks of points and all 
+        # of points2, so that temporary memory stays bounded
+        axinv = inv(axes)
+        for i1,i2 in chunk_ranges(len(points),len(points2)*self.dim):
+            u = dot(points2[np.newaxis,:,:]-points[i1:i2,np.newaxis,:],axinv)
+            yield i1,i2,dot(u-floor(u+.5),axes)
+        #end for
+    #end def min_image_blocks
+
+
+    def min_image_vectors(self,points=None,points2=None,axes=None,pairs=True):
+        points,points2,axes = self.min_image_points(points,points2,axes)
         npoints  = len(points)
         npoints2 = len(points2)
         if pairs:
             vtable = empty((npoints,npoints2,self.dim),dtype=float)
-            i=-1
-            for p in points:
-                i+=1
-                j=-1
-                for pp in points2:
-                    j+=1
-                    u = dot(pp-p,axinv)
-                    vtable[i,j] = dot(u-floor(u+.5),axes)
-                #end for
+            for i1,i2,v in self.min_image_blocks(points,points2,axes):
+                vtable[i1:i2] = v
             #end for
             result = vtable
         else:
             if npoints!=npoints2:
                 self.error('cannot create one to one minimum image vectors, point sets differ in length\n  npoints1 = {0}\n  npoints2 = {1}'.format(npoints,npoints2))
             #end if
-            vectors = empty((npoints,self.dim),dtype=float)
-            n = 0
-            for p in points:
-                pp = points2[n]
-                u = dot(pp-p,axinv)
-                vectors[n] = dot(u-floor(u+.5),axes)
-                n+=1
-            #end for
-            result = vectors
+            u = dot(points2-points,inv(axes))
+            result = dot(u-floor(u+.5),axes)
         #end if
-                
         return result
     #end def min_image_vectors
 
 
     def min_image_distances(self,points=None,points2=None,axes=None,vectors=False,pairs=True):
-        vtable = self.min_image_vectors(points,points2,axes,pairs=pairs)
-        rdim = len(vtable.shape)-1
-        dtable = sqrt((vtable**2).sum(rdim))
+        if vectors or not pairs:
+            vtable = self.min_image_vectors(points,points2,axes,pairs=pairs)
+            rdim = len(vtable.shape)-1
+            dtable = sqrt((vtable**2).sum(rdim))
+        else:
+            # distances only, the full vector table is never formed
+            points,points2,axes = self.min_image_points(points,points2,axes)
+            dtable = empty((len(points),len(points2)),dtype=float)
+            for i1,i2,v in self.min_image_blocks(points,points2,axes):
+                dtable[i1:i2] = sqrt((v**2).sum(2))
+            #end for
+        #end if
         if not vectors:
             return dtable
         else:
@@ -2923,22 +2941,19 @@ class Structure(Sobj):
 
     
     def neighbor_table(self,points=None,points2=None,axes=None,distances=False,vectors=False):
-        dtable,vtable = self.min_image_distances(points,points2,axes,vectors=True)
-        ntable = empty(dtable.shape,dtype=int)
-        for i in range(len(dtable)):
-            ntable[i] = dtable[i].argsort()
-        #end for
+        if vectors:
+            dtable,vtable = self.min_image_distances(points,points2,axes,vectors=True)
+        else:
+            dtable = self.min_image_distances(points,points2,axes)
+        #end if
+        ntable = dtable.argsort(1)
         results = [ntable]
         if distances:
-            for i in range(len(dtable)):
-                dtable[i] = dtable[i][ntable[i]]
-            #end for
+            dtable = np.take_along_axis(dtable,ntable,1)
             results.append(dtable)
         #end if
         if vectors:
-            for i in range(len(vtable)):
-                vtable[i] = vtable[i][ntable[i]]
-            #end for
+            vtable = np.take_along_axis(vtable,ntable[:,:,np.newaxis],1)
             results.append(vtable)
         #end if
         if len(results)==1:
@@ -2948,6 +2963,47 @@ class Structure(Sobj):
     #end def neighbor_table
 
 
+    # find neighbors within a cutoff radius
+    #   returns, for each point, indices into points2 ordered by distance
+    #   (includes the point itself if points2 contains it)
+    #   a periodic KD-tree is used if available, otherwise the minimum 
+    #   image distances are scanned in blocks
+    #   matches minimum image results exactly for rmax<rinscribe
+    def neighbors_within(self,rmax,points=None,points2=None,axes=None,distances=False):
+        points,points2,axes = self.min_image_points(points,points2,axes)
+        npoints = len(points)
+        if not scipy_unavailable and self.dim==3:
+            i,j,d,v = periodic_pairs(points,points2,axes,rmax)
+            inside = d<rmax
+            i,j,d = i[inside],j[inside],d[inside]
+        else:
+            ilist = [zeros((0,),dtype=int)]
+            jlist = [zeros((0,),dtype=int)]
+            dlist = [zeros((0,),dtype=float)]
+            for i1,i2,v in self.min_image_blocks(points,points2,axes):
+                dt = sqrt((v**2).sum(2))
+                ii,jj = (dt<rmax).nonzero()
+                ilist.append(ii+i1)
+                jlist.append(jj)
+                dlist.append(dt[ii,jj])
+            #end for
+            i = np.concatenate(ilist).astype(int)
+            j = np.concatenate(jlist).astype(int)
+            d = np.concatenate(dlist)
+            order = np.lexsort((d,i))
+            i,j,d = i[order],j[order],d[order]
+        #end if
+        bounds = np.searchsorted(i,arange(npoints+1))
+        neighbors = [j[bounds[n]:bounds[n+1]] for n in range(npoints)]
+        if not distances:
+            return neighbors
+        else:
+            dist = [d[bounds[n]:bounds[n+1]] for n in range(npoints)]
+            return neighbors,dist
+        #end if
+    #end def neighbors_within
+
+
     # test needed
     def min_image_norms(self,points,norms):
         if isinstance(norms,int) or isinstance(norms,float):
@@ -3099,6 +3155,18 @@ class Structure(Sobj):
         if voronoi:
             neighbors = self.voronoi_neighbors(indices=indices,restrict=restrict)
             dt = self.distance_table(pos,pos2)[:,1:]
+        elif rmax is not None:
+            # only neighbors within the cutoff are found (first is self)
+            neighbors,dist = self.neighbors_within(rmax,pos,pos2,distances=True)
+            for i in range(len(indices)):
+                neighbors[i] = indices[neighbors[i][1:]]
+                dist[i]      = dist[i][1:]
+            #end for
+            if not distances:
+                return neighbors
+            else:
+                return neighbors,dist
+            #end if
         else:
             nt,dt = self.neighbor_table(pos,pos2,distances=True)
             dt=dt[:,1:]
@@ -540,6 +540,8 @@ core_keys = [
     'stages_set',
     'status',
     'sleep',
+    'max_sleep',
+    'event_driven',
     'file_locations',
     'pseudo_dir',
     'pseudopotentials',
@@ -1,6 +1,6 @@
 
 import testing
-from testing import value_eq,object_eq
+from testing import value_eq,object_eq,failed,FailedTest
 
 
 associated_files = dict()
@@ -31,6 +31,7 @@ def test_import():
     from fileio import XsfFile
     from fileio import PoscarFile
     from fileio import ChgcarFile
+    from fileio import read_dat_file
 #end def test_import
 
 
@@ -336,3 +337,119 @@ def test_chgcar_file():
     assert(f2.is_valid())
     assert(object_eq(f2,ref))
 #end def test_chgcar_file
+
+
+
+def test_read_dat_file():
+    import os
+    import numpy as np
+    from fileio import read_dat_file
+
+    tpath = testing.setup_unit_test_output_directory('fileio','test_read_dat_file')
+
+    filepath = os.path.join(tpath,'qmc.s000.scalar.dat')
+    text = '''#   index    LocalEnergy         LocalEnergy_sq      BlockWeight
+         0   -1.0528137704e+01    1.1123320530e+02    1.0240000000e+03
+         1   -1.0531286011e+01    1.1129909547e+02    1.0240000000e+03
+# comment line
+         2   -1.0526418204e+01    1.1119551326e+02    1.0240000000e+03
+         3   -1.0533519822e+01    1.1134665812e+02    1.0240000000e+03'''
+    open(filepath,'w').write(text)
+
+    variables_ref = ['LocalEnergy','LocalEnergy_sq','BlockWeight']
+    data_ref = np.array([
+        [-1.0528137704e+01,-1.0531286011e+01,-1.0526418204e+01,-1.0533519822e+01],
+        [ 1.1123320530e+02, 1.1129909547e+02, 1.1119551326e+02, 1.1134665812e+02],
+        [ 1.0240000000e+03, 1.0240000000e+03, 1.0240000000e+03, 1.0240000000e+03],
+        ])
+
+    # read without cache, parsing in small chunks
+    variables,data = read_dat_file(filepath,cache=False,chunk_size=50)
+    cache_dir = os.path.join(tpath,'.qmc.s000.scalar.dat.cache')
+    assert(not os.path.exists(cache_dir))
+    assert(variables==variables_ref)
+    assert(value_eq(np.array(data),data_ref))
+
+    # caching is opt-in
+    variables,data = read_dat_file(filepath)
+    assert(not os.path.exists(cache_dir))
+    assert(value_eq(np.array(data),data_ref))
+
+    # create cache on first read
+    variables,data = read_dat_file(filepath,cache=True)
+    assert(os.path.exists(os.path.join(cache_dir,'meta.npz')))
+    assert(variables==variables_ref)
+    assert(value_eq(np.array(data),data_ref))
+
+    # reuse cache, file contents are protected from modification
+    variables,data = read_dat_file(filepath,cache=True)
+    assert(isinstance(data[0],np.memmap))
+    data[0][:] = 0.0
+    variables,data = read_dat_file(filepath,cache=True)
+    assert(value_eq(np.array(data),data_ref))
+
+    # cache is refreshed when the file changes
+    open(filepath,'w').write(text.rsplit('\n',1)[0]+'\n')
+    variables,data = read_dat_file(filepath,cache=True)
+    assert(variables==variables_ref)
+    assert(value_eq(np.array(data),data_ref[:,:3]))
+
+    # unparsable values are not silently truncated
+    bad_text = text.replace('1.1119551326e+02','***************')
+    for chunk_size in (50,1<<24):
+        open(filepath,'w').write(bad_text)
+        try:
+            read_dat_file(filepath,chunk_size=chunk_size)
+            raise FailedTest
+        except FailedTest:
+            failed()
+        except ValueError:
+            None
+        #end try
+    #end for
+
+    # rows must match the number of header columns
+    open(filepath,'w').write(text.replace('    1.0240000000e+03',''))
+    try:
+        read_dat_file(filepath)
+        raise FailedTest
+    except FailedTest:
+        failed()
+    except ValueError:
+        None
+    #end try
+#end def test_read_dat_file
+
+
+
+def test_write_columns():
+    import numpy as np
+    from io import StringIO
+    from fileio import write_columns
+
+    a = 0.5*np.arange(7,dtype=float)
+    b = -0.25*np.arange(1,4,dtype=float)
+
+    # reference row formatting
+    vals = list(a)+list(b)
+    text_ref = ''
+    n = 0
+    for v in vals:
+        if n%4==0:
+            text_ref += '\n    '
+        #end if
+        text_ref += ' {0:12.8f}'.format(v)
+        n+=1
+    #end for
+
+    # rows continue across arrays and chunks
+    for chunk_rows in (1,2,100):
+        f = StringIO()
+        write_columns(f,[a,b],' %12.8f',4,head='\n    ',chunk_rows=chunk_rows)
+        assert(f.getvalue()==text_ref)
+    #end for
+
+    f = StringIO()
+    write_columns(f,[a],'%6.2f',3,tail='\n')
+    assert(f.getvalue()=='  0.00  0.50  1.00\n  1.50  2.00  2.50\n  3.00')
+#end def test_write_columns
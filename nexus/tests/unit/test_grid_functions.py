@@ -1413,3 +1413,60 @@ def test_grid_function_initialization():
     #end for
 
 #end def test_grid_function_initialization
+
+
+
+def test_read_from_points():
+    import os
+    import numpy as np
+    import testing
+    from testing import value_eq
+    from grid_functions import ParallelotopeGrid
+    from grid_functions import ParallelotopeGridFunction
+    from grid_functions import parallelotope_grid_function
+
+    tpath = testing.setup_unit_test_output_directory('grid_functions','test_read_from_points')
+
+    axes = np.array([[1.0,0.0,0.0],
+                     [0.5,1.0,0.0],
+                     [0.2,0.3,1.5]])
+    grid = ParallelotopeGrid(
+        shape    = (5,4,3),
+        axes     = axes,
+        corner   = (0.3,-0.2,0.1),
+        centered = False,
+        )
+    values = np.arange(grid.npoints,dtype=float).reshape(grid.npoints,1)
+
+    # scramble the point order
+    order  = np.arange(grid.npoints)[::-1]
+    order  = np.concatenate([order[::2],order[1::2]])
+    points = grid.points[order]
+
+    for chunk_size in (None,7):
+        gf = ParallelotopeGridFunction()
+        gf.read_from_points(points,values[order],axes,chunk_size=chunk_size)
+        assert(gf.valid())
+        assert(tuple(gf.grid.shape)==(5,4,3))
+        assert(value_eq(gf.grid.points,grid.points))
+        assert(value_eq(gf.values,values))
+    #end for
+
+    # average repeated points, read from memory-mapped files
+    points2 = np.concatenate([points,points[:10]])
+    values2 = np.concatenate([values[order],values[order][:10]+10.0])
+    pfile = os.path.join(tpath,'points.npy')
+    vfile = os.path.join(tpath,'values.npy')
+    np.save(pfile,points2)
+    np.save(vfile,values2)
+    gf = parallelotope_grid_function(
+        points     = pfile,
+        values     = vfile,
+        axes       = axes,
+        average    = True,
+        chunk_size = 9,
+        )
+    ref = values.copy()
+    ref[order[:10]] += 5.0
+    assert(value_eq(gf.values,ref))
+#end def test_read_from_points
@@ -78,4 +78,67 @@ if h5py_available:
         check_groups(h.group1)
         check_groups(h.group2)
     #end def test_read
+
+
+
+    def test_read_lazy():
+        import os
+        import pickle
+        import numpy as np
+        import h5py
+        from hdfreader import read_hdf,read_lazy,HDFdataset
+
+        path = testing.setup_unit_test_output_directory('hdfreader','test_read_lazy')
+
+        dv  = np.arange(60,dtype=np.float64).reshape(5,4,3)
+        dv2 = dv**2
+        di  = np.arange(10,dtype=np.int64)
+
+        testfile = os.path.join(path,'test.h5')
+        f = h5py.File(testfile,'w')
+        g = f.create_group('density')
+        g.create_dataset('value',data=dv)
+        g.create_dataset('value_squared',data=dv2)
+        f.create_dataset('idata',data=di)
+        f.close()
+
+        h = read_hdf(testfile,lazy=True)
+
+        v = h.density.value
+        assert(isinstance(v,HDFdataset))
+        assert(isinstance(h.idata,HDFdataset))
+
+        # metadata and hyperslabs do not read the full dataset
+        assert(v.shape==dv.shape)
+        assert(v.ndim==3)
+        assert(len(v)==5)
+        assert(not v.loaded())
+        assert(value_eq(v[1:3,:,0],dv[1:3,:,0]))
+        assert(not v.loaded())
+
+        # array access reads and caches the data
+        assert(value_eq(v.mean(0),dv.mean(0)))
+        assert(v.loaded())
+        assert(value_eq(v+1,dv+1))
+        assert(value_eq(np.array(v),dv))
+        assert(value_eq(v[::-1,0,0],dv[::-1,0,0]))
+
+        # explicit release drops the data until next access
+        h.release_arrays()
+        assert(not v.loaded())
+        assert(value_eq(v.sum(),dv.sum()))
+
+        # uncached datasets are reread on each access
+        hn = read_hdf(testfile,lazy=True,cache=False)
+        assert(value_eq(hn.density.value_squared.sum(0),dv2.sum(0)))
+        assert(not hn.density.value_squared.loaded())
+
+        # proxies can be pickled and materialized
+        h = pickle.loads(pickle.dumps(h))
+        read_lazy(h)
+        assert(isinstance(h.density.value,np.ndarray))
+        assert(value_eq(h.density.value,dv))
+        assert(value_eq(h.density.value_squared,dv2))
+        assert(value_eq(h.idata,di))
+    #end def test_read_lazy
 #end if
@@ -17,9 +17,11 @@ def test_import():
     from numerics import jackknife,jackknife_aux,check_jackknife_inputs
     from numerics import ndgrid
     from numerics import simstats,simplestats,equilibration_length,ttest
+    from numerics import autocorrelation,autocorrelation_time,StreamingStats
     from numerics import surface_normals,simple_surface
     from numerics import func_fit
     from numerics import distance_table,nearest_neighbors,voronoi_neighbors
+    from numerics import chunk_ranges,periodic_pairs
     from numerics import convex_hull
 
 #end def test_import
@@ -374,6 +376,88 @@ def test_simstats():
 
 
 
+def test_autocorrelation():
+    import numpy as np
+    from testing import value_eq
+    from numerics import autocorrelation,autocorrelation_time,simstats
+
+    # correlated stream: running average of the random stream
+    n = len(rstream)
+    cstream = np.array([rstream[max(0,i-4):i+1].mean() for i in range(n)])
+
+    x = np.array([rstream,cstream,0*rstream+1.0])
+
+    # autocorrelation function agrees with direct summation
+    C = autocorrelation(x)
+    m = x.mean(1)
+    v = x.var(1)
+    for i in (0,1,7,n-1):
+        c_ref = ((x[:2,0:n-i]-m[:2,None])*(x[:2,i:n]-m[:2,None])).sum(1)/(n-i)/v[:2]
+        assert(value_eq(C[:2,i],c_ref))
+    #end for
+    assert(value_eq(C[2],0*C[2]))
+
+    # vectorized and loop implementations agree, regardless of whether
+    # the fft completion of the autocorrelation time is exercised
+    ref = simstats(x,method='loop')
+    for max_direct_lags in (0,2,128):
+        k = autocorrelation_time(x,max_direct_lags=max_direct_lags)
+        assert(value_eq(k,ref[3]))
+    #end for
+    assert(value_eq(float(ref[3][2]),1.0))
+
+    for res,res_ref in zip(simstats(x),ref):
+        assert(value_eq(res,res_ref))
+    #end for
+
+    ref = simstats(cstream,method='loop')
+    for res,res_ref in zip(simstats(cstream),ref):
+        assert(value_eq(float(res),float(res_ref)))
+    #end for
+
+    ref = simstats(x.T,dim=0,method='loop')
+    for res,res_ref in zip(simstats(x.T,dim=0),ref):
+        assert(value_eq(res,res_ref))
+    #end for
+#end def test_autocorrelation
+
+
+
+def test_streaming_stats():
+    import numpy as np
+    from testing import value_eq
+    from numerics import simstats,StreamingStats
+
+    n = len(rstream)
+    cstream = np.array([rstream[max(0,i-4):i+1].mean() for i in range(n)])
+    x = np.array([rstream,cstream-10.0,0*rstream+1.0])
+
+    m_ref,v_ref,e_ref,k_ref = simstats(x,method='loop')
+
+    # accumulate in uneven pieces, round tripping the state each time
+    s = StreamingStats(3)
+    for i1,i2 in [(0,1),(1,5),(5,300),(300,n)]:
+        s.update(x[:,i1:i2])
+        s = StreamingStats(state=s.get_state())
+    #end for
+    m,v,e,k,complete = s.stats()
+
+    assert(complete.all())
+    assert(value_eq(m,m_ref))
+    assert(value_eq(v,v_ref))
+    assert(value_eq(e,e_ref))
+    assert(value_eq(k,k_ref))
+
+    # correlations longer than max_lag are flagged
+    s = StreamingStats(3,max_lag=2)
+    s.update(x)
+    m,v,e,k,complete = s.stats()
+    assert(not complete[1])
+    assert(complete[2])
+#end def test_streaming_stats
+
+
+
 def test_equilibration_length():
     import numpy as np
     from numerics import equilibration_length
@@ -426,6 +510,75 @@ def test_jackknife():
 
 
 
+def test_jackknife_batched():
+    from testing import value_eq
+    from numerics import jackknife,jackknife_aux
+    from generic import obj
+
+    def moments(v):
+        return np.array([v.mean(),(v**2).mean()])
+    #end def moments
+
+    def moments_vec(v):
+        return np.array([v.mean(-1),(v**2).mean(-1)]).T
+    #end def moments_vec
+
+    data = rstream_wide.T
+
+    capture = obj()
+    jm_ref,je_ref = jackknife(data,moments,capture=capture)
+
+    # all samples in a single call
+    jm,je = jackknife(data,moments_vec,vectorized=True)
+    assert(value_eq(jm,jm_ref))
+    assert(value_eq(je,je_ref))
+
+    # samples evaluated in worker processes
+    jm,je = jackknife(data,moments,processes=2)
+    assert(value_eq(jm,jm_ref))
+    assert(value_eq(je,je_ref))
+
+    # derived quantities
+    variance = lambda m: m[...,1]-m[...,0]**2
+    vm_ref,ve_ref = jackknife_aux(capture.jsamples,variance)
+    vm,ve = jackknife_aux(capture.jsamples,variance,vectorized=True)
+    assert(value_eq(vm,vm_ref))
+    assert(value_eq(ve,ve_ref))
+
+    # the jackknifed function may itself call jackknife
+    def nested(v):
+        return jackknife(v[:,None],moments)[0]
+    #end def nested
+    jm,je = jackknife(data,nested)
+    jm_par,je_par = jackknife(data,nested,processes=2)
+    assert(value_eq(jm_par,jm))
+    assert(value_eq(je_par,je))
+#end def test_jackknife_batched
+
+
+
+def test_process_map():
+    from numerics import process_map
+
+    def square(x):
+        return x**2
+    #end def square
+
+    ref = [x**2 for x in range(7)]
+    assert(process_map(square,range(7))==ref)
+    assert(process_map(abs,[-1,2,-3],processes=2)==[1,2,3])
+
+    # errors in workers are raised in the calling process
+    try:
+        process_map(abs,['a',1],processes=2)
+        raise AssertionError('worker error was not raised')
+    except TypeError:
+        None
+    #end try
+#end def test_process_map
+
+
+
 def test_morse():
     from testing import value_eq
     from unit_converter import convert
@@ -446,3 +446,143 @@ a    = $a
 
     Simulation.clear_all_sims()
 #end def test_run_project
+
+
+
+def test_cascade_index():
+    from nexus_base import nexus_core
+    from simulation import Simulation
+    from project_manager import ProjectManager,CascadeIndex
+
+    from test_simulation_module import get_test_workflow,n_test_workflows
+
+    sims = []
+    for n in range(n_test_workflows):
+        sims.extend(get_test_workflow(n).list())
+    #end for
+
+    pm = ProjectManager()
+    pm.add_simulations(sims)
+
+    index = CascadeIndex(pm.progressing_cascades)
+
+    assert(set(index.sims.keys())==set([s.simid for s in sims]))
+    for s in sims:
+        assert(id(index.sims[s.simid])==id(s))
+        assert(index.dependents[s.simid]==[d.simid for d in s.dependents])
+        assert(s.wait_ids==s.dependency_ids)
+    #end for
+    assert(index.ready==set(pm.progressing_cascades.keys()))
+    assert(len(index.inflight)==0)
+    assert(len(index.propagated)==0)
+    assert(index.active())
+
+    # only the ready cascade heads are visited
+    mode = nexus_core.mode
+    nexus_core.mode = nexus_core.modes.none
+    index.poll()
+    nexus_core.mode = mode
+
+    assert(index.visits==len(pm.progressing_cascades))
+    assert(index.visits_total==index.visits)
+    assert(index.polls==1)
+    assert(index.changed==0)
+    assert(index.ready==set(pm.progressing_cascades.keys()))
+    assert(Simulation.progress_observer is None)
+
+    # blocked heads drop out of the index
+    for s in pm.progressing_cascades:
+        s.block = True
+    #end for
+    index.poll()
+    assert(len(index.ready)==0)
+    assert(not index.active())
+
+    # repeated dependency notifications are only tolerated while the
+    # index observes progress, the default cascade passes still fail
+    s = [s for s in sims if len(s.dependency_ids)>0][0]
+    simid = sorted(s.dependency_ids)[0]
+    nexus_core.mode = nexus_core.modes.none
+    Simulation.progress_observer = index
+    try:
+        s.progress(simid)
+        s.progress(simid)
+    finally:
+        Simulation.progress_observer = None
+    #end try
+    assert(simid not in s.wait_ids)
+    s.reset_wait_ids()
+    s.progress(simid)
+    try:
+        s.progress(simid)
+        raise FailedTest
+    except KeyError:
+        None
+    except FailedTest:
+        failed()
+    except Exception as e:
+        failed(str(e))
+    #end try
+    nexus_core.mode = mode
+
+    Simulation.clear_all_sims()
+#end def test_cascade_index
+
+
+
+def test_run_project_event_driven():
+    from nexus_base import nexus_core
+    from simulation import Simulation,input_template
+    from project_manager import ProjectManager
+
+    from test_simulation_module import get_test_workflow,n_test_workflows
+
+    tpath = testing.setup_unit_test_output_directory('project_manager','test_run_project_event_driven',divert=True)
+
+    nexus_core.stages       = list(nexus_core.primary_modes)
+    nexus_core.stages_set   = set(nexus_core.stages)
+    nexus_core.sleep        = 0.1
+    nexus_core.max_sleep    = 0.4
+    nexus_core.event_driven = True
+
+    flags = ['setup','sent_files','submitted','finished','got_output','analyzed']
+
+    sims = []
+    for n in range(n_test_workflows):
+        sims.extend(get_test_workflow(n).list())
+    #end for
+
+    template = '''
+name = "$name"
+a    = $a
+'''
+    for s in sims:
+        si = input_template(text=template)
+        si.assign(name='input_name',a=1)
+        s.input = si
+    #end for
+
+    pm = ProjectManager()
+    pm.machine = sims[0].job.get_machine()
+    pm.add_simulations(sims)
+
+    pm.run_project()
+
+    for s in sims:
+        for flag in flags:
+            assert(s[flag])
+        #end for
+        assert(isinstance(s.process_id,int))
+    #end for
+
+    # signal handling is restored once monitoring ends
+    assert(pm.machine.event_pipe is None)
+
+    assert(not pm.index.active())
+    assert(len(pm.progressing_cascades)==0)
+    assert(pm.index.visits_total>=len(sims))
+
+    restore_nexus()
+
+    Simulation.clear_all_sims()
+#end def test_run_project_event_driven
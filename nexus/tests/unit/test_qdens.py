@@ -152,4 +152,75 @@ if versions.h5py_available:
         assert(text_eq(tot,tot_ref,atol=1e-7))
         assert(text_eq(pol,pol_ref,atol=1e-7))
     #end def test_density
+
+
+
+    def test_density_streaming():
+        import os
+        import importlib.util
+        from importlib.machinery import SourceFileLoader
+        import numpy as np
+        import h5py
+        from generic import obj
+        from numerics import simplestats
+
+        # load qdens as a module
+        exe = testing.executable_path('qdens')
+        loader = SourceFileLoader('qdens_module',exe)
+        spec = importlib.util.spec_from_loader('qdens_module',loader)
+        qdens = importlib.util.module_from_spec(spec)
+        loader.exec_module(qdens)
+
+        # running statistics merged over slabs match in-memory statistics
+        data = np.random.RandomState(3).random_sample((37,5,4))
+        rs = qdens.RunningStats()
+        for b in range(0,len(data),6):
+            rs.add(data[b:b+6])
+        #end for
+        mean,error = rs.stats()
+        mean_ref,error_ref = simplestats(data,dim=0)
+        assert(check_value_eq(mean,mean_ref))
+        assert(check_value_eq(error,error_ref))
+
+        # slab-by-slab analysis of a stat.h5 file matches in-memory analysis
+        qa_files_path = testing.unit_test_file_path('qmcpack_analyzer','diamond_gamma/dmc')
+        stat_file = os.path.join(qa_files_path,'dmc.s003.stat.h5')
+
+        h5 = h5py.File(stat_file,'r')
+        u = np.array(h5['SpinDensity']['u']['value'])
+        d = np.array(h5['SpinDensity']['d']['value'])
+        h5.close()
+
+        eq = 3
+        rb = 2
+        slab_bytes = qdens.slab_bytes
+        options = qdens.QDBase.options
+        qdens.QDBase.options = obj(grids=None,grid=None,structure=None)
+        # only a few blocks per slab
+        qdens.slab_bytes = 3*8*u.shape[1]
+        try:
+            stat = qdens.StatFile(stat_file)
+            stat.analyze(eq,rb)
+        finally:
+            qdens.slab_bytes = slab_bytes
+            qdens.QDBase.options = options
+        #end try
+        sres = stat.spin_density_results.SpinDensity
+
+        # in-memory reblocking after equilibration
+        eq += (len(u)-eq)%rb
+        ud = u[eq:].reshape(-1,rb,u.shape[1]).mean(1)
+        dd = d[eq:].reshape(-1,rb,d.shape[1]).mean(1)
+        refs = obj(
+            u   = ud,
+            d   = dd,
+            tot = ud+dd,
+            pol = ud-dd,
+            )
+        for s,ref in refs.items():
+            mean_ref,error_ref = simplestats(ref,dim=0)
+            assert(check_value_eq(sres[s].mean,mean_ref))
+            assert(check_value_eq(sres[s].error,error_ref))
+        #end for
+    #end def test_density_streaming
 #end if
@@ -1,7 +1,7 @@
 
 import versions
 import testing
-from testing import execute,text_eq
+from testing import execute,text_eq,value_eq
 
 
 
@@ -41,4 +41,66 @@ if versions.scipy_available:
         assert(text_eq(out,out_ref,atol=1e-2,rtol=1e-2))
 
     #end def test_fit
+
+
+
+    def test_process_scalar_files():
+        import os
+        import sys
+        from glob import glob
+        import importlib.util
+        from importlib.machinery import SourceFileLoader
+        import numpy as np
+
+        tpath = testing.setup_unit_test_output_directory('qmc_fit','test_process_scalar_files')
+
+        # load qmc-fit as a module
+        exe = testing.executable_path('qmc-fit')
+        loader = SourceFileLoader('qmc_fit_module',exe)
+        spec = importlib.util.spec_from_loader('qmc_fit_module',loader)
+        qmc_fit = importlib.util.module_from_spec(spec)
+        # register the module so its task functions can be pickled
+        sys.modules['qmc_fit_module'] = qmc_fit
+        loader.exec_module(qmc_fit)
+
+        # energy series with an equilibration transient, so that the 
+        # automatic equilibration lengths depend on random choices
+        rng = np.random.RandomState(5)
+        scalar_files = []
+        for series in range(4):
+            E = -10.5+0.5*np.exp(-np.arange(200)/15.)+0.05*rng.randn(200)
+            scalar_file = os.path.join(tpath,'qmc.s{0:03d}.scalar.dat'.format(series))
+            f = open(scalar_file,'w')
+            f.write('#   index    LocalEnergy         LocalEnergy_sq\n')
+            for i,e in enumerate(E):
+                f.write('{0:10d}  {1:16.10e}  {2:16.10e}\n'.format(i,e,e*e))
+            #end for
+            f.close()
+            scalar_files.append(scalar_file)
+        #end for
+
+        def process(**kwargs):
+            # automatic equilibration lengths are chosen at random
+            np.random.seed(11)
+            return qmc_fit.process_scalar_files(scalar_files,**kwargs)
+        #end def process
+
+        Edata_ref,Emean_ref,Eerr_ref,files = process()
+
+        # parallel reads choose the same equilibration lengths as serial
+        # reads, and the columnar cache is only written on request
+        for kwargs in [dict(processes=2),dict(processes=2,cache=True),dict(cache=True)]:
+            Edata,Emean,Eerr,files = process(**kwargs)
+            assert(files==scalar_files)
+            assert(value_eq(Edata,Edata_ref))
+            assert(value_eq(Emean,Emean_ref))
+            assert(value_eq(Eerr,Eerr_ref))
+            ncache = len(glob(os.path.join(tpath,'.*.scalar.dat.cache')))
+            if kwargs.get('cache',False):
+                assert(ncache==len(scalar_files))
+            else:
+                assert(ncache==0)
+            #end if
+        #end for
+    #end def test_process_scalar_files
 #end if
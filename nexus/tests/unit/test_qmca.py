@@ -278,6 +278,70 @@ vmc/vmc series 0 -10.45972798 +/- 0.00380164  0.39708591 +/- 0.00971200  0.0380
 
 
 
+def test_parallel_jobs():
+    exe = get_exe()
+
+    enter('multi')
+
+    command = "{} -e 5 -q ev --fp=16.8f */*scalar*".format(exe)
+    out_ref,err,rc = execute(command)
+
+    command = "{} --jobs 3 -e 5 -q ev --fp=16.8f */*scalar*".format(exe)
+    out,err,rc = execute(command)
+
+    assert(text_eq(out,out_ref))
+
+    leave()
+
+    enter('dmc')
+
+    command = "{} --jobs 2 -e 5 -j '1 3' -q ev --fp=16.8f *scalar*".format(exe)
+    out,err,rc = execute(command)
+
+    out_ref = '''
+               LocalEnergy                 Variance                   ratio 
+dmc  series 0 -10.48910618 +/- 0.00714379  0.45789123 +/- 0.04510618  0.0437 
+dmc  series 1 -10.53022752 +/- 0.00073527  0.38410495 +/- 0.00082972  0.0365 
+        '''
+
+    assert(text_eq(out,out_ref))
+
+    leave()
+#end def test_parallel_jobs
+
+
+
+def test_cache():
+    import os
+    from glob import glob
+    exe = get_exe()
+
+    enter('vmc')
+
+    command = "{} -e 5 -q ev --fp=16.8f *scalar*".format(exe)
+    out_ref,err,rc = execute(command)
+
+    # caching is opt-in
+    assert(len(glob('.*.cache'))==0)
+
+    # cache is written on first read and reused afterwards
+    command = "{} --cache -e 5 -q ev --fp=16.8f *scalar*".format(exe)
+    out,err,rc = execute(command)
+    assert(text_eq(out,out_ref))
+    cache_dirs = glob('.*.scalar.dat.cache')
+    assert(len(cache_dirs)>0)
+    for cache_dir in cache_dirs:
+        assert(os.path.exists(os.path.join(cache_dir,'meta.npz')))
+    #end for
+
+    out,err,rc = execute(command)
+    assert(text_eq(out,out_ref))
+
+    leave()
+#end def test_cache
+
+
+
 def test_twist_average():
     exe = get_exe()
 
@@ -316,3 +380,62 @@ avg series 0 -11.44375840 +/- 0.00292164  0.44863011 +/- 0.00502859  0.0392
     leave()
 #end def test_weighted_twist_average
 
+
+
+
+def test_incremental():
+    import os
+    exe = get_exe()
+
+    enter('dmc')
+
+    inc_path = os.path.join(test_info['tpath'],'incremental')
+    if not os.path.exists(inc_path):
+        os.makedirs(inc_path)
+    #end if
+    lines = open('dmc.s001.scalar.dat','r').read().splitlines(True)
+
+    leave()
+
+    cwd = os.getcwd()
+    os.chdir(inc_path)
+
+    # write a partially completed run, including a partial line
+    inc_file = 'dmc.s001.scalar.dat'
+    f = open(inc_file,'w')
+    f.write(''.join(lines[:30])+lines[30][:20])
+    f.close()
+
+    command = "{} --incremental -e 10 -q ev --fp=16.8f *scalar*".format(exe)
+    out_inc,err,rc = execute(command)
+
+    assert(os.path.exists('.dmc.s001.scalar.dat.qmca_cache.npz'))
+    assert(os.path.exists('.dmc.s001.scalar.dat.qmca_cache.bin'))
+
+    f = open(inc_file,'w')
+    f.write(''.join(lines[:30]))
+    f.close()
+
+    command = "{} -e 10 -q ev --fp=16.8f *scalar*".format(exe)
+    out,err,rc = execute(command)
+
+    assert(text_eq(out_inc,out))
+
+    # complete the run and reuse the cache
+    f = open(inc_file,'a')
+    f.write(''.join(lines[30:]))
+    f.close()
+
+    out_ref = '''
+              LocalEnergy                 Variance                   ratio 
+dmc series 1 -10.53167630 +/- 0.00163992  0.38531028 +/- 0.00162825  0.0366 
+        '''
+
+    command = "{} --incremental -e 10 -q ev --fp=16.8f *scalar*".format(exe)
+    for n in range(2):
+        out,err,rc = execute(command)
+        assert(text_eq(out,out_ref))
+    #end for
+
+    os.chdir(cwd)
+#end def test_incremental
@@ -28,8 +28,11 @@ def test_empty_init():
             savefile        = '',
             savefilepath    = './',
             request = obj(
+                cache           = False,
+                cache_dir       = None,
                 calculations    = set([]),
                 #data_sources    = set(['opt', 'stat', 'dmc', 'storeconfig', 'traces', 'scalar']),
+                dat_cache       = False,
                 destination     = '.',
                 dm_settings     = None,
                 equilibration   = None,
@@ -434,6 +437,246 @@ def test_twist_average_analysis():
 
 
 
+def test_analysis_cache():
+    import os
+    from numpy import array
+    from qmcpack_analyzer import QmcpackAnalyzer
+
+    tpath = testing.setup_unit_test_output_directory(
+        test      = 'qmcpack_analyzer',
+        subtest   = 'test_analysis_cache',
+        file_sets = ['diamond_gamma'],
+        )
+
+    infile = os.path.join(tpath,'diamond_gamma/dmc/dmc.in.xml')
+
+    qa = QmcpackAnalyzer(infile,analyze=True,equilibration=5,cache=True)
+
+    cache_file = qa.cache_filepath()
+    assert(os.path.exists(cache_file))
+    assert(os.path.split(cache_file)[0]==os.path.split(infile)[0])
+
+    # unchanged inputs are restored from the cache without analysis
+    qc = QmcpackAnalyzer(infile,equilibration=5,cache=True)
+    assert(qc.load_cache())
+    assert(qc.info.analyzed)
+    assert(qc.qmc[0].info.analyzed)
+    assert(qc.dmc[1] is qc.qmc[1])
+
+    qc = QmcpackAnalyzer(infile,analyze=True,equilibration=5,cache=True)
+    qr = QmcpackAnalyzer(infile,analyze=True,equilibration=5)
+    for s in qr.qmc.keys():
+        le  = qc.qmc[s].scalars.LocalEnergy
+        ler = qr.qmc[s].scalars.LocalEnergy
+        assert(value_eq(le.mean,ler.mean))
+        assert(value_eq(le.error,ler.error))
+        assert(value_eq(array(qc.qmc[s].scalars.data.LocalEnergy),array(qr.qmc[s].scalars.data.LocalEnergy)))
+    #end for
+    assert(value_eq(qc.results.timestep_study.energies,qr.results.timestep_study.energies))
+    assert(str(qc).replace('cache           = True','cache           = False')==str(qr))
+
+    # a different request or modified data invalidates the cache
+    qc = QmcpackAnalyzer(infile,equilibration=10,cache=True)
+    assert(not qc.load_cache())
+
+    datafile = os.path.join(tpath,'diamond_gamma/dmc/dmc.s001.scalar.dat')
+    st = os.stat(datafile)
+    os.utime(datafile,ns=(st.st_atime_ns,st.st_mtime_ns+10**9))
+    qc = QmcpackAnalyzer(infile,equilibration=5,cache=True)
+    assert(not qc.load_cache())
+#end def test_analysis_cache
+
+
+
+def test_dat_cache():
+    import os
+    from glob import glob
+    from numpy import array
+    from qmcpack_analyzer import QmcpackAnalyzer
+
+    tpath = testing.setup_unit_test_output_directory(
+        test      = 'qmcpack_analyzer',
+        subtest   = 'test_dat_cache',
+        file_sets = ['diamond_gamma'],
+        )
+
+    infile = os.path.join(tpath,'diamond_gamma/dmc/dmc.in.xml')
+    dmc_path = os.path.split(infile)[0]
+
+    # scalar.dat columns are only cached on request
+    qr = QmcpackAnalyzer(infile,analyze=True,equilibration=5)
+    assert(len(glob(os.path.join(dmc_path,'.*.cache')))==0)
+
+    for n in range(2):
+        qc = QmcpackAnalyzer(infile,analyze=True,equilibration=5,dat_cache=True)
+        cache_dirs = glob(os.path.join(dmc_path,'.*.scalar.dat.cache'))
+        assert(len(cache_dirs)==len(qr.qmc))
+        for s in qr.qmc.keys():
+            for q,v in qr.qmc[s].scalars.data.items():
+                assert(value_eq(array(qc.qmc[s].scalars.data[q]),array(v)))
+            #end for
+            le  = qc.qmc[s].scalars.LocalEnergy
+            ler = qr.qmc[s].scalars.LocalEnergy
+            assert(value_eq(le.mean,ler.mean))
+            assert(value_eq(le.error,ler.error))
+        #end for
+    #end for
+#end def test_dat_cache
+
+
+
+if versions.scipy_available:
+    def test_density_matrices_eigenvalues():
+        import numpy as np
+        from numpy import real
+        from scipy.linalg import eig
+        from qmcpack_quantity_analyzers import DensityMatricesAnalyzer
+
+        dm = DensityMatricesAnalyzer('DensityMatrices')
+
+        rng = np.random.default_rng(7)
+        nb = 11
+        n  = 5
+
+        def hermitian_stack():
+            x = rng.normal(size=(nb,n,n))+1j*rng.normal(size=(nb,n,n))
+            return x+x.conj().swapaxes(-1,-2)
+        #end def hermitian_stack
+
+        a = hermitian_stack()
+        x = rng.normal(size=(nb,n,n))+1j*rng.normal(size=(nb,n,n))
+        b = np.einsum('bij,bkj->bik',x,x.conj())+n*np.eye(n)
+        # a non-positive-definite number matrix forces the fallback solver
+        bnp = b.copy()
+        bnp[4] = hermitian_stack()[0]
+        an  = rng.normal(size=(nb,n,n))+1j*rng.normal(size=(nb,n,n))
+
+        def ascending(d):
+            return d[np.argsort(real(d),kind='stable')]
+        #end def ascending
+
+        # per-block reference loops, as in the original jackknife
+        ref = dict(
+            general     = np.array([eig(m)[0] for m in an]),
+            generalized = np.array([eig(m,mb)[0] for m,mb in zip(an,b)]),
+            hermitian   = np.array([ascending(eig(m)[0]) for m in a]),
+            hermitian_generalized    = np.array([ascending(eig(m,mb)[0]) for m,mb in zip(a,b)]),
+            hermitian_generalized_np = np.array([ascending(eig(m,mb)[0]) for m,mb in zip(a,bnp)]),
+            )
+
+        eig_chunk_bytes = dm.eig_chunk_bytes
+        # single chunk, several chunks, one matrix per chunk
+        for chunk_bytes in (eig_chunk_bytes,3*a[0].nbytes,1):
+            dm.eig_chunk_bytes = chunk_bytes
+            for threads in (1,2):
+                kw = dict(threads=threads)
+                d = dict(
+                    general     = dm.stacked_eigenvalues(an,**kw),
+                    generalized = dm.stacked_eigenvalues(an,b,**kw),
+                    hermitian   = dm.stacked_eigenvalues(a,hermitian=True,**kw),
+                    hermitian_generalized    = dm.stacked_eigenvalues(a,b,hermitian=True,**kw),
+                    hermitian_generalized_np = dm.stacked_eigenvalues(a,bnp,hermitian=True,**kw),
+                    )
+                for name,dref in ref.items():
+                    assert(d[name].shape==dref.shape)
+                    assert(np.allclose(d[name],dref,atol=1e-8))
+                    # jackknife sums agree with the per-block accumulation
+                    assert(np.allclose(d[name].sum(0),dref.sum(0),atol=1e-8))
+                #end for
+            #end for
+        #end for
+        dm.eig_chunk_bytes = eig_chunk_bytes
+
+        # reference eigenpairs share the ascending order in hermitian mode
+        val,vec = eig(a[0])
+        sval,svec = dm.ascending_eigenvalues(val,vec)
+        assert(np.allclose(sval,ref['hermitian'][0],atol=1e-8))
+        assert(np.allclose(a[0].dot(svec),svec*sval,atol=1e-8))
+    #end def test_density_matrices_eigenvalues
+#end if
+
+
+
+def test_bspline_evaluate():
+    import numpy as np
+    from numpy import array,zeros,dot,floor
+    from qmcpack_property_analyzers import Bspline
+
+    def evaluate_ref(params,cusp,rcut,r):
+        # per-point scalar evaluation for a single coefficient set
+        p  = array(params,dtype=float)
+        ni = len(p)+1
+        dr = rcut/ni
+        odr = 1./dr
+        c = zeros((len(p)+4,))
+        c[0] = p[1] - 2.*dr*cusp
+        c[1] = p[0]
+        c[2] = p[1]
+        for i in range(2,len(p)):
+            c[i+1] = p[i]
+        #end for
+        v   = zeros(r.shape)
+        dv  = zeros(r.shape)
+        d2v = zeros(r.shape)
+        for n in range(len(r)):
+            ri = r[n]*odr
+            i = int(floor(ri))
+            if i<ni:
+                t  = ri - i
+                tp = array([t*t*t,t*t,t,1.])
+                v[n]   = dot(c[i:i+4],dot(Bspline.A,tp))
+                dv[n]  = dot(c[i:i+4],dot(Bspline.dA,tp))*odr
+                d2v[n] = dot(c[i:i+4],dot(Bspline.d2A,tp))*odr**2
+            #end if
+        #end for
+        return v,dv,d2v
+    #end def evaluate_ref
+
+    rcut = 4.0
+    cusp = -0.5
+    params = array([
+        [0.31, 0.22, 0.15, 0.09, 0.05, 0.02, 0.01],
+        [0.52,-0.13, 0.27, 0.00,-0.08, 0.04,-0.01],
+        [1.00, 2.00, 3.00, 4.00, 5.00, 6.00, 7.00],
+        ])
+    # include radii at and beyond the cutoff
+    r = np.linspace(0.0,1.5*rcut,61)
+    assert(r.max()>rcut)
+    assert(rcut in r)
+
+    # single coefficient sets
+    for ps in params:
+        b = Bspline(ps,cusp,rcut)
+        vals = b.evaluate(r)
+        refs = evaluate_ref(ps,cusp,rcut,r)
+        for val,ref in zip(vals,refs):
+            assert(val.shape==r.shape)
+            assert(value_eq(val,ref,atol=1e-12))
+            assert(value_eq(val[r>=rcut],0*r[r>=rcut]))
+        #end for
+    #end for
+
+    # many coefficient sets evaluated together
+    b = Bspline(params,cusp,rcut)
+    vals = b.evaluate(r)
+    for val in vals:
+        assert(val.shape==(len(params),len(r)))
+    #end for
+    for s,ps in enumerate(params):
+        refs = evaluate_ref(ps,cusp,rcut,r)
+        for val,ref in zip(vals,refs):
+            assert(value_eq(val[s],ref,atol=1e-12))
+        #end for
+    #end for
+
+    # radii keep their shape
+    vals = b.evaluate(r[1:].reshape(4,15))
+    for val in vals:
+        assert(val.shape==(len(params),4,15))
+    #end for
+#end def test_bspline_evaluate
+
+
 if versions.h5py_available:
     def test_density_analysis():
         import os
@@ -485,3 +728,129 @@ if versions.h5py_available:
     #end def test_density_analysis
 #end if
 
+
+
+
+if versions.h5py_available:
+    def test_traces_accumulate_scalars():
+        import os
+        import numpy as np
+        import h5py
+        from qmcpack_quantity_analyzers import TracesFileHDF
+
+        tpath = testing.setup_unit_test_output_directory(
+            test      = 'qmcpack_analyzer',
+            subtest   = 'test_traces_accumulate_scalars',
+            )
+
+        # synthetic traces: variable walker population, rows unordered in step
+        rng = np.random.RandomState(3)
+        blocks = 4
+        steps  = 12
+        st = np.concatenate([np.full(rng.randint(3,7),s) for s in range(steps)])
+        rng.shuffle(st)
+        nrows = len(st)
+        wt = rng.uniform(0.5,1.5,nrows)
+        le = rng.normal(-10.0,0.5,nrows)
+        kin = rng.normal(5.0,0.2,nrows)
+
+        # per-electron kinetic energies summing to the scalar trace
+        nelec = 3
+        kin_e = rng.uniform(0.5,1.5,(nrows,nelec))
+        kin_e *= (kin/kin_e.sum(1))[:,np.newaxis]
+        pos_e = rng.normal(0.0,1.0,(nrows,nelec,3))
+
+        def write_layout(g,columns,dname='scalars',start=0,shape=(1,),unit_size=1):
+            n = start
+            for qname in columns:
+                size = int(np.prod(shape))*unit_size
+                q = g.create_group('layout/{0}/{1}'.format(dname,qname))
+                q['row_start' ] = np.array([n])
+                q['row_end'   ] = np.array([n+size])
+                q['dimension' ] = np.array([len(shape)])
+                q['shape'     ] = np.array(shape)
+                q['unit_size' ] = np.array([unit_size])
+                n += size
+            #end for
+            return n
+        #end def write_layout
+
+        def write_traces(filepath,kin_e):
+            h = h5py.File(filepath,'w')
+            gi = h.create_group('int_data')
+            gi['traces'] = np.array([st,np.arange(nrows)]).T
+            write_layout(gi,['step','id'])
+            gr = h.create_group('real_data')
+            gr['traces'] = np.hstack([np.array([wt,le,kin]).T,kin_e,
+                                      pos_e.reshape(nrows,-1)])
+            n = write_layout(gr,['weight','LocalEnergy','Kinetic'])
+            n = write_layout(gr,['Kinetic'],'e',n,(nelec,))
+            n = write_layout(gr,['position'],'e',n,(nelec,),3)
+            h.close()
+        #end def write_traces
+
+        filepath = os.path.join(tpath,'qmc.s000.traces.h5')
+        write_traces(filepath,kin_e)
+
+        # reference sums via explicit loops
+        ws_ref = np.zeros((steps,))
+        ps_ref = np.zeros((steps,))
+        qs_ref = {'LocalEnergy':np.zeros((steps,)),'Kinetic':np.zeros((steps,))}
+        for t in range(nrows):
+            ws_ref[st[t]] += wt[t]
+            ps_ref[st[t]] += 1
+            qs_ref['LocalEnergy'][st[t]] += wt[t]*le[t]
+            qs_ref['Kinetic'][st[t]]     += wt[t]*kin[t]
+        #end for
+        wb_ref = ws_ref.reshape(blocks,-1).sum(1)
+
+        def check(tf):
+            sbs = tf.scalars_by_step
+            sbb = tf.scalars_by_block
+            assert(value_eq(sbs.Weight,ws_ref))
+            assert(value_eq(sbs.NumOfWalkers,ps_ref))
+            assert(value_eq(sbb.Weight,wb_ref))
+            for qname,qs in qs_ref.items():
+                assert(value_eq(sbs[qname],qs/ws_ref))
+                assert(value_eq(sbb[qname],qs.reshape(blocks,-1).sum(1)/wb_ref))
+            #end for
+        #end def check
+
+        tf = TracesFileHDF(filepath,blocks)
+        tf.accumulate_scalars()
+        check(tf)
+
+        # streamed slabs must match the in-memory accumulation
+        for chunk_rows in (1,5,nrows+1):
+            tf = TracesFileHDF(filepath,blocks)
+            tf.accumulate_scalars(chunk_rows=chunk_rows)
+            assert(not tf.loaded())
+            check(tf)
+        #end for
+
+        # streamed diagnostics must match the in-memory ones
+        tf = TracesFileHDF(filepath,blocks)
+        tf.form_diagnostic_data()
+        assert(tf.check_particle_sums())
+        for chunk_rows in (1,5,nrows+1):
+            tf = TracesFileHDF(filepath,blocks)
+            tf.form_diagnostic_data(chunk_rows=chunk_rows)
+            assert(not tf.loaded())
+            assert(tf.formed_diagnostic_data())
+            assert(tf.check_particle_sums())
+            check(tf)
+        #end for
+
+        # inconsistent particle sums are detected by both paths
+        kin_e[nrows//2,0] += 1.0
+        filepath = os.path.join(tpath,'qmc.s001.traces.h5')
+        write_traces(filepath,kin_e)
+        tf = TracesFileHDF(filepath,blocks)
+        assert(not tf.check_particle_sums())
+        for chunk_rows in (1,5,nrows+1):
+            tf = TracesFileHDF(filepath,blocks)
+            assert(not tf.check_particle_sums(chunk_rows=chunk_rows))
+            assert(not tf.loaded())
+        #end for
+    #end def test_traces_accumulate_scalars
+#end if
@@ -1434,6 +1434,49 @@ def test_write():
 
 
 
+def test_write_arrays():
+    import numpy as np
+    import qmcpack_input
+    from qmcpack_input import param,meta
+
+    metadata = qmcpack_input.Param.metadata
+    qmcpack_input.Param.metadata = meta()
+
+    text = param.write(np.array([1,2,3]))
+    assert(text=='1 2 3')
+
+    # long 1D arrays are wrapped into lines of about 70 characters
+    text = param.write(np.arange(30),mode='elem',name='coeff')
+    ref = '''   <parameter name="coeff">
+      0 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 18 19 20 21 22 23 24 25 26 
+27 28 29
+   </parameter>
+'''
+    assert(text==ref)
+
+    text = param.write(np.array([[1.,2,3],[4,5,6]]),mode='elem',name='pos')
+    ref = '''   <parameter name="pos">
+            1.00000000        2.00000000        3.00000000
+            4.00000000        5.00000000        6.00000000
+   </parameter>
+'''
+    assert(text==ref)
+
+    param.set_precision('16.12e')
+    text = param.write(np.array([0.5,-1.25,2.0,3.0,4.0]),mode='elem',name='coeff')
+    param.reset_precision()
+    ref = '''   <parameter name="coeff">
+      5.000000000000e-01 -1.250000000000e+00 2.000000000000e+00 3.000000000000e+00 
+4.000000000000e+00
+   </parameter>
+'''
+    assert(text==ref)
+
+    qmcpack_input.Param.metadata = metadata
+#end def test_write_arrays
+
+
+
 def test_get():
     from qmcpack_input import QmcpackInput
 
@@ -46,9 +46,9 @@ def test_settings():
     def check_settings_core_noncore():
         nckeys_check = set([
                 'command_line','debug', 'dependent_modes', 'emulate',
-                'file_locations', 'generate_only', 'graph_sims', 'indent',
-                'load_images', 'local_directory', 'mode', 'modes', 'monitor',
-                'primary_modes', 'progress_tty', 'pseudo_dir',
+                'event_driven', 'file_locations', 'generate_only', 'graph_sims',
+                'indent', 'load_images', 'local_directory', 'max_sleep', 'mode',
+                'modes', 'monitor', 'primary_modes', 'progress_tty', 'pseudo_dir',
                 'pseudopotentials', 'remote_directory', 'results', 'runs',
                 'skip_submit', 'sleep', 'stages', 'stages_set', 'status',
                 'status_modes', 'status_only', 'trace', 'verbose'
@@ -58,10 +58,11 @@ def test_settings():
                 ])
         setkeys_check = set([
                 'command_line','basis_dir', 'basissets', 'debug',
-                'dependent_modes', 'emulate', 'file_locations', 'generate_only',
-                'graph_sims', 'indent', 'load_images', 'local_directory', 'mode',
-                'modes', 'monitor', 'primary_modes', 'progress_tty',
-                'pseudo_dir', 'pseudopotentials', 'remote_directory', 'results',
+                'dependent_modes', 'emulate', 'event_driven', 'file_locations',
+                'generate_only', 'graph_sims', 'indent', 'load_images',
+                'local_directory', 'max_sleep', 'mode', 'modes', 'monitor',
+                'primary_modes', 'progress_tty', 'pseudo_dir', 'pseudopotentials',
+                'remote_directory', 'results',
                 'runs', 'skip_submit', 'sleep', 'stages', 'stages_set', 'status',
                 'status_modes', 'status_only', 'trace', 'verbose'
                 ])
@@ -1319,6 +1319,63 @@ def test_min_image_distances():
 
 
 
+def test_neighbors_within():
+    import numpy as np
+    import structure
+    from structure import generate_structure
+
+    s = generate_structure(
+        structure = 'diamond',
+        cell      = 'prim',
+        tiling    = (3,3,3),
+        )
+    np.random.seed(2)
+    s.pos += 0.05*np.random.randn(*s.pos.shape)
+
+    rmax = 2.9
+    assert(rmax<s.rinscribe())
+
+    # reference from the full distance table
+    dt_full = s.distance_table()
+
+    def check(nlist,dlist):
+        assert(len(nlist)==len(s.pos))
+        for i,(ni,di) in enumerate(zip(nlist,dlist)):
+            ref = (dt_full[i]<rmax).nonzero()[0]
+            assert(set(ni)==set(ref))
+            assert(value_eq(di,dt_full[i,ni]))
+            assert((np.diff(di)>=0).all())
+            assert(ni[0]==i)
+        #end for
+    #end def check
+
+    # periodic KD-tree path, if available
+    nlist,dlist = s.neighbors_within(rmax,distances=True)
+    check(nlist,dlist)
+
+    # blocked minimum image path
+    scipy_unavailable = structure.scipy_unavailable
+    structure.scipy_unavailable = True
+    nlist,dlist = s.neighbors_within(rmax,distances=True)
+    structure.scipy_unavailable = scipy_unavailable
+    check(nlist,dlist)
+
+    # cutoff queries of nearest_neighbors exclude self
+    nn,nd = s.nearest_neighbors(rmax=rmax,distances=True)
+    for i in range(len(s.pos)):
+        ref = set((dt_full[i]<rmax).nonzero()[0])-set([i])
+        assert(set(nn[i])==ref)
+        assert(value_eq(nd[i],dt_full[i,nn[i]]))
+    #end for
+
+    # neighbor table rows are sorted distance table rows
+    nt,dt = s.neighbor_table(distances=True)
+    assert(value_eq(dt,np.sort(dt_full,axis=1)))
+    assert(value_eq(np.take_along_axis(dt_full,nt,1),dt))
+#end def test_neighbors_within
+
+
+
 def test_freeze():
     """
     Freeze sets of atoms to prevent relaxation.
@@ -12,7 +12,7 @@
 
 from __future__ import print_function
 
-def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.0,cas_idx=None):
+def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.0,cas_idx=None,compression=None):
   import h5py, re, sys
   from collections import defaultdict
   from pyscf.pbc import gto, scf, df, dft
@@ -152,6 +152,39 @@ def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.
         #return E_g_unsorted, C_gamma_unsorted, 
         return E_g, C_gamma, E_g_unsorted,C_gamma_unsorted
 
+  def write_mo_k2gamma(group, cell, mo_energy, mo_coeff, kpts, kmesh=None):
+        '''
+        Same transformation as mo_k2gamma, but the supercell orbitals of one
+        k-point are built and written at a time. Returns None (nothing written)
+        when the degenerate orbital treatment of mo_k2gamma is needed.
+        '''
+        E_g_unsorted = numpy.hstack(mo_energy)
+        E_sort_idx = numpy.argsort(E_g_unsorted)
+        E_desort_idx = numpy.argsort(E_sort_idx)
+        E_g = E_g_unsorted[E_sort_idx]
+        if abs(E_g[1:] - E_g[:-1]).max() < 1e-5:
+            return None
+
+        scell, phase = get_phase(cell, kpts, kmesh)
+        Nk = len(mo_coeff)
+        Nao, Nmo = mo_coeff[0].shape
+        NR = phase.shape[0]
+        NbAO, NbMO = Nao*NR, Nk*Nmo
+
+        names = ["eigenset_0_imag","eigenset_unsorted_0_imag","eigenset_0","eigenset_unsorted_0"]
+        eigensets = dict((name,create_mo_dataset(group,name,(NbMO,NbAO))) for name in names)
+        for k in range(Nk):
+            # columns k*Nmo:(k+1)*Nmo of C_gamma in mo_k2gamma
+            C_k = numpy.einsum('R,um->Rum', phase[:,k], mo_coeff[k]).reshape(NbAO, Nmo)
+            C_k = get_mo(C_k)
+            # rows of these orbitals once sorted by energy
+            rows = E_desort_idx[k*Nmo:(k+1)*Nmo]
+            order = numpy.argsort(rows)
+            for part, suffix in ((C_k.real,""), (C_k.imag,"_imag")):
+                eigensets["eigenset_unsorted_0"+suffix][k*Nmo:(k+1)*Nmo] = part
+                eigensets["eigenset_0"+suffix][rows[order]] = part[order]
+        return E_g, E_g_unsorted, NbAO, NbMO
+
 
   IonName=dict([('H',1),  ('He',2),  ('Li',3),('Be',4),  ('B', 5),  ('C', 6),  ('N', 7),('O', 8),  ('F', 9),   ('Ne',10),   ('Na',11),('Mg',12),   ('Al',13),   ('Si',14),   ('P', 15),   ('S', 16),('Cl',17),   ('Ar',18),   ('K', 19),   ('Ca',20),   ('Sc',21),   ('Ti',22),   ('V', 23),   ('Cr',24),   ('Mn',25),   ('Fe',26),   ('Co',27),   ('Ni',28),   ('Cu',29),   ('Zn',30),   ('Ga',31),   ('Ge',32),   ('As',33),   ('Se',34),   ('Br',35),   ('Kr',36),   ('Rb',37),   ('Sr',38),   ('Y', 39),  ('Zr',40),   ('Nb',41),   ('Mo',42),   ('Tc',43),   ('Ru',44),   ('Rh',45),   ('Pd',46),   ('Ag',47),   ('Cd',48),   ('In',49),   ('Sn',50),   ('Sb',51),   ('Te',52),   ('I', 53),   ('Xe',54),   ('Cs',55),   ('Ba',56),   ('La',57),   ('Ce',58), ('Pr',59),   ('Nd',60),   ('Pm',61),   ('Sm',62),   ('Eu',63),   ('Gd',64),   ('Tb',65),   ('Dy',66),   ('Ho',67),  ('Er',68),   ('Tm',69),   ('Yb',70),   ('Lu',71),   ('Hf',72),   ('Ta',73),   ('W', 74),   ('Re',75),   ('Os',76),   ('Ir',77),   ('Pt',78),   ('Au',79),   ('Hg',80), ('Tl',81),   ('Pb',82),  ('Bi',83),   ('Po',84),   ('At',85),   ('Rn',86),   ('Fr',87),   ('Ra',88),   ('Ac',89),   ('Th',90),   ('Pa',91),   ('U', 92),   ('Np',93)]) 
 
@@ -214,9 +247,8 @@ def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.
   groupAtom.create_dataset("number_of_species",(1,),dtype="i4",data=NbSpecies)
 
   #Dataset positions 
-  MyPos=groupAtom.create_dataset("positions",(natom,3),dtype="f8")
-  for x in range(natom): 
-    MyPos[x:]=loc_cell.atom_coord(x)
+  MyPos=groupAtom.create_dataset("positions",(natom,3),dtype="f8",
+                                 data=numpy.array([loc_cell.atom_coord(x) for x in range(natom)]))
 
   #Group Atoms
   for x in range(NbSpecies):
@@ -234,10 +266,8 @@ def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.
 
     groupSpecies.create_dataset("charge",(1,),dtype="f8",data=uniq_atoms[x][2])
     groupSpecies.create_dataset("core",(1,),dtype="f8",data=uniq_atoms[x][3])
-  SpeciesID=groupAtom.create_dataset("species_ids",(natom,),dtype="i4")
-
-  for x in range(natom):
-      SpeciesID[x:]  = idxAtomstoSpecies[x]
+  SpeciesID=groupAtom.create_dataset("species_ids",(natom,),dtype="i4",
+                                     data=[idxAtomstoSpecies[x] for x in range(natom)])
 
 
 
@@ -475,16 +505,25 @@ def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.
                   l_order_new.extend(ordered)
   
     
-    def order_mo_coef(ll):
-          # Order a list of transposed mo_coeff (Ao,Mo) -> (Mo,Ao) ordered
-          # Warning:
-          #	- l_order_new is used as global variable
-          #	- gamess order
-  
-          ll_new= []
-          for l in zip(*ll):
-              ll_new.append([l[i] for i in l_order_new])
-          return ll_new
+    ao_perm = numpy.array(l_order_new,dtype=int)
+  else:
+    ao_perm = None
+
+  def get_mo(mo_coeff, cart=None):
+        # Transpose mo_coeff (Ao,Mo) -> (Mo,Ao)
+        # Warning:
+        #	- AOs are permuted to gamess order for cartesian basis (ao_perm)
+        mo_coeff = numpy.asarray(mo_coeff)
+        if ao_perm is not None:
+            mo_coeff = mo_coeff[ao_perm]
+        return mo_coeff.T
+
+  def create_mo_dataset(group, name, shape, data=None):
+        # Orbital blocks are written in one call, optionally chunked and compressed
+        if compression is None:
+            return group.create_dataset(name,shape,dtype="f8",data=data)
+        return group.create_dataset(name,shape,dtype="f8",data=data,
+                                    chunks=True,compression=compression)
   
   mo_coeff = mf.mo_coeff
   if len(kpts)==0:
@@ -499,20 +538,13 @@ def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.
   if not PBC:
     if Restricted==True:
       NbAO, NbMO =mo_coeff.shape 
-      if loc_cell.cart==True:
-        eigenset=GroupDet.create_dataset("eigenset_0",(NbMO,NbAO),dtype="f8",data=order_mo_coef(mo_coeff))
-      else:
-        eigenset=GroupDet.create_dataset("eigenset_0",(NbMO,NbAO),dtype="f8",data=list(zip(*mo_coeff)))
+      eigenset=create_mo_dataset(GroupDet,"eigenset_0",(NbMO,NbAO),data=get_mo(mo_coeff))
 
       eigenvalue=GroupDet.create_dataset("eigenval_0",(1,NbMO),dtype="f8",data=mf.mo_energy)
     else:
       NbAO, NbMO =mo_coeff[0].shape 
-      if loc_cell.cart==True:
-        eigenset_up=GroupDet.create_dataset("eigenset_0",(NbMO,NbAO),dtype="f8",data=order_mo_coef(mo_coeff[0]))
-        eigenset_dn=GroupDet.create_dataset("eigenset_1",(NbMO,NbAO),dtype="f8",data=order_mo_coef(mo_coeff[1]))
-      else:
-        eigenset_up=GroupDet.create_dataset("eigenset_0",(NbMO,NbAO),dtype="f8",data=list(zip(*mo_coeff[0])))
-        eigenset_dn=GroupDet.create_dataset("eigenset_1",(NbMO,NbAO),dtype="f8",data=list(zip(*mo_coeff[1])))
+      eigenset_up=create_mo_dataset(GroupDet,"eigenset_0",(NbMO,NbAO),data=get_mo(mo_coeff[0]))
+      eigenset_dn=create_mo_dataset(GroupDet,"eigenset_1",(NbMO,NbAO),data=get_mo(mo_coeff[1]))
 
       eigenvalue_up=GroupDet.create_dataset("eigenval_0",(1,NbMO),dtype="f8",data=mf.mo_energy[0])
       eigenvalue_dn=GroupDet.create_dataset("eigenval_1",(1,NbMO),dtype="f8",data=mf.mo_energy[1])
@@ -522,40 +554,36 @@ def savetoqmcpack(cell,mf,title="Default",kpts=[],kmesh=[],sp_twist=[],weight=1.
     GroupCell=H5_qmcpack.create_group("Cell")
     GroupCell.create_dataset("LatticeVectors",(3,3),dtype="f8",data=loc_cell.lattice_vectors())
 
-    def get_mo(mo_coeff, cart):
-        return order_mo_coef(mo_coeff) if cart else list(zip(*mo_coeff))
-
     #Supertwist Coordinate
     GroupDet.create_dataset("Coord",(1,3),dtype="f8",data=sp_twist)
 
     if Gamma:  
        E_g=mf.mo_energy
        E_g_unsorted=E_g
-       mo_coeff_ = get_mo(mo_coeff, loc_cell.cart) 
-       mo_coeff_unsorted = mo_coeff_ 
+       mo_coeff_ = get_mo(mo_coeff) 
        NbAO, NbMO =mo_coeff.shape 
+       eigenset=create_mo_dataset(GroupDet,"eigenset_0",(NbMO,NbAO),data=mo_coeff_) 
+       #Unsorted Mo_coeffs for Multideterminants order matching QP
+       eigenset_unsorted=create_mo_dataset(GroupDet,"eigenset_unsorted_0",(NbMO,NbAO),data=mo_coeff_) 
     else: 
-      mo_k = numpy.array([c[:,cas_idx] for c in mf.mo_coeff] if cas_idx is not None else mf.mo_coeff)
-      e_k =  numpy.array([e[cas_idx] for e in mf.mo_energy] if cas_idx is not None else mf.mo_energy)
-      E_g, C_gamma,E_g_unsorted,C_unsorted = mo_k2gamma(cell, e_k, mo_k, kpts,kmesh)
-      mo_coeff=C_gamma
-      NbAO, NbMO =mo_coeff.shape 
-
-      mo_coeff_ = get_mo(mo_coeff.real, loc_cell.cart) 
-      mo_coeff_imag = get_mo(mo_coeff.imag, loc_cell.cart) 
-      mo_coeff_unsorted = get_mo(C_unsorted.real, loc_cell.cart) 
-      mo_coeff_unsorted_imag = get_mo(C_unsorted.imag, loc_cell.cart) 
-      eigenset_imag=GroupDet.create_dataset("eigenset_0_imag",(NbMO,NbAO),dtype="f8",data=mo_coeff_imag) 
-      eigenset_unsorted_imag=GroupDet.create_dataset("eigenset_unsorted_0_imag",(NbMO,NbAO),dtype="f8",data=mo_coeff_unsorted_imag) 
-
-
+      mo_k = [c[:,cas_idx] for c in mf.mo_coeff] if cas_idx is not None else mf.mo_coeff
+      e_k = [e[cas_idx] for e in mf.mo_energy] if cas_idx is not None else mf.mo_energy
+      # Stream k-points into the supercell orbitals
+      res = write_mo_k2gamma(GroupDet, cell, e_k, mo_k, kpts, kmesh)
+      if res is not None:
+        E_g, E_g_unsorted, NbAO, NbMO = res
+      else:
+        E_g, C_gamma,E_g_unsorted,C_unsorted = mo_k2gamma(cell, numpy.array(e_k), numpy.array(mo_k), kpts,kmesh)
+        mo_coeff=C_gamma
+        NbAO, NbMO =mo_coeff.shape 
 
+        eigenset_imag=create_mo_dataset(GroupDet,"eigenset_0_imag",(NbMO,NbAO),data=get_mo(mo_coeff.imag)) 
+        eigenset_unsorted_imag=create_mo_dataset(GroupDet,"eigenset_unsorted_0_imag",(NbMO,NbAO),data=get_mo(C_unsorted.imag)) 
+        eigenset=create_mo_dataset(GroupDet,"eigenset_0",(NbMO,NbAO),data=get_mo(mo_coeff.real)) 
+        #Unsorted Mo_coeffs for Multideterminants order matching QP
+        eigenset_unsorted=create_mo_dataset(GroupDet,"eigenset_unsorted_0",(NbMO,NbAO),data=get_mo(C_unsorted.real)) 
 
-    eigenset=GroupDet.create_dataset("eigenset_0",(NbMO,NbAO),dtype="f8",data=mo_coeff_) 
     eigenvalue=GroupDet.create_dataset("eigenval_0",(1,NbMO),dtype="f8",data=E_g)
- 
-    #Unsorted Mo_coeffs for Multideterminants order matching QP
-    eigenset_unsorted=GroupDet.create_dataset("eigenset_unsorted_0",(NbMO,NbAO),dtype="f8",data=mo_coeff_unsorted) 
     eigenvalue_unsorted=GroupDet.create_dataset("eigenval_unsorted_0",(1,NbMO),dtype="f8",data=E_g_unsorted)
  
     
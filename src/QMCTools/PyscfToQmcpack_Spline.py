@@ -28,7 +28,7 @@ except:
   sys.exit("Error: Pandas python module is needed for the save_eigensystem and eigensystem functions by PyscfToQmcpack_Spline.py. Install as other packages, either directly or with a package manager.")
 
 
-def pyscf2qmcpackspline(cell,mf,title="Default", kpts=[], kmesh=[],  sp_twist=[]):
+def pyscf2qmcpackspline(cell,mf,title="Default", kpts=[], kmesh=[],  sp_twist=[], chunk_size=64):
   import sys, re
 
   Restricted=True
@@ -82,11 +82,14 @@ def pyscf2qmcpackspline(cell,mf,title="Default", kpts=[], kmesh=[],  sp_twist=[]
 
   tilematrix_str = " ".join(map(str,tilematrix))
 
-  gvecs, eig_df = save_eigensystem(mf, save=False)
-
   # generate wave function file
   # ================================================
-  generate_pwscf_h5(loc_cell,gvecs,eig_df,h5_fname)  
+  if os.path.isfile('eigensystem.json') and os.path.isfile('gvectors.dat'):
+    # reuse eigensystem saved to disk by save_eigensystem
+    gvecs, eig_df = save_eigensystem(mf, save=False)
+    generate_pwscf_h5(loc_cell,gvecs,eig_df,h5_fname)  
+  else:
+    generate_pwscf_h5_from_mf(loc_cell,mf,h5_fname,chunk_size=chunk_size)
 
   # generate QMCPACK input file
   # ================================================ 
@@ -185,19 +188,14 @@ def ao_on_grid(cell):
   return aoR
 # end def ao_on_grid
 
-def mo_coeff_to_psig(mo_coeff,aoR,cell_gs,cell_vol,int_gvecs=None):
-  """
+def get_int_gvecs(cell_gs,int_gvecs=None):
+  """ reciprocal lattice points in the order used for plane-wave coefficients
    Inputs:
-     mo_coeff: molecular orbital in AO basis, each column is an MO, shape (nao,nmo)
-     aoR: atomic orbitals on a real-space grid, each column is an AO, shape (ngrid,nao)
      cell_gs: 2*cell_gs+1 should be the shape of real-space grid (e.g. (5,5,5))
-     cell_vol: cell volume, used for FFT normalization
-     int_gvecs: specify the order of plane-waves using reciprocal lattice points
+     int_gvecs: user specified order, returned unchanged if given
    Outputs:
-       3. plane-wave coefficients representing the MOs, shape (ngrid,nmo)
+     int_gvecs: integer reciprocal lattice points, shape (npw,3)
   """
-  import sys
-
   # provide the order of reciprocal lattice vectors to skip
   if int_gvecs is None: # use internal order
     nx,ny,nz = cell_gs
@@ -205,35 +203,79 @@ def mo_coeff_to_psig(mo_coeff,aoR,cell_gs,cell_vol,int_gvecs=None):
     int_gvecs = np.array([gvec for gvec in product(
       range(-nx,nx+1),range(-ny,ny+1),range(-nz,nz+1))],dtype=int)
   else:
-    assert (int_gvecs.dtype is int)
+    assert np.issubdtype(int_gvecs.dtype,np.integer)
   # end if
+  return int_gvecs
+# end def get_int_gvecs
+
+def iter_mo_psig(mo_coeff,aoR,cell_gs,cell_vol,int_gvecs=None,chunk_size=None):
+  """
+   Generator version of mo_coeff_to_psig, FFTs MOs in chunks of orbitals
+   Inputs:
+     mo_coeff, aoR, cell_gs, cell_vol, int_gvecs: see mo_coeff_to_psig
+     chunk_size: number of MOs transformed together, default all
+   Outputs:
+     yields (istate0,psig) for consecutive chunks of MOs, psig has shape (nchunk,npw,2)
+  """
+  import sys
+
+  int_gvecs = get_int_gvecs(cell_gs,int_gvecs)
   npw = len(int_gvecs) # number of plane waves 
+  gidx = tuple(int_gvecs.T)
 
-  # put molecular orbitals on real-space grid
-  moR = np.dot(aoR,mo_coeff)
-  nao,nmo = moR.shape
+  ngrid = aoR.shape[0]
+  nmo = mo_coeff.shape[1]
   rgrid_shape = 2*np.array(cell_gs)+1
-  assert nao == np.prod(rgrid_shape)
+  assert ngrid == np.prod(rgrid_shape)
+  if chunk_size is None:
+    chunk_size = max(nmo,1)
+  # end if
 
-  # for each MO, FFT to get psig
-  psig = np.zeros([nmo,npw,2]) # store real & complex
-  for istate in range(nmo):
-    # fill real-space FFT grid
-    rgrid = moR[:,istate].reshape(rgrid_shape)
+  for istate0 in range(0,nmo,chunk_size):
+    istate1 = min(istate0+chunk_size,nmo)
+    # put molecular orbitals on real-space grid, one orbital per leading index
+    moR = np.dot(aoR,mo_coeff[:,istate0:istate1]).T
+    rgrid = moR.reshape((istate1-istate0,)+tuple(rgrid_shape))
     # get plane-wave coefficients (on reciprocal-space FFT grid)
-    moG   = np.fft.fftn(rgrid)/np.prod(rgrid_shape)*np.sqrt(cell_vol)
-    orb_norm = np.sum(moG*np.conj(moG)).real
+    moG = np.fft.fftn(rgrid,axes=(1,2,3))/np.prod(rgrid_shape)*np.sqrt(cell_vol)
+    orb_norm = np.sum((moG*np.conj(moG)).real,axis=(1,2,3))
 
-    if abs(1.-orb_norm) > 1.e-6:
-      print('Orbital normalization failed in state:'+str(istate)+' with norm:'+str(orb_norm))
+    bad = np.where(abs(1.-orb_norm) > 1.e-6)[0]
+    if len(bad) > 0:
+      istate = istate0+bad[0]
+      print('Orbital normalization failed in state:'+str(istate)+' with norm:'+str(orb_norm[bad[0]]))
       sys.exit(0)
 
     # transfer plane-wave coefficients to psig in specified order
-    for igvec in range(npw):
-      comp_val = moG[tuple(int_gvecs[igvec])]
-      psig[istate,igvec,:] = comp_val.real,comp_val.imag
-    # end for igvec
-  # end for istate
+    comp_val = moG[(slice(None),)+gidx]
+    psig = np.empty([istate1-istate0,npw,2]) # store real & complex
+    psig[:,:,0] = comp_val.real
+    psig[:,:,1] = comp_val.imag
+    yield istate0,psig
+  # end for istate0
+# end def iter_mo_psig
+
+def mo_coeff_to_psig(mo_coeff,aoR,cell_gs,cell_vol,int_gvecs=None,chunk_size=None):
+  """
+   Inputs:
+     mo_coeff: molecular orbital in AO basis, each column is an MO, shape (nao,nmo)
+     aoR: atomic orbitals on a real-space grid, each column is an AO, shape (ngrid,nao)
+     cell_gs: 2*cell_gs+1 should be the shape of real-space grid (e.g. (5,5,5))
+     cell_vol: cell volume, used for FFT normalization
+     int_gvecs: specify the order of plane-waves using reciprocal lattice points
+     chunk_size: number of MOs FFTed together, bounds memory, default all
+   Outputs:
+       3. plane-wave coefficients representing the MOs, shape (ngrid,nmo)
+  """
+  int_gvecs = get_int_gvecs(cell_gs,int_gvecs)
+  npw = len(int_gvecs) # number of plane waves 
+  nmo = mo_coeff.shape[1]
+
+  psig = np.zeros([nmo,npw,2]) # store real & complex
+  for istate0,psig_chunk in iter_mo_psig(mo_coeff,aoR,cell_gs,cell_vol,
+      int_gvecs=int_gvecs,chunk_size=chunk_size):
+    psig[istate0:istate0+len(psig_chunk)] = psig_chunk
+  # end for istate0
   return int_gvecs,psig
 # end def mo_coeff_to_psig
 
@@ -250,15 +292,44 @@ def generate_pwscf_h5(cell,gvecs,eig_df,h5_fname):
   ref = PwscfH5()
   nelecs = ref.system_from_cell(new,cell)
   ref.create_electrons_group(new,gvecs,eig_df,nelecs)
-
-  # transfer version info. !!!! hard code for now
-  new.create_dataset('application/code',data=[np.string_('PySCF')])
-  new.create_dataset('application/version',data=[np.string_('1.7.5')])
-  new.create_dataset('format',data=[np.string_('ES-HDF')])
-  new.create_dataset('version',data=[2,1,0])
+  write_application_info(new)
   new.close()
 # end def generate_pwscf_h5
 
+def generate_pwscf_h5_from_mf(cell,mf,h5_fname,chunk_size=64):
+  """ write gamma-point orbitals of 'mf' directly to 'h5_fname'
+  orbitals are FFTed and written chunk_size at a time, so the full
+  plane-wave eigensystem is never held in memory """
+  ikpt  = 0 # gamma-point calculation
+  ispin = 0 # restricted (same orbitals for up and down electrons)
+  nstate = mf.mo_coeff.shape[1]
+
+  new = h5py.File(h5_fname,'w')
+  ref = PwscfH5()
+  nelecs = ref.system_from_cell(new,cell)
+  aoR = ao_on_grid(mf.cell)
+  gvecs = get_int_gvecs(mf.cell.gs)
+  kpt_path = ref.create_kpoint_group(new,ikpt,mf.kpt,gvec=gvecs)
+  spin_path = ref.create_spin_group(new,kpt_path,ispin,nstate)
+  for istate0,psig in iter_mo_psig(mf.mo_coeff,aoR,mf.cell.gs,mf.cell.vol,
+      int_gvecs=gvecs,chunk_size=chunk_size):
+    ref.write_states(new,spin_path,istate0,psig)
+  # end for istate0
+  evals = np.array(mf.mo_energy[:nstate],dtype=float)
+  new[spin_path].create_dataset('eigenvalues',data=evals)
+  ref.create_electrons_info(new,nelecs,1)
+  write_application_info(new)
+  new.close()
+# end def generate_pwscf_h5_from_mf
+
+def write_application_info(h5_handle):
+  # transfer version info. !!!! hard code for now
+  h5_handle.create_dataset('application/code',data=[np.string_('PySCF')])
+  h5_handle.create_dataset('application/version',data=[np.string_('1.7.5')])
+  h5_handle.create_dataset('format',data=[np.string_('ES-HDF')])
+  h5_handle.create_dataset('version',data=[2,1,0])
+# end def write_application_info
+
 # =======================================================================
 # Class for bspline h5 generator
 # =======================================================================
@@ -351,16 +422,20 @@ class PwscfH5:
     Inputs: 
      gvecs: gvectors in reciprocal lattice units i.e. integers
      psig: planewave coefficients, should have the same length as gvecs
+       may also be a stack of orbitals with shape (norb,npw)
      vol: simulation cell volume, used to normalized fft
     Output:
-     rgrid: orbital on a real-space grid """
-    assert len(gvecs) == len(psig)
-
-    kgrid = np.zeros(rgrid_shape,dtype=complex)
-    for igvec in range(len(gvecs)):
-      kgrid[tuple(gvecs[igvec])] = psig[igvec]
-    # end for
-    rgrid = np.fft.ifftn(kgrid) * np.prod(rgrid_shape)/vol
+     rgrid: orbital on a real-space grid, shape (norb,)+rgrid_shape for stacked psig """
+    gvecs = np.asarray(gvecs,dtype=int)
+    psig  = np.asarray(psig)
+    assert len(gvecs) == psig.shape[-1]
+    rgrid_shape = tuple(rgrid_shape)
+
+    lead  = psig.shape[:-1]
+    kgrid = np.zeros(lead+rgrid_shape,dtype=complex)
+    kgrid[(Ellipsis,)+tuple(gvecs.T)] = psig
+    axes  = tuple(range(len(lead),len(lead)+len(rgrid_shape)))
+    rgrid = np.fft.ifftn(kgrid,axes=axes) * np.prod(rgrid_shape)/vol
     return rgrid
   # end def psig_to_psir
 
@@ -437,43 +512,70 @@ class PwscfH5:
     nkpt,nspin = len(kpoints),len(spins)
     # transfer orbitals (electrons group)
     for ikpt in range(nkpt):
-      # !!!! assume no symmetry was used to generate the kpoints
-      kpt_path = 'electrons/kpoint_%d'%ikpt
-      kgrp = h5_handle.create_group(kpt_path)
-      kgrp.create_dataset('num_sym',data=[1])
-      kgrp.create_dataset('symgroup',data=[1])
-      kgrp.create_dataset('weight',data=[1])
-
       rkvec = df.loc[ikpt,'reduced_k'].values[0]
-      kgrp.create_dataset('reduced_k',data=rkvec)
-      if ikpt == 0: # store gvectors in kpoint_0
-        kgrp.create_dataset('gvectors',data=gvec)
-        kgrp.create_dataset('number_of_gvectors',data=[len(gvec)])
-      # end if 
+      kpt_path = PwscfH5.create_kpoint_group(h5_handle,ikpt,rkvec,
+        gvec=gvec if ikpt == 0 else None) # store gvectors in kpoint_0
 
       for ispin in range(nspin): # assume ispin==0
         nstate = len(df.loc[(ikpt,ispin)])
-        spin_path = os.path.join(kpt_path,'spin_%d'%ispin)
-        spgrp     = h5_handle.create_group(spin_path)
-        spgrp.create_dataset('number_of_states',data=[nstate])
+        spin_path = PwscfH5.create_spin_group(h5_handle,kpt_path,ispin,nstate)
 
         evals = np.zeros(nstate) # fill eigenvalues during eigenvector read
         for istate in range(nstate):
-          state_path = os.path.join(spin_path,'state_%d'%istate)
           psig = df.loc[(ikpt,ispin,istate),'evector']
-          psig_path = os.path.join(state_path,'psi_g')
-          h5_handle.create_dataset(psig_path,data=psig)
+          PwscfH5.write_states(h5_handle,spin_path,istate,[psig])
           evals[istate] = df.loc[(ikpt,ispin,istate),'evalue']
         # end for istate
-        spgrp.create_dataset('eigenvalues',data=evals)
+        h5_handle[spin_path].create_dataset('eigenvalues',data=evals)
       # end for ispin
     # end for ikpt
-    # transfer orbital info
+    PwscfH5.create_electrons_info(h5_handle,nelec,nkpt)
+  # end def create_electrons_group
+
+  @staticmethod
+  def create_kpoint_group(h5_handle,ikpt,rkvec,gvec=None):
+    """ create /electrons/kpoint_ikpt group, return its path """
+    # !!!! assume no symmetry was used to generate the kpoints
+    kpt_path = 'electrons/kpoint_%d'%ikpt
+    kgrp = h5_handle.create_group(kpt_path)
+    kgrp.create_dataset('num_sym',data=[1])
+    kgrp.create_dataset('symgroup',data=[1])
+    kgrp.create_dataset('weight',data=[1])
+    kgrp.create_dataset('reduced_k',data=rkvec)
+    if gvec is not None:
+      kgrp.create_dataset('gvectors',data=gvec)
+      kgrp.create_dataset('number_of_gvectors',data=[len(gvec)])
+    # end if
+    return kpt_path
+  # end def create_kpoint_group
+
+  @staticmethod
+  def create_spin_group(h5_handle,kpt_path,ispin,nstate):
+    """ create spin_ispin group under kpt_path, return its path """
+    spin_path = os.path.join(kpt_path,'spin_%d'%ispin)
+    spgrp     = h5_handle.create_group(spin_path)
+    spgrp.create_dataset('number_of_states',data=[nstate])
+    return spin_path
+  # end def create_spin_group
+
+  @staticmethod
+  def write_states(h5_handle,spin_path,istate0,psigs):
+    """ write consecutive states starting at istate0, psigs[i] has shape (npw,2) """
+    for i,psig in enumerate(psigs):
+      state_path = os.path.join(spin_path,'state_%d'%(istate0+i))
+      psig_path = os.path.join(state_path,'psi_g')
+      h5_handle.create_dataset(psig_path,data=psig)
+    # end for i
+  # end def write_states
+
+  @staticmethod
+  def create_electrons_info(h5_handle,nelec,nkpt):
+    """ transfer orbital info to /electrons """
     h5_handle.create_dataset('electrons/number_of_electrons',data=nelec)
     h5_handle.create_dataset('electrons/number_of_kpoints',data=[nkpt])
     # !!!! hard-code restricted orbitals
     h5_handle.create_dataset('electrons/number_of_spins',data=[1])
-  # end def create_electrons_group
+  # end def create_electrons_info
 
   @staticmethod
   def system_from_cell(h5_handle,cell):
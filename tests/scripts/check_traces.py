@@ -546,9 +546,10 @@ class ScalarHDFFile(DataFile):
 #   QMCPACK writes one traces.h5 for each MPI task.
 #   At every MC step, data from each walker is written to this file.
 class TracesFileHDF(DataFile):
-    def __init__(self,filepath=None,blocks=None):
+    def __init__(self,filepath=None,blocks=None,chunk_rows=None):
         self.info = obj(
             blocks              = blocks,
+            chunk_rows          = chunk_rows,
             particle_sums_valid = None,
             )
         DataFile.__init__(self,filepath)
@@ -556,6 +557,20 @@ class TracesFileHDF(DataFile):
 
 
     def read(self,filepath=None):
+        if self.info.chunk_rows is not None:
+            # Read only the serialization layout.  Trace columns are 
+            #   streamed from the file in slabs of chunk_rows rows as 
+            #   they are needed, so the full table is never held.
+            h = h5py.File(filepath,'r')
+            self.layout = obj()
+            for name in ('int_data','real_data'):
+                self.layout[name] = read_layout(h[name]['layout'])
+            #end for
+            h.close()
+            self.accumulate_scalars()
+            return
+        #end if
+
         # Open the traces.h5 file
         hr = HDFreader(filepath)
         if not hr._success:
@@ -634,6 +649,9 @@ class TracesFileHDF(DataFile):
     # Perform internal consistency check between per-walker single 
     #   particle energies and per-walker total energies.
     def check_particle_sums(self,tol):
+        if self.info.chunk_rows is not None:
+            return self.stream_check_particle_sums(tol)
+        #end if
         t = self.real_traces
 
         # Determine quantities present as "scalars" (total values) and also per-particle
@@ -668,11 +686,7 @@ class TracesFileHDF(DataFile):
 
             # Compare total and summed quantities
             qsame = (abs(q-qs)<tol).all()
-            if qsame:
-                log('{:<16} matches'.format(qname),n=3)
-            else:
-                log('{:<16} does not match'.format(qname),n=3)
-            #end if
+            log_particle_sum(qname,qsame)
             same = same and qsame
         #end for
         self.info.particle_sums_valid = same
@@ -680,6 +694,79 @@ class TracesFileHDF(DataFile):
     #end def check_particle_sums
 
 
+    # Same check as check_particle_sums, but only the columns of the 
+    #   summed quantities are read, one slab of chunk_rows rows at a time.
+    def stream_check_particle_sums(self,tol):
+        chunk_rows = self.info.chunk_rows
+        layout = self.layout.real_data
+
+        # Determine quantities present as "scalars" and also per-particle
+        other_names = []
+        for dname,domain in layout.items():
+            if dname!='scalars':
+                other_names.extend(domain.keys())
+            #end if
+        #end for
+        sum_names = sorted(set(layout.scalars.keys()) & set(other_names))
+
+        # Collect the columns and shapes of the per-particle quantities
+        parts   = obj()
+        columns = []
+        for qname in sum_names:
+            columns.append(layout.scalars[qname].row_start)
+            qparts = []
+            for dname,domain in layout.items():
+                if dname!='scalars' and qname in domain:
+                    q = domain[qname]
+                    cols = list(range(q.row_start,q.row_end))
+                    qparts.append((cols,quantity_shape(q)))
+                    columns.extend(cols)
+                #end if
+            #end for
+            parts[qname] = qparts
+        #end for
+
+        # Perform the sums over particles slab by slab
+        qsame = obj()
+        for qname in sum_names:
+            qsame[qname] = True
+        #end for
+        h = h5py.File(self.filepath,'r')
+        rtraces = h['real_data']['traces']
+        if len(columns)>0:
+            for r in range(0,len(rtraces),chunk_rows):
+                rt,pos = read_columns(rtraces,r,chunk_rows,columns)
+                n = len(rt)
+                for qname in sum_names:
+                    q  = rt[:,pos[layout.scalars[qname].row_start]]
+                    qs = np.zeros((n,))
+                    for cols,shape in parts[qname]:
+                        quantity = rt[:,[pos[c] for c in cols]]
+                        quantity.shape = tuple([n]+shape)
+                        tqs = quantity.sum(1)
+                        if len(tqs.shape)==1:
+                            qs += tqs
+                        else:
+                            qs += tqs[:,0]
+                        #end if
+                    #end for
+                    qsame[qname] &= (abs(q-qs)<tol).all()
+                #end for
+            #end for
+        #end if
+        h.close()
+
+        # Compare total and summed quantities
+        same = True
+        for qname in sum_names:
+            log_particle_sum(qname,qsame[qname])
+            same = same and qsame[qname]
+        #end for
+        self.info.particle_sums_valid = same
+        return self.info.particle_sums_valid
+    #end def stream_check_particle_sums
+
+
     # Sum trace data over walkers into per-step and per-block totals
     def accumulate_scalars(self):
         # Get block and step information for the qmc method
@@ -690,85 +777,183 @@ class TracesFileHDF(DataFile):
             return
         #end if
 
-        # Get real and int valued trace data
-        tr = self.real_traces
-        ti = self.int_traces
+        if self.info.chunk_rows is None:
+            # Get real and int valued trace data
+            tr = self.real_traces
+            ti = self.int_traces
 
-        # Names shared by traces and scalar files
-        scalar_names = set(tr.scalars.keys())
+            # Walker step and weight traces
+            st = ti.scalars.step
+            wt = tr.scalars.weight
+            if len(st)!=len(wt):
+                self.error('weight and steps traces have different lengths')
+            #end if
 
-        # Walker step and weight traces
-        st = ti.scalars.step
-        wt = tr.scalars.weight
-        if len(st)!=len(wt):
-            self.error('weight and steps traces have different lengths')
+            st = st.reshape(len(st))
+            wt = wt.reshape(len(wt))
+
+            # Gather the remaining scalar quantities into columns
+            quantities = sorted(set(tr.scalars.keys())-set(['weight']))
+            qt = np.empty((len(wt),len(quantities)))
+            for n,qname in enumerate(quantities):
+                q = tr.scalars[qname]
+                if len(q)!=len(wt):
+                    self.error('quantity {0} trace is not commensurate with weight and steps traces'.format(qname))
+                #end if
+                qt[:,n] = q.reshape(len(q))
+            #end for
+
+            # Accumulate weights, walker population, and weighted 
+            #   quantities into steps (sum over walkers per step)
+            ws,ps,qs = sum_by_step(st,wt,qt)
+        else:
+            quantities,ws,ps,qs = self.stream_sum_by_step()
         #end if
 
         # Compute number of steps and steps per block
-        steps = st.max()+1
+        steps = len(ws)
         steps_per_block = steps//blocks
+        nbsteps = blocks*steps_per_block
 
-        # Accumulate weights into steps and blocks
-        ws   = np.zeros((steps,))
-        wb   = np.zeros((blocks,))
-        #ws2  = np.zeros((steps,))
-        for t in range(len(wt)): # accumulate over walker population per step
-            ws[st[t]] += wt[t]
-            #ws2[st[t]] += 1.0 # scalar.dat/stat.h5 set weights to 1.0 in dmc
-        #end for
-        s = 0
-        for b in range(blocks): # accumulate over steps in a block
-            wb[b] = ws[s:s+steps_per_block].sum()
-            #wb[b] = ws2[s:s+steps_per_block].sum()
-            s+=steps_per_block
-        #end for
-
-        # Accumulate walker population into steps
-        ps  = np.zeros((steps,))
-        for t in range(len(wt)):
-            ps[st[t]] += 1
-        #end for
+        # Accumulate steps into blocks
+        wb = ws[:nbsteps].reshape(blocks,steps_per_block).sum(1)
+        qb = qs[:nbsteps].reshape(blocks,steps_per_block,len(quantities)).sum(1)
 
-        # Accumulate quantities into steps and blocks
+        # Form per-step and per-block averages
         #   These are the values directly comparable with data in 
         #   scalar.dat, stat.h5, and dmc.dat.
         scalars_by_step  = obj(Weight=ws,NumOfWalkers=ps)
         scalars_by_block = obj(Weight=wb)
-        qs   = np.zeros((steps,))
-        qb   = np.zeros((blocks,))
-        qs2  = np.zeros((steps,))
-        quantities = set(tr.scalars.keys())
-        quantities.remove('weight')
-        for qname in quantities:
-            qt = tr.scalars[qname]
-            if len(qt)!=len(wt):
-                self.error('quantity {0} trace is not commensurate with weight and steps traces'.format(qname))
-            #end if
-            qs[:] = 0
-            #qs2[:] = 0
-            for t in range(len(wt)):
-                qs[st[t]] += wt[t]*qt[t]
-                #qs2[st[t]] += 1.0*qt[t]
-            #end for
-            qb[:] = 0
-            s=0
-            for b in range(blocks):
-                qb[b] = qs[s:s+steps_per_block].sum()
-                #qb[b] = qs2[s:s+steps_per_block].sum()
-                s+=steps_per_block
-            #end for
-            qb = qb/wb
-            qs = qs/ws
-            scalars_by_step[qname]  = qs.copy()
-            scalars_by_block[qname] = qb.copy()
+        for n,qname in enumerate(quantities):
+            scalars_by_step[qname]  = qs[:,n]/ws
+            scalars_by_block[qname] = qb[:,n]/wb
         #end for
         self.scalars_by_step  = scalars_by_step
         self.scalars_by_block = scalars_by_block
     #end def accumulate_scalars
+
+
+    # Sum the step, weight, and scalar quantity columns over walkers 
+    #   into per-step totals, reading only those columns one slab of 
+    #   chunk_rows rows at a time.
+    def stream_sum_by_step(self):
+        chunk_rows = self.info.chunk_rows
+        ilayout = self.layout.int_data.scalars
+        rlayout = self.layout.real_data.scalars
+        istep   = ilayout.step.row_start
+        iweight = rlayout.weight.row_start
+        quantities = sorted(set(rlayout.keys())-set(['weight']))
+        iquant  = [rlayout[qname].row_start for qname in quantities]
+
+        h = h5py.File(self.filepath,'r')
+        itraces = h['int_data']['traces']
+        rtraces = h['real_data']['traces']
+        nrows = len(rtraces)
+        if len(itraces)!=nrows:
+            self.error('weight and steps traces have different lengths')
+        #end if
+        ws = np.zeros((0,))
+        ps = np.zeros((0,))
+        qs = np.zeros((0,len(quantities)))
+        for r in range(0,nrows,chunk_rows):
+            st = itraces[r:r+chunk_rows,istep]
+            if len(st)==0:
+                continue
+            #end if
+            rt,pos = read_columns(rtraces,r,chunk_rows,[iweight]+iquant)
+            wt = rt[:,pos[iweight]]
+            qt = rt[:,[pos[c] for c in iquant]]
+
+            # Add the slab totals to the running per-step totals
+            steps = max(st.max()+1,len(ws))
+            cws,cps,cqs = sum_by_step(st,wt,qt,steps)
+            cws[:len(ws)] += ws
+            cps[:len(ps)] += ps
+            cqs[:len(qs)] += qs
+            ws,ps,qs = cws,cps,cqs
+        #end for
+        h.close()
+        return quantities,ws,ps,qs
+    #end def stream_sum_by_step
 #end class TracesFileHDF
 
 
 
+# Read the serialization layout of an "int_data" or "real_data" group
+def read_layout(hlayout):
+    layout = obj()
+    for dname,hdomain in hlayout.items():
+        domain = obj()
+        for qname,hquantity in hdomain.items():
+            q = obj()
+            for vname,value in hquantity.items():
+                q[vname] = np.array(value).ravel()
+            #end for
+            for vname in ('row_start','row_end','dimension','unit_size'):
+                q[vname] = int(q[vname][0])
+            #end for
+            domain[qname] = q
+        #end for
+        layout[dname] = domain
+    #end for
+    return layout
+#end def read_layout
+
+
+# Per-row shape of a quantity, as in TracesFileHDF.init_trace
+def quantity_shape(q):
+    shape = list(q.shape[0:q.dimension])
+    if q.unit_size!=1:
+        shape.append(q.unit_size)
+    #end if
+    return shape
+#end def quantity_shape
+
+
+# Read a slab of trace rows restricted to the given columns.
+#   Also returns the position of each column within the slab.
+def read_columns(traces,r,chunk_rows,columns):
+    cols = sorted(set(columns))
+    slab = traces[r:r+chunk_rows,cols]
+    pos  = dict([(c,n) for n,c in enumerate(cols)])
+    return slab,pos
+#end def read_columns
+
+
+# Sum weights, walker counts, and weighted quantities over walkers 
+#   at each step.  Rows are grouped by step (stable sort if needed) 
+#   and each group is reduced at once.
+def sum_by_step(st,wt,qt,steps=None):
+    if steps is None:
+        steps = st.max()+1
+    #end if
+    ws = np.bincount(st,weights=wt,minlength=steps)
+    ps = np.bincount(st,minlength=steps).astype(float)
+    qs = np.zeros((steps,qt.shape[1]))
+    if len(st)>0:
+        if (st[1:]<st[:-1]).any():
+            order = np.argsort(st,kind='stable')
+            st = st[order]
+            wt = wt[order]
+            qt = qt[order]
+        #end if
+        starts = np.flatnonzero(np.concatenate(([True],st[1:]!=st[:-1])))
+        qs[st[starts]] = np.add.reduceat(wt[:,np.newaxis]*qt,starts,axis=0)
+    #end if
+    return ws,ps,qs
+#end def sum_by_step
+
+
+def log_particle_sum(qname,qsame):
+    if qsame:
+        log('{:<16} matches'.format(qname),n=3)
+    else:
+        log('{:<16} does not match'.format(qname),n=3)
+    #end if
+#end def log_particle_sum
+
+
+
 # Aggregates data from the full collection of traces.h5 files for a 
 #   single series (e.g. VMC == series 0) and compares aggregated trace
 #   values to data in scalar.dat, stat.h5, and dmc.dat.
@@ -792,6 +977,7 @@ class TracesAnalyzer(DevBase):
         mpi    = options.mpi
         pseudo = options.pseudo
         path   = options.path
+        chunk_rows = options.chunk_rows
 
         # Determine the quantities to check
         dmc_dat_quants = ['Weight','LocalEnergy','NumOfWalkers']
@@ -864,7 +1050,7 @@ class TracesAnalyzer(DevBase):
         self.data = obj()
         blocks = len(self.scalar_dat.data.first())
         for filepath in sorted(trace_files):
-            trace_file = TracesFileHDF(filepath,blocks)
+            trace_file = TracesFileHDF(filepath,blocks,chunk_rows)
             self.data.append(trace_file)
         #end for
         assert(len(self.data)==mpi)
@@ -1274,6 +1460,10 @@ if __name__=='__main__':
                       default='0',
                       help='Exclude a number of DMC steps from being checked.  This option is temporary and will be removed once a bug in the DMC weights for the first step is fixed (default=%default).'
                       )
+    parser.add_option('--chunk_rows',dest='chunk_rows',
+                      default='None',
+                      help='Stream each traces.h5 file in slabs of this many rows, reading only the columns needed for the checks instead of loading the full file (default=%default).'
+                      )
     parser.add_option('--tol',dest='tolerance',
                       default='1e-8',
                       help='Tolerance to check (default=%default).'
@@ -1319,6 +1509,11 @@ if __name__=='__main__':
     options.methods = process_list(options.methods)
     options.mpi     = int(options.mpi)
     options.dmc_steps_exclude = int(options.dmc_steps_exclude)
+    if options.chunk_rows=='None':
+        options.chunk_rows = None
+    else:
+        options.chunk_rows = int(options.chunk_rows)
+    #end if
     if options.quantities=='default':
         options.quantities = None
     else:
@@ -7,7 +7,8 @@ import scipy.stats
 import scipy.integrate
 from afqmctools.analysis.extraction import (
         get_metadata,
-        extract_observable
+        extract_observable,
+        iterate_observable
         )
 
 
@@ -15,7 +16,8 @@ from afqmctools.analysis.extraction import (
 WALKER_TYPE = ['undefined', 'closed', 'collinear', 'non_collinear']
 
 
-def average_one_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None):
+def average_one_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None,
+                    block_size=1):
     """Average AFQMC 1RDM.
 
     Returns P_{sij} = <c_{is}^+ c_{js}^> as a (nspin, M, M) dimensional array.
@@ -35,6 +37,9 @@ def average_one_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=No
     ix : int
         Back propagation path length to average. Optional.
         Default: None (chooses longest path).
+    block_size : int
+        Number of consecutive samples to reblock before computing error bar.
+        Optional. Default 1 (no reblocking).
 
     Returns
     -------
@@ -45,7 +50,8 @@ def average_one_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=No
     """
     md = get_metadata(filename)
     mean, err = average_observable(filename, 'one_rdm', eqlb=eqlb, skip=skip,
-                                   estimator=estimator, ix=ix)
+                                   estimator=estimator, ix=ix,
+                                   block_size=block_size)
     nbasis = md['NMO']
     wt = md['WalkerType']
     try:
@@ -63,7 +69,8 @@ def average_one_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=No
         print('Unknown walker type.')
         return None
 
-def average_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None):
+def average_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None,
+                    block_size=1):
     """Average AFQMC 2RDM.
 
     Returns a list of 2RDMS, where 
@@ -86,6 +93,9 @@ def average_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=No
     ix : int
         Back propagation path length to average. Optional.
         Default: None (chooses longest path).
+    block_size : int
+        Number of consecutive samples to reblock before computing error bar.
+        Optional. Default 1 (no reblocking).
 
     Returns
     -------
@@ -96,7 +106,8 @@ def average_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=No
     """
     md = get_metadata(filename)
     mean, err = average_observable(filename, 'two_rdm', eqlb=eqlb, skip=skip,
-                                   estimator=estimator, ix=ix)
+                                   estimator=estimator, ix=ix,
+                                   block_size=block_size)
     nbasis = md['NMO']
     wt = md['WalkerType']
     try:
@@ -114,7 +125,8 @@ def average_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=No
         print('Unknown walker type.')
         return None
 
-def average_diag_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None):
+def average_diag_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None,
+                         block_size=1):
     """Average diagonal part of 2RDM.
 
     Returns <c_{is}^+ c_{jt}^+ c_{jt} c_{is}> as a (2M,2M) dimensional array.
@@ -134,6 +146,9 @@ def average_diag_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1,
     ix : int
         Back propagation path length to average. Optional.
         Default: None (chooses longest path).
+    block_size : int
+        Number of consecutive samples to reblock before computing error bar.
+        Optional. Default 1 (no reblocking).
 
     Returns
     -------
@@ -144,7 +159,8 @@ def average_diag_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1,
     """
     md = get_metadata(filename)
     mean, err = average_observable(filename, 'diag_two_rdm', eqlb=eqlb, skip=skip,
-                                   estimator=estimator, ix=ix)
+                                   estimator=estimator, ix=ix,
+                                   block_size=block_size)
     nbasis = md['NMO']
     wt = md['WalkerType']
     try:
@@ -154,7 +170,7 @@ def average_diag_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1,
 
     if walker == 'closed':
         dm_size = nbasis*(2*nbasis-1) - nbasis*(nbasis-1) // 2
-        assert mean.shape == dm_size
+        assert mean.shape == (dm_size,)
         two_rdm = numpy.zeros((2*nbasis, 2*nbasis), dtype=mean.dtype)
         two_rdm_err = numpy.zeros((2*nbasis, 2*nbasis), dtype=mean.dtype)
         ij = 0
@@ -168,7 +184,7 @@ def average_diag_two_rdm(filename, estimator='back_propagated', eqlb=1, skip=1,
         two_rdm[nbasis:,nbasis:] = two_rdm[:nbasis,:nbasis].copy()
     elif walker == 'collinear':
         dm_size = nbasis*(2*nbasis-1)
-        assert mean.shape == dm_size
+        assert mean.shape == (dm_size,)
         two_rdm = numpy.zeros((2*nbasis, 2*nbasis), dtype=mean.dtype)
         two_rdm_err = numpy.zeros((2*nbasis, 2*nbasis), dtype=mean.dtype)
         ij = 0
@@ -323,9 +339,12 @@ def average_atom_correlations(filename, estimator='back_propagated', eqlb=1, ski
                 ss_mean.reshape((npts,-1)), ss_err.reshape((npts,-1))
 
 def average_observable(filename, name, eqlb=1, estimator='back_propagated',
-                       ix=None, skip=1):
+                       ix=None, skip=1, block_size=1, weighted=False):
     """Compute mean and error bar for AFQMC HDF5 observable.
 
+    Samples are streamed from the file so only a few samples are held in
+    memory at any time.
+
     Parameters
     ----------
     filename : string
@@ -343,6 +362,11 @@ def average_observable(filename, name, eqlb=1, estimator='back_propagated',
     ix : int
         Back propagation path length to average. Optional.
         Default: None (chooses longest path).
+    block_size : int
+        Number of consecutive samples to reblock before computing error bar.
+        Optional. Default 1 (no reblocking).
+    weighted : bool
+        Weight samples by their denominator. Optional. Default False.
 
     Returns
     -------
@@ -358,9 +382,76 @@ def average_observable(filename, name, eqlb=1, estimator='back_propagated',
         err = None
         print("# Error analysis for free projection not implemented.")
     else:
-        data = extract_observable(filename, name=name, estimator=estimator, ix=ix)
-        mean = numpy.mean(data[eqlb:len(data):skip], axis=0)
-        err = scipy.stats.sem(data[eqlb:len(data):skip].real, axis=0)
+        samples = iterate_observable(filename, name=name, estimator=estimator,
+                                     ix=ix, start=eqlb, skip=skip)
+        mean, err = online_average(samples, block_size=block_size,
+                                   weighted=weighted)
+    return mean, err
+
+def online_average(samples, block_size=1, weighted=False):
+    """Streaming mean and standard error of a series of samples.
+
+    Uses a (weighted) Welford update per element, so memory is independent of
+    the number of samples. Error bars are computed from the real part of the
+    data.
+
+    Parameters
+    ----------
+    samples : iterable
+        Yields (data, weight) tuples.
+    block_size : int
+        Number of consecutive samples averaged into a block before the variance
+        update. A trailing incomplete block is discarded. Optional. Default 1.
+    weighted : bool
+        Weight samples (and blocks) by weight. Optional. Default False.
+
+    Returns
+    -------
+    mean : :class:`numpy.ndarray`
+        Averaged quantity. None if there were no samples.
+    err : :class:`numpy.ndarray`
+        Standard error of the mean.
+    """
+    nblock = 0
+    wsum = 0.0
+    w2sum = 0.0
+    mean = None
+    m2 = None
+    bsum = None
+    bwt = 0.0
+    bcount = 0
+    for data, weight in samples:
+        wt = weight.real if weighted else 1.0
+        if bsum is None:
+            bsum = wt * data
+        else:
+            bsum += wt * data
+        bwt += wt
+        bcount += 1
+        if bcount < block_size:
+            continue
+        x = bsum / bwt
+        nblock += 1
+        wsum += bwt
+        w2sum += bwt**2
+        if mean is None:
+            mean = numpy.array(x)
+            m2 = numpy.zeros(x.shape)
+        else:
+            delta = x.real - mean.real
+            mean += (bwt/wsum) * (x-mean)
+            m2 += bwt * delta * (x.real-mean.real)
+        bsum = None
+        bwt = 0.0
+        bcount = 0
+    if mean is None:
+        return None, None
+    if nblock > 1:
+        var = m2 / wsum * nblock / (nblock-1)
+        neff = wsum**2 / w2sum
+        err = numpy.sqrt(var/neff)
+    else:
+        err = numpy.full(mean.shape, numpy.nan)
     return mean, err
 
 def average_gen_fock(filename, fock_type='plus', estimator='back_propagated',
@@ -415,7 +506,7 @@ def average_gen_fock(filename, fock_type='plus', estimator='back_propagated',
         return None
 
 def get_noons(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None,
-              nsamp=20, screen_factor=1, cutoff=1e-14):
+              nsamp=20, screen_factor=1, cutoff=1e-14, block_size=1):
     """Get NOONs from averaged AFQMC RDM.
 
     Parameters
@@ -433,6 +524,9 @@ def get_noons(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None,
     ix : int
         Back propagation path length to average. Optional.
         Default: None (chooses longest path).
+    block_size : int
+        Number of consecutive samples to reblock before computing error bar.
+        Optional. Default 1 (no reblocking).
     nsamp : int
         Number of perturbed RDMs to construct to estimate of error bar. Optional.
         Default: 20.
@@ -447,8 +541,8 @@ def get_noons(filename, estimator='back_propagated', eqlb=1, skip=1, ix=None,
     noons_err : :class:`numpy.ndarray`
         Estimate of error bar on NOONs.
     """
-    P, Perr = average_one_rdm(filename, estimator='back_propagated', eqlb=1,
-                              skip=1, ix=ix)
+    P, Perr = average_one_rdm(filename, estimator='back_propagated', eqlb=eqlb,
+                              skip=skip, ix=ix, block_size=block_size)
     if Perr.shape[0] == 2:
         # Collinear
         Perr = numpy.sqrt((Perr[0]**2 + Perr[1]**2))
@@ -92,9 +92,42 @@ def extract_data(filename, group, estimator, sample=None):
             denom = numpy.array([from_qmcpack_complex(fh5[group][d][:])[0] for d in denom_id])
         return numer, denom
 
-def extract_observable(filename, estimator='back_propagated',
-                       name='one_rdm', ix=None, sample=None):
-    """Extract observable from HDF5 file.
+def iterate_data(filename, group, estimator, start=0, skip=1):
+    """Iterate over samples of estimator stored in HDF5 file.
+
+    Only a single sample is held in memory at a time.
+
+    Parameters
+    ----------
+    filename : string
+        QMCPACK output containing density matrix (*.h5 file).
+    group : string
+        Path to estimator.
+    estimator : string
+        Estimator to analyse.
+    start : int
+        First sample to read. Optional. Default 0.
+    skip : int
+        Stride between samples. Optional. Default 1.
+
+    Returns
+    -------
+    samples : generator
+        Yields (numer, denom) for each sample, where numer is the numerator of
+        the estimator and denom the (scalar) denominator.
+    """
+    with h5py.File(filename, 'r') as fh5:
+        dsets = list(fh5[group].keys())
+        denom_id = [d for d in dsets if 'denominator' in d]
+        numer_id = [d for d in dsets if estimator in d]
+        for n, d in zip(numer_id[start::skip], denom_id[start::skip]):
+            numer = from_qmcpack_complex(fh5[group][n][:])
+            denom = from_qmcpack_complex(fh5[group][d][:])[0]
+            yield numer, denom
+
+def get_observable_path(filename, estimator='back_propagated',
+                        name='one_rdm', ix=None):
+    """Find location of observable in HDF5 file.
 
     Parameters
     ----------
@@ -108,17 +141,14 @@ def extract_observable(filename, estimator='back_propagated',
     ix : int
         Back propagation path length to average. Optional.
         Default: None (chooses longest path).
-    sample : int
-        Sample to extract. Optional. Default None (return everything).
 
     Returns
     -------
-    obs : :class:`numpy.ndarray`
-        Observable for a single sample or the full set of samples. Note if using
-        free projection the numerator and denominator are returned separately.
+    group : string
+        Path to estimator group. None if estimator type is unknown.
+    numer : string
+        Name of numerator datasets.
     """
-    sym_md = get_metadata(filename)
-    free_proj = sym_md['FreeProjection']
     if estimator == 'back_propagated':
         base = 'Observables/BackPropagated/'
         if ix is None:
@@ -132,14 +162,84 @@ def extract_observable(filename, estimator='back_propagated',
         base += ename['group']
     else:
         print("Unknown estimator type: {} ".format(estimator))
+        return None, None
+    return base, ename['numer']
+
+def extract_observable(filename, estimator='back_propagated',
+                       name='one_rdm', ix=None, sample=None):
+    """Extract observable from HDF5 file.
+
+    Parameters
+    ----------
+    filename : string
+        QMCPACK output containing density matrix (*.h5 file).
+    estimator : string
+        Estimator type to analyse. Options: back_propagated or mixed.
+        Default: back_propagated.
+    name : string
+        Name of observable (see estimates.py for list).
+    ix : int
+        Back propagation path length to average. Optional.
+        Default: None (chooses longest path).
+    sample : int
+        Sample to extract. Optional. Default None (return everything).
+
+    Returns
+    -------
+    obs : :class:`numpy.ndarray`
+        Observable for a single sample or the full set of samples. Note if using
+        free projection the numerator and denominator are returned separately.
+    """
+    sym_md = get_metadata(filename)
+    free_proj = sym_md['FreeProjection']
+    base, numer_name = get_observable_path(filename, estimator=estimator,
+                                           name=name, ix=ix)
+    if base is None:
         return None
-    numer, denom = extract_data(filename, base, ename['numer'], sample=sample)
+    numer, denom = extract_data(filename, base, numer_name, sample=sample)
     if free_proj:
         return (numer, denom)
     else:
         # Use array broadcasting to divide by weights.
         return numer / denom[:,None]
 
+def iterate_observable(filename, estimator='back_propagated',
+                       name='one_rdm', ix=None, start=0, skip=1):
+    """Iterate over samples of observable in HDF5 file.
+
+    Streaming version of extract_observable.
+
+    Parameters
+    ----------
+    filename : string
+        QMCPACK output containing density matrix (*.h5 file).
+    estimator : string
+        Estimator type to analyse. Options: back_propagated or mixed.
+        Default: back_propagated.
+    name : string
+        Name of observable (see estimates.py for list).
+    ix : int
+        Back propagation path length to average. Optional.
+        Default: None (chooses longest path).
+    start : int
+        First sample to read. Optional. Default 0.
+    skip : int
+        Stride between samples. Optional. Default 1.
+
+    Returns
+    -------
+    samples : generator
+        Yields (obs, weight) for each sample, where obs is the observable
+        normalised by its denominator weight.
+    """
+    base, numer_name = get_observable_path(filename, estimator=estimator,
+                                           name=name, ix=ix)
+    if base is None:
+        return
+    for numer, denom in iterate_data(filename, base, numer_name,
+                                     start=start, skip=skip):
+        yield numer / denom, denom
+
 def get_metadata(filename, path=''):
     """Extract QMC estimator metadata from h5 file.
 
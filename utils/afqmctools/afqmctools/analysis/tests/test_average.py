@@ -0,0 +1,71 @@
+import h5py
+import numpy
+import os
+import scipy.stats
+import unittest
+from afqmctools.analysis.average import (
+        average_observable,
+        average_one_rdm,
+        online_average
+        )
+from afqmctools.analysis.extraction import extract_observable
+
+numpy.random.seed(7)
+
+def write_estimator(filename, data, weights, nmo):
+    with h5py.File(filename, 'w') as fh5:
+        fh5['Metadata/FreeProjection'] = False
+        fh5['Metadata/NMO'] = nmo
+        fh5['Metadata/WalkerType'] = 2
+        base = 'Observables/BackPropagated/'
+        fh5[base+'Metadata/NumAverages'] = 1
+        for i, (d, w) in enumerate(zip(data, weights)):
+            grp = base + 'FullOneRDM/Average_0/'
+            numer = (w*d).astype(numpy.complex128)
+            fh5[grp+'one_rdm_{:06d}'.format(i)] = numer.view(numpy.float64)
+            denom = numpy.array([w], dtype=numpy.complex128)
+            fh5[grp+'denominator_{:06d}'.format(i)] = denom.view(numpy.float64)
+
+class TestAverage(unittest.TestCase):
+
+    def setUp(self):
+        self.nmo = 3
+        self.nsamp = 23
+        self.data = (numpy.random.random((self.nsamp,2*self.nmo*self.nmo))
+                     + 1j*numpy.random.random((self.nsamp,2*self.nmo*self.nmo)))
+        self.weights = numpy.random.random(self.nsamp) + 0.5
+        write_estimator('estimates.h5', self.data, self.weights, self.nmo)
+
+    def test_average_observable(self):
+        data = extract_observable('estimates.h5')
+        self.assertTrue(numpy.allclose(data, self.data))
+        for eqlb, skip in [(1,1), (3,2)]:
+            mean, err = average_observable('estimates.h5', 'one_rdm',
+                                           eqlb=eqlb, skip=skip)
+            ref = self.data[eqlb::skip]
+            self.assertTrue(numpy.allclose(mean, numpy.mean(ref, axis=0)))
+            self.assertTrue(numpy.allclose(err,
+                                           scipy.stats.sem(ref.real, axis=0)))
+        rdm, rdm_err = average_one_rdm('estimates.h5', eqlb=1)
+        self.assertEqual(rdm.shape, (2,self.nmo,self.nmo))
+
+    def test_online_average(self):
+        samples = zip(self.data, self.weights)
+        mean, err = online_average(samples, block_size=5, weighted=True)
+        nblock = self.nsamp // 5
+        w = self.weights[:5*nblock].reshape(nblock,5)
+        d = self.data[:5*nblock].reshape(nblock,5,-1)
+        bwt = w.sum(axis=1)
+        bmean = numpy.einsum('bs,bsi->bi', w, d) / bwt[:,None]
+        ref = numpy.einsum('b,bi->i', bwt, bmean) / bwt.sum()
+        self.assertTrue(numpy.allclose(mean, ref))
+        self.assertEqual(err.shape, ref.shape)
+
+    def tearDown(self):
+        try:
+            os.remove('estimates.h5')
+        except OSError:
+            pass
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import h5py
+import itertools
 import numpy
 import scipy.sparse
 import scipy.linalg
@@ -21,7 +22,144 @@ def get_dset_simple(fh5, name):
         print("Error reading {:} dataset".format(name))
         return None
 
-def read_fcidump(filename, symmetry=8, verbose=True):
+def read_fcidump_arrays(filename, chunk_size=2**24, verbose=True):
+    """Read integrals from FCIDUMP file into flat index and value arrays.
+
+    The file is parsed in blocks of roughly chunk_size bytes rather than line
+    by line.
+
+    Parameters
+    ----------
+    filename : string
+        File containing integrals in FCIDUMP format.
+    chunk_size : int
+        Approximate number of bytes parsed per block. Optional.
+    verbose : bool
+        Controls printing verbosity. Optional. Default: True.
+
+    Returns
+    -------
+    header : dict
+        NORB, NELEC and MS2 entries of the namelist header.
+    ikjl : :class:`numpy.ndarray`
+        Orbital indices (one based, chemist's notation) of each integral.
+        Shape: [nint,4].
+    vals : :class:`numpy.ndarray`
+        Integral values (complex if the file contains imaginary parts).
+    """
+    header = {'NORB': 0, 'NELEC': 0, 'MS2': 0}
+    # (re, im) pairs are written with parentheses and commas.
+    table = str.maketrans('(),', '   ')
+    ixs = []
+    vals = []
+    ncol = None
+    with open(filename) as f:
+        while True:
+            line = f.readline()
+            if not line or 'END' in line or '/' in line:
+                break
+            for i in line.split(','):
+                for k in header.keys():
+                    if k in i:
+                        header[k] = int(i.split('=')[1])
+        if verbose:
+            print("# Number of orbitals: {}".format(header['NORB']))
+            print("# Number of electrons: {}".format(header['NELEC']))
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            tokens = ''.join(lines).translate(table).split()
+            nline = sum(1 for l in lines if l.strip())
+            if ncol is None and nline > 0:
+                ncol = len(tokens) // nline
+            try:
+                if len(tokens) != nline*ncol or ncol not in (5,6):
+                    raise ValueError
+                block = numpy.array(tokens, dtype=numpy.float64)
+                block = block.reshape((-1,ncol))
+            except ValueError:
+                # Mixed real/complex lines.
+                block = numpy.zeros((len(lines),6))
+                for n, l in enumerate(lines):
+                    s = l.translate(table).split()
+                    if len(s) == 5:
+                        block[n,0] = float(s[0])
+                        block[n,2:] = [float(x) for x in s[1:]]
+                    elif len(s) == 6:
+                        block[n] = [float(x) for x in s]
+                    else:
+                        block[n,2:] = -1
+                block = block[block[:,2]>=0]
+            if block.shape[1] == 6:
+                vals.append(block[:,0] + 1j*block[:,1])
+            else:
+                vals.append(block[:,0])
+            ixs.append(block[:,-4:].astype(numpy.int64))
+    if len(vals) > 0:
+        cplx = any(v.dtype == numpy.complex128 for v in vals)
+        vals = numpy.concatenate(vals).astype(numpy.complex128 if cplx
+                                              else numpy.float64)
+        ikjl = numpy.concatenate(ixs)
+    else:
+        vals = numpy.zeros(0)
+        ikjl = numpy.zeros((0,4), dtype=numpy.int64)
+    return header, ikjl, vals
+
+def pair_index(i, j):
+    """Compound index of lower triangular pair (i>=j)."""
+    return i*(i+1)//2 + j
+
+def packed_eri_index(i, k, j, l):
+    """Index of (ik|jl) in 8-fold packed storage."""
+    ik = pair_index(numpy.maximum(i,k), numpy.minimum(i,k))
+    jl = pair_index(numpy.maximum(j,l), numpy.minimum(j,l))
+    return pair_index(numpy.maximum(ik,jl), numpy.minimum(ik,jl))
+
+def assign_in_file_order(out, index, values):
+    """Scatter values into out as sequential assignments would.
+
+    Where an element is targeted more than once the last entry wins, so
+    redundant integrals which disagree resolve as when the file is read
+    line by line.
+
+    Parameters
+    ----------
+    out : :class:`numpy.ndarray`
+        Array to assign to.
+    index : tuple of :class:`numpy.ndarray`
+        Indices into out, one array per dimension. Shape: [nint,nperm].
+        Entries are ordered by line first and permutation second.
+    values : :class:`numpy.ndarray`
+        Values to assign. Shape: [nint,nperm].
+    """
+    flat = numpy.ravel_multi_index(index, out.shape).ravel()
+    values = values.ravel()
+    # First occurrence in the reversed order is the last in file order.
+    u, last = numpy.unique(flat[::-1], return_index=True)
+    last = len(flat) - 1 - last
+    out.reshape(-1)[u] = values[last]
+
+def unpack_eri(h2e, nmo):
+    """Expand 8-fold packed two electron integrals to (ik|jl) array.
+
+    Parameters
+    ----------
+    h2e : :class:`numpy.ndarray`
+        Packed integrals as returned by read_fcidump(packed=True).
+    nmo : int
+        Number of orbitals.
+
+    Returns
+    -------
+    eri : :class:`numpy.ndarray`
+        Two-electron integrals. Shape: [nmo,nmo,nmo,nmo].
+    """
+    i, k, j, l = numpy.ix_(*(numpy.arange(nmo),)*4)
+    return h2e[packed_eri_index(i, k, j, l)]
+
+def read_fcidump(filename, symmetry=8, verbose=True, dtype=numpy.complex128,
+                 packed=False, chunk_size=2**24):
     """Read in integrals from file.
 
     Parameters
@@ -32,6 +170,15 @@ def read_fcidump(filename, symmetry=8, verbose=True):
         Permutational symmetry of two electron integrals.
     verbose : bool
         Controls printing verbosity. Optional. Default: False.
+    dtype : numpy dtype or None
+        Type of returned integrals. If None the integrals are real unless the
+        file contains complex numbers. Optional. Default: complex128.
+    packed : bool
+        Return two electron integrals in 8-fold packed storage, i.e. a one
+        dimensional array indexed by packed_eri_index. Requires symmetry=8.
+        Optional. Default: False.
+    chunk_size : int
+        Approximate number of bytes parsed at a time. Optional.
 
     Returns
     -------
@@ -45,77 +192,77 @@ def read_fcidump(filename, symmetry=8, verbose=True):
         Number of electrons.
     """
     assert(symmetry==1 or symmetry==4 or symmetry==8)
+    assert(not packed or symmetry==8)
     if verbose:
         print ("# Reading integrals in plain text FCIDUMP format.")
-    with open(filename) as f:
-        while True:
-            line = f.readline()
-            if 'END' in line or '/' in line:
-                break
-            for i in line.split(','):
-                if 'NORB' in i:
-                    nbasis = int(i.split('=')[1])
-                elif 'NELEC' in i:
-                    nelec = int(i.split('=')[1])
-                elif 'MS2' in i:
-                    ms2 = int(i.split('=')[1])
-        if verbose:
-            print("# Number of orbitals: {}".format(nbasis))
-            print("# Number of electrons: {}".format(nelec))
-        h1e = numpy.zeros((nbasis, nbasis), dtype=numpy.complex128)
-        h2e = numpy.zeros((nbasis, nbasis, nbasis, nbasis), dtype=numpy.complex128)
-        lines = f.readlines()
-        for l in lines:
-            s = l.split()
-            # ascii fcidump uses Chemist's notation for integrals.
-            # each line contains v_{ijkl} i k j l
-            # Note (ik|jl) = <ij|kl>.
-            if len(s) == 6:
-                # FCIDUMP from quantum package.
-                integral = float(s[0]) + 1j*float(s[1])
-                s = s[1:]
-            else:
-                try:
-                    integral = float(s[0])
-                except ValueError:
-                    ig = ast.literal_eval(s[0].strip())
-                    integral = ig[0] + 1j*ig[1]
-            i, k, j, l = [int(x) for x in s[1:]]
-            if i == j == k == l == 0:
-                ecore = integral
-            elif j == 0 and l == 0:
-                # <i|k> = <k|i>
-                h1e[i-1,k-1] = integral
-                h1e[k-1,i-1] = integral.conjugate()
-            elif i > 0  and j > 0 and k > 0 and l > 0:
-                # Assuming 8 fold symmetry in integrals.
-                # <ij|kl> = <ji|lk> = <kl|ij> = <lk|ji> =
-                # <kj|il> = <li|jk> = <il|kj> = <jk|li>
-                # (ik|jl)
-                h2e[i-1,k-1,j-1,l-1] = integral
-                if symmetry == 1:
-                    continue
-                # (jl|ik)
-                h2e[j-1,l-1,i-1,k-1] = integral
-                # (ki|lj)
-                h2e[k-1,i-1,l-1,j-1] = integral.conjugate()
-                # (lj|ki)
-                h2e[l-1,j-1,k-1,i-1] = integral.conjugate()
-                if symmetry == 4:
-                    continue
-                # (ki|jl)
-                h2e[k-1,i-1,j-1,l-1] = integral
-                # (lj|ik)
-                h2e[l-1,j-1,i-1,k-1] = integral
-                # (ik|lj)
-                h2e[i-1,k-1,l-1,j-1] = integral
-                # (jl|ki)
-                h2e[j-1,l-1,k-1,i-1] = integral
+    header, ikjl, vals = read_fcidump_arrays(filename, chunk_size=chunk_size,
+                                             verbose=verbose)
+    nbasis = header['NORB']
+    nelec = header['NELEC']
+    ms2 = header['MS2']
+    if dtype is None:
+        dtype = vals.dtype
+    if numpy.dtype(dtype).kind != 'c':
+        if numpy.any(numpy.abs(vals.imag) > 0):
+            print("# Found complex numbers in FCIDUMP but real dtype "
+                  "requested.")
+        vals = vals.real
+    # ascii fcidump uses Chemist's notation for integrals.
+    # each line contains v_{ijkl} i k j l
+    # Note (ik|jl) = <ij|kl>.
+    i, k, j, l = ikjl.T
+    vconj = vals.conj()
+    e0 = (i == 0) & (j == 0) & (k == 0) & (l == 0)
+    ecore = vals[e0][-1] if numpy.any(e0) else 0.0
+    one = (j == 0) & (l == 0) & ~e0
+    two = (i > 0) & (j > 0) & (k > 0) & (l > 0)
+    # Each line is expanded into its symmetry permutations (columns below)
+    # and all of them are scattered at once, with repeated elements
+    # resolved in file order by assign_in_file_order.
+    h1e = numpy.zeros((nbasis, nbasis), dtype=dtype)
+    io, ko = i[one]-1, k[one]-1
+    # <i|k> = <k|i>
+    assign_in_file_order(h1e,
+                         (numpy.stack([io,ko], axis=1),
+                          numpy.stack([ko,io], axis=1)),
+                         numpy.stack([vals[one],vconj[one]], axis=1))
+    i, k, j, l = i[two]-1, k[two]-1, j[two]-1, l[two]-1
+    v = vals[two]
+    vc = vconj[two]
+    if packed:
+        npair = nbasis*(nbasis+1)//2
+        h2e = numpy.zeros(npair*(npair+1)//2, dtype=dtype)
+        assign_in_file_order(h2e, (packed_eri_index(i, k, j, l),), v)
+    else:
+        h2e = numpy.zeros((nbasis, nbasis, nbasis, nbasis), dtype=dtype)
+        # Assuming 8 fold symmetry in integrals.
+        # <ij|kl> = <ji|lk> = <kl|ij> = <lk|ji> =
+        # <kj|il> = <li|jk> = <il|kj> = <jk|li>
+        # (ik|jl)
+        perms = [(i,k,j,l,v)]
+        if symmetry >= 4:
+            # (jl|ik)
+            perms.append((j,l,i,k,v))
+            # (ki|lj)
+            perms.append((k,i,l,j,vc))
+            # (lj|ki)
+            perms.append((l,j,k,i,vc))
+        if symmetry == 8:
+            # (ki|jl)
+            perms.append((k,i,j,l,v))
+            # (lj|ik)
+            perms.append((l,j,i,k,v))
+            # (ik|lj)
+            perms.append((i,k,l,j,v))
+            # (jl|ki)
+            perms.append((j,l,k,i,v))
+        perms = [numpy.stack(x, axis=1) for x in zip(*perms)]
+        assign_in_file_order(h2e, tuple(perms[:4]), perms[4])
     if symmetry == 8:
-        if numpy.any(numpy.abs(h1e.imag)) > 1e-18:
+        if numpy.any(numpy.abs(h1e.imag) > 1e-18):
             print("# Found complex numbers in one-body Hamiltonian but 8-fold"
                   " symmetry specified.")
-        if numpy.any(numpy.abs(h2e.imag)) > 1e-18:
+        if numpy.any(numpy.abs(h2e.imag) > 1e-18):
             print("# Found complex numbers in two-body Hamiltonian but 8-fold"
                   " symmetry specified.")
     nalpha = (nelec + ms2) // 2
@@ -323,10 +470,63 @@ def fmt_integral(intg, i, k, j, l, cplx, paren=False):
     return out
 
 
+def sym_mask(i, k, j, l, nmo, sym):
+    """Vectorized version of check_sym.
+
+    Parameters
+    ----------
+    i, k, j, l : :class:`numpy.ndarray`
+        Orbital indices of ERIs (broadcastable).
+    nmo : int
+        Number of orbitals
+    sym : int
+        Desired permutational symmetry to check.
+
+    Returns
+    -------
+    mask : :class:`numpy.ndarray`
+        True where the integral is unique from set of equivalent.
+    """
+    if sym == 1:
+        return numpy.ones(numpy.broadcast(i, k, j, l).shape, dtype=bool)
+    elif sym == 4:
+        # Lexicographic comparison of index tuples.
+        def key(a, b, c, d):
+            return ((a*nmo + b)*nmo + c)*nmo + d
+        ikjl = key(i, k, j, l)
+        return ((ikjl <= key(j, l, i, k)) & (ikjl <= key(k, i, l, j)) &
+                (ikjl <= key(l, j, k, i)))
+    else:
+        return (i >= k) & (j >= l) & (i + k*nmo >= j + l*nmo)
+
+def fmt_integrals(f, intg, i, k, j, l, cplx, paren=False, chunk=2**16):
+    """Write integrals to file in large formatted blocks.
+
+    Produces the same output as repeated calls to fmt_integral.
+    """
+    if cplx:
+        if paren:
+            fmt = '  (% 13.8e, % 13.8e) %4d  %4d  %4d  %4d\n'
+        else:
+            fmt = '  % 13.8e    % 13.8e  %4d  %4d  %4d  %4d\n'
+    else:
+        fmt = '  % 13.8e    %4d  %4d  %4d  %4d\n'
+    for s in range(0, len(intg), chunk):
+        e = s + chunk
+        cols = [intg[s:e].real.tolist()]
+        if cplx:
+            cols.append(intg[s:e].imag.tolist())
+        for x in (i, k, j, l):
+            cols.append((x[s:e]+1).tolist())
+        f.write((fmt*len(cols[0])) % tuple(itertools.chain(*zip(*cols))))
+
 def write_fcidump(filename, hcore, chol, enuc, nmo, nelec, tol=1e-8,
                   sym=1, cplx=True, paren=False):
     """Write FCIDUMP based from Cholesky factorised integrals.
 
+    ERIs are generated one block of fixed i at a time and only the symmetry
+    unique integrals are formatted.
+
     Parameters
     ----------
     filename : string
@@ -357,29 +557,32 @@ def write_fcidump(filename, hcore, chol, enuc, nmo, nelec, tol=1e-8,
               "symmetry with complex integrals.")
         cplx = False
 
+    # Indices of block for fixed i, ordered as k, j, l.
+    k, j, l = [x.ravel() for x in numpy.indices((nmo,nmo,nmo))]
+    cholT = chol.conj().T
+    found_complex = False
     with open(filename, 'w') as f:
         f.write(header)
-        # Generate M_{(ik),(lj)} = (ik|jl)
-        eris = chol.dot(chol.conj().T).toarray().reshape((nmo,nmo,nmo,nmo))
         for i in range(0,nmo):
-            for k in range(0,nmo):
-                for j in range(0,nmo):
-                    for l in range(0,nmo):
-                        sym_allowed = check_sym((i,k,j,l), nmo, sym)
-                        if abs(eris[i,k,l,j]) > tol and sym_allowed:
-                            if not cplx:
-                                if abs(eris[i,k,l,j].imag > 1e-12):
-                                    print("# Found complex integrals with cplx==False.")
-                                    #sys.exit()
-                            out = fmt_integral(eris[i,k,l,j], i, k, j, l,
-                                               cplx, paren=paren)
-                            f.write(out)
-        for i in range(0,nmo):
-            for j in range(0,i+1):
-                if abs(hcore[i,j]) > tol:
-                    out = fmt_integral(hcore[i,j], i, j, -1, -1,
-                                       cplx, paren=paren)
-                    f.write(out)
+            # Generate M_{(ik),(lj)} = (ik|jl)
+            eris = chol[i*nmo:(i+1)*nmo].dot(cholT)
+            if scipy.sparse.issparse(eris):
+                eris = eris.toarray()
+            eris = eris.reshape((nmo,nmo,nmo)).transpose((0,2,1)).ravel()
+            mask = sym_mask(i, k, j, l, nmo, sym) & (numpy.abs(eris) > tol)
+            eris = eris[mask]
+            if not cplx and not found_complex:
+                found_complex = numpy.any(numpy.abs(eris.imag) > 1e-12)
+                if found_complex:
+                    print("# Found complex integrals with cplx==False.")
+            fmt_integrals(f, eris, numpy.full(len(eris), i), k[mask],
+                          j[mask], l[mask], cplx, paren=paren)
+        i, j = numpy.tril_indices(nmo)
+        h = hcore[i,j]
+        mask = numpy.abs(h) > tol
+        none = numpy.full(numpy.count_nonzero(mask), -1)
+        fmt_integrals(f, h[mask], i[mask], j[mask], none, none,
+                      cplx, paren=paren)
 
         f.write(fmt_integral(enuc+0j,-1,-1,-1,-1, cplx, paren=paren))
 
@@ -605,47 +808,39 @@ def write_fcidump_kpoint(filename, hcore, chol, enuc, nmo_tot, nelec,
     for i in range(1,nkp):
         offsets[i] = offsets[i-1] + nmo_pk[i-1]
 
+    found_complex = False
     with open(filename, 'w') as f:
         f.write(header)
         for iq, lq in enumerate(chol):
             for ki in range(nkp):
+                kk = qk_k2[iq,ki]
                 for kl in range(nkp):
+                    kj = qk_k2[iq,kl]
                     eri = numpy.dot(lq[ki], lq[kl].conj().T)
-                    if not cplx:
-                        if len(numpy.where(numpy.abs(eri.imag) > 1e-12)) > 0:
+                    if not cplx and not found_complex:
+                        found_complex = numpy.any(numpy.abs(eri.imag) > 1e-12)
+                        if found_complex:
                             print("# Found complex integrals with cplx==False.")
-                            #sys.exit()
-                    ik = 0
-                    for i in range(0, nmo_pk[ki]):
-                        kk = qk_k2[iq,ki]
-                        I = i + offsets[ki]
-                        for k in range(0, nmo_pk[kk]):
-                            kj = qk_k2[iq,kl]
-                            K = k + offsets[kk]
-                            lj = 0
-                            for l in range(0, nmo_pk[kl]):
-                                L = l + offsets[kl]
-                                for j in range(0, nmo_pk[kj]):
-                                    J = j + offsets[kj]
-                                    sym_allowed = check_sym((I,K,J,L),
-                                                            nmo_tot, sym)
-                                    if abs(eri[ik,lj]) > tol and sym_allowed:
-                                        out = fmt_integral(eri[ik,lj],
-                                                           I, K, J, L,
-                                                           cplx, paren=paren)
-                                        f.write(out)
-                                    lj += 1
-                            ik += 1
+                    # eri[ik,lj] in written order i, k, l, j.
+                    I, K, L, J = numpy.ix_(
+                            numpy.arange(nmo_pk[ki]) + offsets[ki],
+                            numpy.arange(nmo_pk[kk]) + offsets[kk],
+                            numpy.arange(nmo_pk[kl]) + offsets[kl],
+                            numpy.arange(nmo_pk[kj]) + offsets[kj])
+                    mask = sym_mask(I, K, J, L, nmo_tot, sym)
+                    mask &= numpy.abs(eri.reshape(mask.shape)) > tol
+                    I, K, L, J = [numpy.broadcast_to(x, mask.shape)[mask]
+                                  for x in (I, K, L, J)]
+                    fmt_integrals(f, eri.reshape(mask.shape)[mask],
+                                  I, K, J, L, cplx, paren=paren)
 
         for ik, hk in enumerate(hcore):
-            for i in range(nmo_pk[ik]):
-                I = i + offsets[ik]
-                for j in range(nmo_pk[ik]):
-                    J = j + offsets[ik]
-                    if I >= J and abs(hk[i,j]) > tol:
-                        out = fmt_integral(hk[i,j], I, J, -1, -1,
-                                           cplx, paren=paren)
-                        f.write(out)
+            I, J = numpy.tril_indices(nmo_pk[ik])
+            h = hk[I,J]
+            mask = numpy.abs(h) > tol
+            none = numpy.full(numpy.count_nonzero(mask), -1)
+            fmt_integrals(f, h[mask], I[mask]+offsets[ik], J[mask]+offsets[ik],
+                          none, none, cplx, paren=paren)
 
         out = fmt_integral(enuc+0j, -1, -1, -1, -1, cplx, paren=paren)
         f.write(out)
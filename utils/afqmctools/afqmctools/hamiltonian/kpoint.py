@@ -49,7 +49,7 @@ def alloc_helper(shape, dtype=numpy.float64, name='array', verbose=False):
 def write_hamil_kpoints(comm, scf_data, hamil_file, chol_cut,
                         verbose=True, cas=None, max_vecs=20,
                         ortho_ao=False, exxdiv='ewald', nelec=None,
-                        phdf=False):
+                        phdf=False, resume=False):
     tstart = time.clock()
 
     # Unpack pyscf data.
@@ -69,13 +69,34 @@ def write_hamil_kpoints(comm, scf_data, hamil_file, chol_cut,
     qk_to_k2, kminus = construct_qk_maps(cell, kpts)
 
 
-    h5file = FileHandler(comm,hamil_file,"w",phdf)
-    h5file.grp = h5file.h5f.create_group("Hamiltonian")
-    h5file.grp_v2 = h5file.h5f.create_group("Hamiltonian/KPFactorized")
-    if h5file.error:
-        sys.exit()
-    write_basic(comm, cell, kpts, hcore, h5file, X, nmo_pk,
-                qk_to_k2, kminus, verbose=verbose, nelec=nelec)
+    if resume:
+        # Only resume if every rank can find a checkpoint. The checkpoint
+        # is created by KPCholesky once write_basic has completed and is
+        # removed when the factorization finishes.
+        h5file = FileHandler(comm,hamil_file,"a",phdf)
+        found = (not h5file.error and
+                 "Checkpoint/NCholPerKP" in h5file.h5f)
+        resume = all(comm.allgather(found))
+        if not resume:
+            if comm.rank == 0:
+                print(" # Could not find checkpoint to resume from. "
+                      "Starting from scratch.")
+            if not h5file.error:
+                h5file.close()
+    if resume:
+        h5file.grp = h5file.h5f["Hamiltonian"]
+        h5file.grp_v2 = h5file.h5f["Hamiltonian/KPFactorized"]
+        if comm.rank == 0 and verbose:
+            print(" # Resuming Cholesky decomposition from: "
+                  "{}".format(hamil_file))
+    else:
+        h5file = FileHandler(comm,hamil_file,"w",phdf)
+        if h5file.error:
+            sys.exit()
+        h5file.grp = h5file.h5f.create_group("Hamiltonian")
+        h5file.grp_v2 = h5file.h5f.create_group("Hamiltonian/KPFactorized")
+        write_basic(comm, cell, kpts, hcore, h5file, X, nmo_pk,
+                    qk_to_k2, kminus, verbose=verbose, nelec=nelec)
 
     if comm.rank == 0 and verbose:
         print(" # Time to reach Cholesky: {:13.8e} s.".format(time.clock()-tstart))
@@ -85,7 +106,7 @@ def write_hamil_kpoints(comm, scf_data, hamil_file, chol_cut,
     solver = KPCholesky(comm, cell, kpts, max_vecs, nmo_pk,
                         qk_to_k2, kminus, gtol_chol=chol_cut,
                         verbose=verbose)
-    solver.run(comm, X, h5file)
+    solver.run(comm, X, h5file, resume=resume)
     if comm.rank == 0 and verbose:
         print(" # Time to perform Cholesky: {:13.8e} s.".format(time.clock()-tstart))
         sys.stdout.flush()
@@ -375,7 +396,136 @@ class KPCholesky(object):
 
         return residual, k1max, k2max, i1max, i2max, maxv
 
-    def run(self, comm, X, h5file):
+    def estimate_cost(self, comm, Q):
+        """Estimate cost of factorizing momentum Q.
+
+        The cost of each iteration is set by the rank with the largest number
+        of orbital pairs, the number of iterations by the total number of
+        orbital pairs.
+        """
+        part = self.part
+        local = 0
+        for k in range(part.nkk):
+            k1 = k + part.kk0
+            k2 = self.QKToK2[Q][k1]
+            npair = self.nmo_pk[k1]*self.nmo_pk[k2]
+            local += max(0, min(npair, part.ijN)-part.ij0)
+        pairs = comm.allgather(local)
+        return max(pairs) * sum(pairs)
+
+    def schedule(self, comm, done):
+        """Order momenta still to be factorized by decreasing estimated cost.
+
+        Parameters
+        ----------
+        comm : MPI communicator
+            MPI communicator.
+        done : :class:`numpy.ndarray`
+            Number of Cholesky vectors of completed momenta, -1 otherwise.
+
+        Returns
+        -------
+        qs : list
+            Momenta to factorize.
+        """
+        qs = [Q for Q in range(self.nkpts)
+              if Q <= self.kminus[Q] and done[Q] < 0]
+        cost = dict((Q, self.estimate_cost(comm, Q)) for Q in qs)
+        qs = sorted(qs, key=lambda Q: (-cost[Q], Q))
+        if comm.rank == 0 and self.verbose:
+            ndone = sum(1 for Q in range(self.nkpts)
+                        if Q <= self.kminus[Q] and done[Q] >= 0)
+            if ndone > 0:
+                print(" # Skipping {} completed momenta.".format(ndone))
+            if len(qs) > 0:
+                tot = float(sum(cost.values()))
+                print(" # Momentum schedule (Q, relative cost): " +
+                      " ".join("({}, {:.3f})".format(Q, cost[Q]/tot) for Q in qs))
+            sys.stdout.flush()
+        return qs
+
+    def init_checkpoint(self, comm, h5file, resume=False):
+        """Setup or read per-momentum checkpoint information.
+
+        Parameters
+        ----------
+        comm : MPI communicator
+            MPI communicator.
+        h5file : :class:`FileHandler`
+            Output file.
+        resume : bool
+            Read completed momenta from existing checkpoint. Default False.
+
+        Returns
+        -------
+        done : :class:`numpy.ndarray`
+            Number of Cholesky vectors of completed momenta, -1 otherwise.
+        """
+        h5f = h5file.h5f
+        local = numpy.zeros(self.nkpts, dtype=numpy.int32) - 1
+        if resume and "Checkpoint" in h5f:
+            nproc = h5f["Checkpoint/NProc"][()]
+            thresh = h5f["Checkpoint/Threshold"][()]
+            if nproc == comm.size and thresh == self.gtol_chol:
+                local[:] = h5f["Checkpoint/NCholPerKP"][:]
+            elif comm.rank == 0:
+                print(" # Checkpoint generated with different number of MPI "
+                      "tasks or threshold. Starting from scratch.")
+        # A momentum is only complete once every rank has written its block.
+        done = numpy.min(numpy.array(comm.allgather(local)), axis=0)
+        if "Checkpoint" not in h5f:
+            grp = h5f.create_group("Checkpoint")
+            grp.create_dataset("NProc", (), dtype=numpy.int32)
+            grp.create_dataset("Threshold", (), dtype=numpy.float64)
+            grp.create_dataset("NCholPerKP", (self.nkpts,), dtype=numpy.int32)
+        if comm.rank == 0 or not h5file.phdf:
+            h5f["Checkpoint/NProc"][()] = comm.size
+            h5f["Checkpoint/Threshold"][()] = self.gtol_chol
+            h5f["Checkpoint/NCholPerKP"][:] = done
+        comm.barrier()
+        return done
+
+    def write_checkpoint(self, comm, h5file, Q, numv, residual, pivots,
+                         maxresidual):
+        """Record completed momentum Q in checkpoint.
+
+        Stores the residual diagonal, pivots and maximum residual of each
+        iteration, then marks Q as completed.
+        """
+        h5f = h5file.h5f
+        part = self.part
+        name = "Checkpoint/Q"+str(Q)
+        if name in h5f:
+            del h5f[name]
+        grp = h5f.create_group(name)
+        if h5file.phdf:
+            res = grp.create_dataset("Residual",
+                                     (self.nkpts,self.nmo_max*self.nmo_max),
+                                     dtype=numpy.float64)
+            res[part.kk0:part.kkN,part.ij0:part.ijN] = residual
+        else:
+            grp.create_dataset("Residual", data=residual)
+        piv = grp.create_dataset("Pivots", (numv,4), dtype=numpy.int32)
+        mres = grp.create_dataset("MaxResidual", (numv,), dtype=numpy.float64)
+        if comm.rank == 0 or not h5file.phdf:
+            piv[:,:] = numpy.array(pivots, dtype=numpy.int32).reshape(numv,4)
+        if comm.rank == 0:
+            mres[:] = maxresidual[:numv]
+        comm.barrier()
+        if comm.rank == 0 or not h5file.phdf:
+            h5f["Checkpoint/NCholPerKP"][Q] = numv
+        h5f.flush()
+        comm.barrier()
+
+    def remove_checkpoint(self, comm, h5file):
+        """Delete checkpoint once the factorization is complete."""
+        h5f = h5file.h5f
+        if "Checkpoint" in h5f:
+            del h5f["Checkpoint"]
+        h5f.flush()
+        comm.barrier()
+
+    def run(self, comm, X, h5file, resume=False):
         # Unpack for convenience.
         ngs = self.ngs
         nmo_max = self.nmo_max
@@ -413,10 +563,13 @@ class KPCholesky(object):
         header = ["iteration", "max_residual", "total_time",
                   "time_k3k4", "time_comp_cholv", "time_buff"]
 
+        done_q = self.init_checkpoint(comm, h5file, resume=resume)
         for Q in range(nkpts):
+            if done_q[Q] >= 0:
+                num_cholvecs[Q] = done_q[Q]
+
+        for Q in self.schedule(comm, done_q):
             t0 = time.clock()
-            if Q > self.kminus[Q]:
-                continue
             if comm.rank == 0 and self.verbose:
                 print(" # Calculating factorization for momentum: {}".format(Q))
                 print(" # Generating orbital products")
@@ -450,6 +603,7 @@ class KPCholesky(object):
             vmaxold = vmax
             more = True   # for parallel
             numv = 0
+            pivots = []
             while more:
 
                 t0 = time.clock()
@@ -461,6 +615,7 @@ class KPCholesky(object):
                     print(" Too many vectors needed to converge. "
                           "Increase maximum number of vectors.")
                     break
+                pivots.append((k3,k4,i3,i4))
 
                 if comm.size <= nkpts:
                     ipr = bisect(part.kkbounds[1:comm.size+1],k3)
@@ -591,6 +746,10 @@ class KPCholesky(object):
             comm.barrier()
             num_cholvecs[Q] = numv
 
+            # Remove partially written blocks from an interrupted run.
+            for name in ["L"+str(Q), "Ldim"+str(Q)]:
+                if name in h5file.grp_v2:
+                    del h5file.grp_v2[name]
             if h5file.phdf or comm.rank==0:
                 LQ = h5file.grp_v2.create_dataset("L"+str(Q),
                                               (nkpts,nmo_max*nmo_max*numv,2),
@@ -615,8 +774,13 @@ class KPCholesky(object):
                     LQ[kk,:,:] = T_
                     T_ = None
             comm.barrier()
+            self.write_checkpoint(comm, h5file, Q, numv, residual, pivots,
+                                  maxresidual)
 
+        if "NCholPerKP" in h5file.grp:
+            del h5file.grp["NCholPerKP"]
         h5file.grp.create_dataset("NCholPerKP", data=num_cholvecs)
+        self.remove_checkpoint(comm, h5file)
         comm.barrier()
 
 
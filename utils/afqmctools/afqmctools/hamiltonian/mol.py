@@ -146,12 +146,68 @@ def ao2mo_chol(eri, C):
         eri_[i*nik:(i+1)*nik] = numpy.dot(C.T, half).ravel()
     return eri_[:nchol*nik].reshape((nchol,nik))
 
-def chunked_cholesky(mol, max_error=1e-6, verbose=False, cmax=10):
+class CholeskyBuffer(object):
+    """Storage for Cholesky vectors which grows one block at a time.
+
+    Parameters
+    ----------
+    ncol : int
+        Length of each Cholesky vector.
+    nmax : int
+        Maximum number of vectors.
+    block_size : int
+        Number of vectors per block. Optional. Default: ~64 MB blocks.
+    """
+    def __init__(self, ncol, nmax, block_size=None):
+        if block_size is None:
+            block_size = max(1, 2**23 // ncol)
+        self.ncol = ncol
+        self.nmax = nmax
+        self.block_size = block_size
+        self.blocks = []
+        self.nvec = 0
+
+    def append(self, vec):
+        ib, iv = divmod(self.nvec, self.block_size)
+        if ib == len(self.blocks):
+            nrow = min(self.block_size, self.nmax-self.nvec)
+            self.blocks.append(numpy.zeros((nrow, self.ncol)))
+        self.blocks[ib][iv] = vec
+        self.nvec += 1
+
+    def project(self, cols):
+        """Return R[m] = sum_x L_x[cols[m]] L_x over stored vectors."""
+        R = numpy.zeros((len(cols), self.ncol))
+        for ib, block in enumerate(self.blocks):
+            nrow = min(self.nvec-ib*self.block_size, len(block))
+            R += numpy.dot(block[:nrow,cols].T, block[:nrow])
+        return R
+
+    def nbytes(self):
+        return sum(b.nbytes for b in self.blocks)
+
+    def to_array(self):
+        """Assemble vectors, releasing blocks as they are copied."""
+        chol_vecs = numpy.empty((self.nvec, self.ncol))
+        s = 0
+        while len(self.blocks) > 0:
+            block = self.blocks.pop(0)
+            nrow = min(self.nvec-s, len(block))
+            chol_vecs[s:s+nrow] = block[:nrow]
+            s += nrow
+        self.nvec = 0
+        return chol_vecs
+
+def chunked_cholesky(mol, max_error=1e-6, verbose=False, cmax=10,
+                     npivot=1, cache_size=1, block_size=None):
     """Modified cholesky decomposition from pyscf eris.
 
     See, e.g. [Motta17]_
 
-    Only works for molecular systems.
+    Only works for molecular systems. Cholesky vectors are stored in blocks
+    allocated as the decomposition proceeds, and ERI columns are computed one
+    shell pair at a time, with the most recent shell pair blocks kept for
+    pivots falling in the same shell pair.
 
     Parameters
     ----------
@@ -165,7 +221,14 @@ def chunked_cholesky(mol, max_error=1e-6, verbose=False, cmax=10):
         If true print out convergence progress.
     cmax : int
         nchol = cmax * M, where M is the number of basis functions.
-        Controls buffer size for cholesky vectors.
+        Controls maximum number of cholesky vectors.
+    npivot : int
+        Maximum number of pivots selected per iteration. The residual is
+        only recomputed once per iteration. Optional. Default: 1.
+    cache_size : int
+        Number of shell pair ERI blocks to keep. Optional. Default: 1.
+    block_size : int
+        Number of Cholesky vectors allocated at a time. Optional.
 
     Returns
     -------
@@ -176,8 +239,7 @@ def chunked_cholesky(mol, max_error=1e-6, verbose=False, cmax=10):
     diag = numpy.zeros(nao*nao)
     nchol_max = cmax * nao
     # This shape is more convenient for pauxy.
-    chol_vecs = numpy.zeros((nchol_max, nao*nao))
-    # eri = numpy.zeros((nao,nao,nao,nao))
+    chol_vecs = CholeskyBuffer(nao*nao, nchol_max, block_size=block_size)
     ndiag = 0
     dims = [0]
     nao_per_i = 0
@@ -186,6 +248,7 @@ def chunked_cholesky(mol, max_error=1e-6, verbose=False, cmax=10):
         nc = mol.bas_nctr(i)
         nao_per_i += (2*l+1)*nc
         dims.append(nao_per_i)
+    dims = numpy.array(dims)
     start = time.time()
     for i in range(0,mol.nbas):
         shls = (i,i+1,0,mol.nbas,i,i+1,0,mol.nbas)
@@ -193,72 +256,93 @@ def chunked_cholesky(mol, max_error=1e-6, verbose=False, cmax=10):
         di, dk, dj, dl = buf.shape
         diag[ndiag:ndiag+di*nao] = buf.reshape(di*nao,di*nao).diagonal()
         ndiag += di * nao
+    # Recently computed ERI[:,:,sj,sl] shell blocks.
+    eri_cache = []
+    timers = {'eri': 0.0, 'hits': 0}
+    def eri_column(nu):
+        # shls_slice computes shells of integrals as determined by the angular
+        # momentum of the basis function and the number of contraction
+        # coefficients. Need to search for AO index within this shell indexing
+        # scheme.
+        # AO index.
+        j = nu // nao
+        l = nu % nao
+        # Associated shell index.
+        sj = numpy.searchsorted(dims, j, side='right') - 1
+        sl = numpy.searchsorted(dims, l, side='right') - 1
+        for (key, block) in eri_cache:
+            if key == (sj,sl):
+                timers['hits'] += 1
+                break
+        else:
+            # Compute ERI chunk.
+            t0 = time.time()
+            block = mol.intor('int2e_sph',
+                              shls_slice=(0,mol.nbas,0,mol.nbas,sj,sj+1,sl,sl+1))
+            timers['eri'] += time.time() - t0
+            eri_cache.insert(0, ((sj,sl), block))
+            del eri_cache[max(cache_size,0):]
+        # Select correct ERI chunk from shell.
+        return block[:,:,j-dims[sj],l-dims[sl]].reshape(nao*nao)
     nu = numpy.argmax(diag)
     delta_max = diag[nu]
     if verbose:
-        print(" # Generating Cholesky decomposition of ERIs."%nchol_max)
+        print(" # Generating Cholesky decomposition of ERIs.")
         print(" # max number of cholesky vectors = %d"%nchol_max)
-        header = ['iteration', 'max_residual', 'time']
+        header = ['iteration', 'max_residual', 'time', 'eri_time',
+                  'memory_MB']
         print(format_fixed_width_strings(header))
-        init = [delta_max, time.time()-start]
+        init = [delta_max, time.time()-start, timers['eri'], 0.0]
         print('{:17d} '.format(0)+format_fixed_width_floats(init))
-    j = nu // nao
-    l = nu % nao
-    sj = numpy.searchsorted(dims, j)
-    sl = numpy.searchsorted(dims, l)
-    if dims[sj] != j and j != 0:
-        sj -= 1
-    if dims[sl] != l and l != 0:
-        sl -= 1
     Mapprox = numpy.zeros(nao*nao)
-    # ERI[:,jl]
-    eri_col = mol.intor('int2e_sph',
-                         shls_slice=(0,mol.nbas,0,mol.nbas,sj,sj+1,sl,sl+1))
-    cj, cl = max(j-dims[sj],0), max(l-dims[sl],0)
-    chol_vecs[0] = numpy.copy(eri_col[:,:,cj,cl].reshape(nao*nao)) / delta_max**0.5
-
+    delta = diag
     nchol = 0
     while abs(delta_max) > max_error:
-        # Update cholesky vector
+        if nchol >= nchol_max:
+            print(" # Warning: maximum number of Cholesky vectors ({:d}) "
+                  "reached before convergence.".format(nchol_max))
+            break
         start = time.time()
-        # M'_ii = \sum_x L_i^x L_i^x
-        Mapprox += chol_vecs[nchol] * chol_vecs[nchol]
+        timers['eri'] = 0.0
+        # Candidate pivots, largest residual first.
+        npv = min(npivot, nchol_max-nchol)
+        if npv > 1:
+            adelta = numpy.abs(delta)
+            pivots = numpy.argpartition(-adelta, npv-1)[:npv]
+            pivots = pivots[numpy.argsort(-adelta[pivots], kind='stable')]
+        else:
+            pivots = [nu]
+        # Updated residual = \sum_x L_i^x L_nu^x
+        R = chol_vecs.project(pivots)
+        new_vecs = []
+        for m, p in enumerate(pivots):
+            # Account for vectors already added this iteration.
+            Rp = R[m]
+            for v in new_vecs:
+                Rp = Rp + v[p]*v
+            dp = numpy.abs(diag[p] - Mapprox[p] - sum(v[p]**2 for v in new_vecs))
+            if m > 0 and dp <= max_error:
+                continue
+            Munu0 = eri_column(p)
+            new_vecs.append((Munu0 - Rp) / dp**0.5)
+        for v in new_vecs:
+            chol_vecs.append(v)
+            # M'_ii = \sum_x L_i^x L_i^x
+            Mapprox += v * v
+        nchol += len(new_vecs)
         # D_ii = M_ii - M'_ii
         delta = diag - Mapprox
         nu = numpy.argmax(numpy.abs(delta))
         delta_max = numpy.abs(delta[nu])
-        # Compute ERI chunk.
-        # shls_slice computes shells of integrals as determined by the angular
-        # momentum of the basis function and the number of contraction
-        # coefficients. Need to search for AO index within this shell indexing
-        # scheme.
-        # AO index.
-        j = nu // nao
-        l = nu % nao
-        # Associated shell index.
-        sj = numpy.searchsorted(dims, j)
-        sl = numpy.searchsorted(dims, l)
-        if dims[sj] != j and j != 0:
-            sj -= 1
-        if dims[sl] != l and l != 0:
-            sl -= 1
-        # Compute ERI chunk.
-        eri_col = mol.intor('int2e_sph',
-                            shls_slice=(0,mol.nbas,0,mol.nbas,sj,sj+1,sl,sl+1))
-        # Select correct ERI chunk from shell.
-        cj, cl = max(j-dims[sj],0), max(l-dims[sl],0)
-        Munu0 = eri_col[:,:,cj,cl].reshape(nao*nao)
-        # Updated residual = \sum_x L_i^x L_nu^x
-        R = numpy.dot(chol_vecs[:nchol+1,nu], chol_vecs[:nchol+1,:])
-        chol_vecs[nchol+1] = (Munu0 - R) / (delta_max)**0.5
-        nchol += 1
         if verbose:
             step_time = time.time() - start
-
-            out = [delta_max, step_time]
+            out = [delta_max, step_time, timers['eri'],
+                   chol_vecs.nbytes()/1024.0**2]
             print('{:17d} '.format(nchol)+format_fixed_width_floats(out))
+    if verbose:
+        print(" # Number of shell pair ERI blocks reused: {:d}".format(timers['hits']))
 
-    return chol_vecs[:nchol]
+    return chol_vecs.to_array()
 
 def write_qmcpack_trial_wfn(wfn, nelec, filename='wfn.dat'):
     UHF = len(wfn.shape) == 3
@@ -284,10 +368,13 @@ def write_qmcpack_wfn_single(out, mos, nao):
             out.write('(%.10e,%.10e) '%(val.real, val.imag))
         out.write('\n')
 
-def local_energy_generic_cholesky(h1e, chol_vecs, G, ecore):
+def local_energy_generic_cholesky(h1e, chol_vecs, G, ecore, chunk_size=256):
     r"""Calculate local for generic two-body hamiltonian.
 
-    This uses the cholesky decomposed two-electron integrals.
+    This uses the cholesky decomposed two-electron integrals. Coulomb terms
+    are evaluated with a single contraction over all Cholesky vectors and
+    exchange terms with batched matrix products over blocks of chunk_size
+    vectors.
 
     Parameters
     ----------
@@ -295,6 +382,8 @@ def local_energy_generic_cholesky(h1e, chol_vecs, G, ecore):
         System information for the hubbard model.
     G : :class:`numpy.ndarray`
         Walker's "green's function"
+    chunk_size : int
+        Number of Cholesky vectors per exchange block. Optional.
 
     Returns
     -------
@@ -304,31 +393,26 @@ def local_energy_generic_cholesky(h1e, chol_vecs, G, ecore):
     # Element wise multiplication.
     e1b = numpy.sum(h1e*G[0]) + numpy.sum(h1e*G[1])
     cv = chol_vecs
-    ecoul_uu = 0
-    ecoul_dd = 0
-    ecoul_ud = 0
-    ecoul_du = 0
-    exx_uu = 0
-    exx_dd = 0
-    # Below to compute exx_uu/dd we do
-    # t1 = numpy.einsum('nik,il->nkl', cv, G[0])
-    # t2 = numpy.einsum('nlj,jk->nlk', cv.conj(), G[0])
-    # exx_uu = numpy.einsum('nkl,nlk->', t1, t2)
-    exx_uu = 0
-    for c in cv:
-        ecoul_uu += numpy.sum(c*G[0]) * numpy.sum(c.conj().T*G[0])
-        ecoul_dd += numpy.sum(c*G[1]) * numpy.sum(c.conj().T*G[1])
-        ecoul_ud += numpy.sum(c*G[0]) * numpy.sum(c.conj().T*G[1])
-        ecoul_du += numpy.sum(c*G[1]) * numpy.sum(c.conj().T*G[0])
-        t1 = numpy.dot(c.T, G[0])
-        # print(t1.sum())
-        t2 = numpy.dot(c.conj(), G[0])
-        # print(t2.sum())
-        exx_uu += numpy.einsum('ij,ji->',t1,t2)
-        # print("sum:", exx_uu)
-        t1 = numpy.dot(c.T, G[1])
-        t2 = numpy.dot(c.conj(), G[1])
-        exx_dd += numpy.einsum('ij,ji->',t1,t2)
+    nchol = cv.shape[0]
+    cvf = cv.reshape(nchol,-1)
+    # sum_ij L_ij G_ij and sum_ij L*_ji G_ij for each vector.
+    c = [cvf.dot(G[s].ravel()) for s in (0,1)]
+    cc = [cvf.dot(G[s].T.conj().ravel()).conj() for s in (0,1)]
+    ecoul_uu = numpy.dot(c[0], cc[0])
+    ecoul_dd = numpy.dot(c[1], cc[1])
+    ecoul_ud = numpy.dot(c[0], cc[1])
+    ecoul_du = numpy.dot(c[1], cc[0])
+    # exx_uu = \sum_n Tr[(L_n^T G) (L_n^* G)]
+    exx = [0, 0]
+    for s in range(0, nchol, chunk_size):
+        cb = cv[s:s+chunk_size]
+        cbT = cb.transpose((0,2,1))
+        cbc = cb.conj()
+        for sp in (0,1):
+            t1 = numpy.matmul(cbT, G[sp])
+            t2 = numpy.matmul(cbc, G[sp])
+            exx[sp] += numpy.sum(t1*t2.transpose((0,2,1)))
+    exx_uu, exx_dd = exx
     euu = 0.5*(ecoul_uu-exx_uu)
     edd = 0.5*(ecoul_dd-exx_dd)
     eud = 0.5 * ecoul_ud
@@ -336,17 +420,29 @@ def local_energy_generic_cholesky(h1e, chol_vecs, G, ecore):
     e2b = euu + edd + eud + edu
     return (e1b+e2b+ecore, e1b+ecore, e2b)
 
-def core_contribution_cholesky(chol_vecs, G):
+def core_contribution_cholesky(chol_vecs, G, chunk_size=256):
+    """Coulomb and exchange contributions of density G to one-body operator.
+
+    Exchange contributions are accumulated over blocks of chunk_size Cholesky
+    vectors, avoiding (nchol, M, M) temporaries.
+    """
     cv = chol_vecs
-    hca_j = numpy.einsum('l,lij->ij', numpy.sum(cv*G[0], axis=(1,2)), cv)
-    ta_k = numpy.einsum('lpr,pq->lrq', cv, G[0])
-    hca_k = 0.5*numpy.einsum('lrq,lsq->rs', ta_k, cv)
-    hca = hca_j - hca_k
-    hcb_j = numpy.einsum('l,lij->ij', numpy.sum(cv*G[1], axis=(1,2)), cv)
-    tb_k = numpy.einsum('lpr,pq->lrq', cv, G[1])
-    hcb_k = 0.5*numpy.einsum('lrq,lsq->rs', tb_k, cv)
-    hcb = hcb_j - hcb_k
-    return (hca, hcb)
+    nchol, M = cv.shape[0], cv.shape[-1]
+    cvf = cv.reshape(nchol,-1)
+    hc = []
+    for G_ in G[:2]:
+        # J_ij = \sum_l (\sum_pq L_pq G_pq) L_ij
+        hc_j = cvf.dot(G_.ravel()).dot(cvf).reshape(M,M)
+        # K_rs = \sum_lpq L_pr G_pq L_sq
+        hc_k = numpy.zeros((M,M), dtype=numpy.result_type(cv, G_))
+        for s in range(0, nchol, chunk_size):
+            cb = cv[s:s+chunk_size]
+            nb = cb.shape[0]
+            t_k = numpy.matmul(cb.transpose((0,2,1)), G_)
+            hc_k += numpy.dot(t_k.transpose((1,0,2)).reshape(M,nb*M),
+                              cb.transpose((1,0,2)).reshape(M,nb*M).T)
+        hc.append(hc_j - 0.5*hc_k)
+    return (hc[0], hc[1])
 
 def gab(A, B):
     r"""One-particle Green's function.
@@ -5,7 +5,8 @@ import unittest
 from afqmctools.hamiltonian.converter import (
         read_qmcpack_hamiltonian,
         read_fcidump,
-        write_fcidump
+        write_fcidump,
+        unpack_eri
         )
 from afqmctools.utils.linalg import modified_cholesky_direct
 from afqmctools.hamiltonian.io import write_qmcpack_sparse
@@ -83,6 +84,67 @@ class TestConverter(unittest.TestCase):
         self.assertAlmostEqual(d2,0.0)
         self.assertAlmostEqual(d3,-0.00254428836-0.00238852605j)
 
+    def test_read_packed(self):
+        nmo = 9
+        nelec = (2,2)
+        h1e, chol, enuc, eri = generate_hamiltonian(nmo, nelec, cplx=False, sym=8)
+        write_qmcpack_sparse(h1e, chol.reshape((-1,nmo*nmo)).T.copy(),
+                             nelec, nmo, e0=enuc, real_chol=True)
+        hamil = read_qmcpack_hamiltonian('hamiltonian.h5')
+        write_fcidump('FCIDUMP', hamil['hcore'], hamil['chol'], hamil['enuc'],
+                      hamil['nmo'], hamil['nelec'], sym=8, cplx=False)
+        h1e_r, eri_r, enuc_r, nelec_r = read_fcidump('FCIDUMP', verbose=False)
+        h1e_p, eri_p, enuc_p, nelec_p = read_fcidump('FCIDUMP', verbose=False,
+                                                     dtype=None, packed=True)
+        self.assertEqual(eri_p.dtype, numpy.float64)
+        npair = nmo*(nmo+1)//2
+        self.assertEqual(eri_p.shape, (npair*(npair+1)//2,))
+        self.assertTrue(numpy.allclose(unpack_eri(eri_p, nmo), eri_r.real))
+        self.assertTrue(numpy.allclose(h1e_p, h1e_r.real))
+        self.assertAlmostEqual(enuc_p, enuc_r.real)
+        self.assertEqual(nelec_p, nelec_r)
+
+    def test_read_redundant(self):
+        # Redundant entries which disagree: the last line in the file wins,
+        # including when it is a different permutation of the same integral.
+        with open('FCIDUMP', 'w') as f:
+            f.write(' &FCI NORB=2,NELEC=2,MS2=0,\n &END\n')
+            f.write(' 1.0 1 2 1 1\n')
+            f.write(' 2.0 2 1 1 1\n')
+            f.write(' 3.0 1 1 2 2\n')
+            f.write(' 4.0 2 2 1 1\n')
+            f.write(' 5.0 1 1 2 2\n')
+            f.write(' 6.0 1 2 1 2\n')
+            f.write(' 7.0 2 1 1 2\n')
+            f.write(' 0.5 1 2 0 0\n')
+            f.write(' 0.7 2 1 0 0\n')
+            f.write(' 0.1 0 0 0 0\n')
+        for packed in (False, True):
+            h1e, eri, ecore, nelec = read_fcidump('FCIDUMP', verbose=False,
+                                                  dtype=None, packed=packed)
+            if packed:
+                eri = unpack_eri(eri, 2)
+            for c in [(0,1,0,0),(1,0,0,0),(0,0,0,1),(0,0,1,0)]:
+                self.assertEqual(eri[c], 2.0)
+            self.assertEqual(eri[0,0,1,1], 5.0)
+            self.assertEqual(eri[1,1,0,0], 5.0)
+            # (12|12) and (21|12) are only equivalent with 8-fold symmetry.
+            self.assertEqual(eri[0,1,0,1], 7.0)
+            self.assertEqual(eri[1,0,0,1], 7.0)
+            self.assertEqual(h1e[0,1], 0.7)
+            self.assertEqual(h1e[1,0], 0.7)
+            self.assertEqual(ecore, 0.1)
+        h1e, eri, ecore, nelec = read_fcidump('FCIDUMP', symmetry=4,
+                                              verbose=False, dtype=None)
+        for c in [(0,1,0,0),(1,0,0,0),(0,0,0,1),(0,0,1,0)]:
+            self.assertEqual(eri[c], 2.0)
+        self.assertEqual(eri[0,0,1,1], 5.0)
+        self.assertEqual(eri[1,1,0,0], 5.0)
+        self.assertEqual(eri[0,1,0,1], 6.0)
+        self.assertEqual(eri[1,0,1,0], 6.0)
+        self.assertEqual(eri[1,0,0,1], 7.0)
+        self.assertEqual(eri[0,1,1,0], 7.0)
+
     def tearDown(self):
         cwd = os.getcwd()
         files = ['FCIDUMP', 'hamiltonian.h5']
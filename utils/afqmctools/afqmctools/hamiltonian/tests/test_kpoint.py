@@ -109,6 +109,26 @@ class TestKPCholesky(unittest.TestCase):
         self.chol.run(self.comm, self.X, h5file)
         h5file.close()
 
+    @unittest.skipIf(no_mpi, "MPI4PY not found")
+    def test_kpchol_checkpoint(self):
+        h5file = kp.FileHandler(self.comm, 'test.h5')
+        done = self.chol.init_checkpoint(self.comm, h5file)
+        self.assertTrue(numpy.all(done < 0))
+        qs = self.chol.schedule(self.comm, done)
+        self.assertEqual(sorted(qs), [0,1])
+        part = self.chol.part
+        residual = numpy.zeros((part.nkk,part.nij))
+        self.chol.write_checkpoint(self.comm, h5file, qs[0], 2, residual,
+                                   [(0,0,0,0),(1,1,0,1)], numpy.ones(4))
+        h5file.close()
+        h5file = kp.FileHandler(self.comm, 'test.h5', 'a')
+        done = self.chol.init_checkpoint(self.comm, h5file, resume=True)
+        self.assertEqual(done[qs[0]], 2)
+        self.assertEqual(self.chol.schedule(self.comm, done), qs[1:])
+        self.chol.remove_checkpoint(self.comm, h5file)
+        self.assertFalse("Checkpoint" in h5file.h5f)
+        h5file.close()
+
     def tearDown(self):
         cwd = os.getcwd()
         files = ['ham.h5', 'test.h5']
@@ -28,6 +28,20 @@ class TestMol(unittest.TestCase):
         eri_loc = numpy.dot(chol.T, chol)
         self.assertTrue(numpy.allclose(eri, eri_loc, atol=1e-5, rtol=1e-3))
 
+    def test_chunked_cholesky_blocked(self):
+        atom = gto.M(atom='Ne 0 0 0', basis='aug-ccpvdz')
+        eri = atom.intor('int2e', aosym='s1')
+        eri = eri.reshape(529,529)
+        chol_ref = mol.chunked_cholesky(atom, max_error=1e-5)
+        # Small blocks and no ERI cache reproduce the default.
+        chol = mol.chunked_cholesky(atom, max_error=1e-5, block_size=7,
+                                    cache_size=0)
+        self.assertTrue(numpy.allclose(chol, chol_ref, atol=1e-12))
+        chol = mol.chunked_cholesky(atom, max_error=1e-5, npivot=4,
+                                    cache_size=4)
+        eri_loc = numpy.dot(chol.T, chol)
+        self.assertTrue(numpy.allclose(eri, eri_loc, atol=1e-5, rtol=1e-3))
+
     def test_ao2mo_chol(self):
         atom = gto.M(atom='Ne 0 0 0', basis='sto-3g', verbose=0)
         eri = atom.intor('int2e', aosym='s1')
@@ -68,6 +82,42 @@ class TestMol(unittest.TestCase):
         self.assertAlmostEqual(efzc, ecore)
         self.assertTrue(numpy.allclose(h1eff, h1e, atol=1e-8, rtol=1e-5))
 
+    def test_cholesky_energy_chunks(self):
+        numpy.random.seed(7)
+        nmo = 6
+        chol = (numpy.random.random((11,nmo,nmo)) +
+                1j*numpy.random.random((11,nmo,nmo)))
+        G = (numpy.random.random((2,nmo,nmo)) +
+             1j*numpy.random.random((2,nmo,nmo)))
+        h1e = numpy.random.random((nmo,nmo))
+        # Reference: explicit loop over Cholesky vectors.
+        e1b = numpy.sum(h1e*G[0]) + numpy.sum(h1e*G[1])
+        ecoul = numpy.zeros((2,2), dtype=numpy.complex128)
+        exx = numpy.zeros(2, dtype=numpy.complex128)
+        hc_j = numpy.zeros((2,nmo,nmo), dtype=numpy.complex128)
+        hc_k = numpy.zeros((2,nmo,nmo), dtype=numpy.complex128)
+        for c in chol:
+            for s in range(2):
+                for sp in range(2):
+                    ecoul[s,sp] += (numpy.sum(c*G[s]) *
+                                    numpy.sum(c.conj().T*G[sp]))
+                t1 = numpy.dot(c.T, G[s])
+                t2 = numpy.dot(c.conj(), G[s])
+                exx[s] += numpy.einsum('ij,ji->', t1, t2)
+                hc_j[s] += numpy.sum(c*G[s]) * c
+                hc_k[s] += numpy.dot(numpy.dot(c.T, G[s]), c.T)
+        e2b = (0.5*(ecoul[0,0]-exx[0]) + 0.5*(ecoul[1,1]-exx[1]) +
+               0.5*ecoul[0,1] + 0.5*ecoul[1,0])
+        ref = (e1b+e2b+0.5, e1b+0.5, e2b)
+        ref_hc = (hc_j[0]-0.5*hc_k[0], hc_j[1]-0.5*hc_k[1])
+        for chunk_size in [1, 4, 256]:
+            energy = mol.local_energy_generic_cholesky(h1e, chol, G, 0.5,
+                                                       chunk_size=chunk_size)
+            self.assertTrue(numpy.allclose(energy, ref))
+            hc = mol.core_contribution_cholesky(chol, G,
+                                                chunk_size=chunk_size)
+            self.assertTrue(numpy.allclose(hc, ref_hc))
+
     def test_generate_hamiltonian(self):
         atom = gto.M(atom='Ne 0 0 0', basis='sto-3g', verbose=0)
         mf = scf.RHF(atom)
@@ -22,7 +22,8 @@ def write_qmcpack(chkfile, hamil_file, threshold, comm=None,
                   ortho_ao=False, df=False, kpoint=False, verbose=False,
                   cas=None, qmc_input=None, wfn_file=None,
                   write_hamil=True, ndet_max=None, real_chol=False,
-                  phdf=False, low=0.1, high=0.95, dense=False):
+                  phdf=False, low=0.1, high=0.95, dense=False,
+                  resume=False):
     """Dispatching routine dependent on options.
     """
     try:
@@ -40,8 +41,12 @@ def write_qmcpack(chkfile, hamil_file, threshold, comm=None,
             if kpoint:
                 write_hamil_kpoints(comm, scf_data, hamil_file, threshold,
                                     verbose=verbose, cas=cas,
-                                    ortho_ao=ortho_ao, phdf=phdf)
+                                    ortho_ao=ortho_ao, phdf=phdf,
+                                    resume=resume)
             else:
+                if resume and comm.rank == 0:
+                    print(" # Resuming is only supported for k-point "
+                          "Hamiltonians. Starting from scratch.")
                 write_hamil_supercell(comm, scf_data, hamil_file, threshold,
                                       verbose=verbose, cas=cas,
                                       ortho_ao=ortho_ao)
@@ -62,9 +62,11 @@ def main(args):
         command-line arguments.
     """
     options = parse_args(args)
+    # Integrals are only stored as complex if the file contains complex values.
     (hcore, eri, ecore, nelec) = read_fcidump(options.input_file,
                                               symmetry=options.symm,
-                                              verbose=options.verbose)
+                                              verbose=options.verbose,
+                                              dtype=None)
     norb = hcore.shape[-1]
 
     # If the ERIs are complex then we need to form M_{(ik),(lj}} which is
@@ -75,7 +77,8 @@ def main(args):
     chol = modified_cholesky_direct(eri.reshape(norb**2,norb**2),
                                     options.thresh, options.verbose,
                                     cmax=20).T.copy()
-    cplx_chol = options.write_complex or numpy.any(abs(eri.imag)>1e-14)
+    cplx_chol = options.write_complex or (numpy.iscomplexobj(eri) and
+                                          numpy.any(abs(eri.imag)>1e-14))
     write_qmcpack_sparse(hcore, chol, nelec, norb, e0=ecore,
                          real_chol=(not cplx_chol),
                          filename=options.output_file)
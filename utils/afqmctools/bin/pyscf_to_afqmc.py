@@ -71,6 +71,11 @@ def parse_args(args, comm):
         parser.add_argument('-p', '--phdf', dest='phdf',
                             action='store_true', default=False,
                             help='Use parallel hdf5.')
+        parser.add_argument('--resume', dest='resume',
+                            action='store_true', default=False,
+                            help='Resume k-point Cholesky decomposition from '
+                            'checkpoint in existing hamil_file, skipping '
+                            'completed momenta.')
         parser.add_argument('--low', dest='low_thresh',
                             type=float, default=0.1,
                             help='Lower threshold for non-integer occupancies'
@@ -111,6 +116,9 @@ def write_metadata(options, sha1, cwd, date_time):
                 fh5['metadata'] = json.dumps(op_dict)
     if not options.disable_ham:
         with h5py.File(options.hamil_file, 'a') as fh5:
+            if 'metadata' in fh5:
+                # Resumed runs append to an existing file.
+                del fh5['metadata']
             fh5['metadata'] = json.dumps(op_dict)
 
 def main(args):
@@ -150,7 +158,8 @@ def main(args):
                   phdf=options.phdf,
                   low=options.low_thresh,
                   high=options.high_thresh,
-                  dense=options.dense)
+                  dense=options.dense,
+                  resume=options.resume)
     if comm.rank == 0:
         write_metadata(options, sha1, cwd, date_time)
 